@@ -2,25 +2,44 @@
 app/__init__.py
 ----------------
 Ten plik tworzy obiekt aplikacji Flask i inicjalizuje:
-- połączenie z bazą danych (Flask-SQLAlchemy),
-- tabele w bazie,
-- użytkowników testowych,
+- połączenie z bazą danych (Flask-SQLAlchemy) i ustawienia SQLite (PRAGMA),
+- sprawdzenie wersji schematu bazy (tabele i użytkowników testowych
+  tworzy `flask --app app init-db`, patrz app/schema.py),
 - rejestruje trasy (routes) w aplikacji.
 """
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 
-from config import SQLALCHEMY_DATABASE_URI, SQLALCHEMY_TRACK_MODIFICATIONS, SECRET_KEY, TEST_USERS
+from config import (
+    SQLALCHEMY_DATABASE_URI,
+    SQLALCHEMY_TRACK_MODIFICATIONS,
+    SECRET_KEY,
+    INSTRUMENTATION_ENABLED,
+    METRICS_ENDPOINT_ENABLED,
+    SLOW_QUERY_THRESHOLD_MS,
+    SCHEMA_STARTUP_MODE,
+    SQLITE_PRAGMA_PROFILES,
+    SQLITE_PROFILE,
+    LAST_LOGIN_FLUSH_INTERVAL,
+    IDENTITY_CACHE_TTL,
+    TIMETABLE_CACHE_TTL,
+    TIMETABLE_CACHE_SIZE,
+    SCHEDULE_INDEX_TTL,
+)
 
 # Tworzymy globalny obiekt SQLAlchemy, który później wykorzystają modele.
 db = SQLAlchemy()
 
 
-def create_app():
+def create_app(config_overrides=None):
     """
     Funkcja fabrykująca aplikację Flask.
 
+    Parametry:
+        config_overrides: (opcjonalnie) słownik nadpisujący konfigurację,
+            np. inna baza danych dla testów wydajności.
+
     Zwraca:
         Flask: skonfigurowana instancja aplikacji.
     """
@@ -30,6 +49,19 @@ def create_app():
     app.config["SQLALCHEMY_DATABASE_URI"] = SQLALCHEMY_DATABASE_URI
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = SQLALCHEMY_TRACK_MODIFICATIONS
     app.config["SECRET_KEY"] = SECRET_KEY
+    app.config["INSTRUMENTATION_ENABLED"] = INSTRUMENTATION_ENABLED
+    app.config["METRICS_ENDPOINT_ENABLED"] = METRICS_ENDPOINT_ENABLED
+    app.config["SLOW_QUERY_THRESHOLD_MS"] = SLOW_QUERY_THRESHOLD_MS
+    app.config["SCHEMA_STARTUP_MODE"] = SCHEMA_STARTUP_MODE
+    app.config["SQLITE_PRAGMAS"] = SQLITE_PRAGMA_PROFILES[SQLITE_PROFILE]
+    app.config["LAST_LOGIN_FLUSH_INTERVAL"] = LAST_LOGIN_FLUSH_INTERVAL
+    app.config["IDENTITY_CACHE_TTL"] = IDENTITY_CACHE_TTL
+    app.config["TIMETABLE_CACHE_TTL"] = TIMETABLE_CACHE_TTL
+    app.config["TIMETABLE_CACHE_SIZE"] = TIMETABLE_CACHE_SIZE
+    app.config["SCHEDULE_INDEX_TTL"] = SCHEDULE_INDEX_TTL
+
+    if config_overrides:
+        app.config.update(config_overrides)
 
     # Inicjalizacja rozszerzenia SQLAlchemy z naszą aplikacją
     db.init_app(app)
@@ -38,23 +70,18 @@ def create_app():
     with app.app_context():
         from app import models  # importuje modele, żeby SQLAlchemy je znał
 
-        # Tworzymy tabele w bazie, jeśli jeszcze nie istnieją
-        db.create_all()
+        # PRAGMA (WAL, busy_timeout, ...) dla każdego połączenia – przed pierwszym zapytaniem
+        from app.sqlite_pragmas import SQLitePragmas
+        SQLitePragmas.install(app)
 
-        # Dodajemy użytkowników testowych tylko, gdy baza jest pusta
-        from app.models import User
-        from app.auth import AuthManager
+        # Jedno zapytanie o wersję schematu; tabele, indeks pełnotekstowy
+        # i użytkowników testowych tworzymy tylko, gdy schemat jest nieaktualny
+        from app.schema import SchemaManager
+        SchemaManager.startup(app)
 
-        if User.query.first() is None:
-            for u in TEST_USERS:
-                AuthManager.create_user(
-                    username=u["username"],
-                    email=u["email"],
-                    password=u["password"],
-                    first_name=u["first_name"],
-                    last_name=u["last_name"],
-                    role=u["role"],
-                )
+        # Czasy logowania zapisywane wsadowo co kilka sekund (i przy zamknięciu)
+        from app.writebehind import last_login_buffer
+        last_login_buffer.init_app(app)
 
     # Rejestrujemy blueprinty (zestawy tras) z routes.py
     from app.routes import auth_bp, main_bp
@@ -62,5 +89,37 @@ def create_app():
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
 
+    # Pomiary: liczba zapytań SQL, czasy, nagłówek Server-Timing, /metrics
+    if app.config["INSTRUMENTATION_ENABLED"]:
+        from app.instrumentation import request_metrics
+
+        request_metrics.init_app(app)
+
+    # Zalogowany użytkownik raz na żądanie w `g` (+ krótkotrwała pamięć podręczna ról).
+    # Po pomiarach – zapytanie o użytkownika też trafia do statystyk żądania.
+    from app.identity import identity_cache
+
+    identity_cache.init_app(app)
+
+    # Tygodnie planu zajęć studentów (unieważniane po zmianach lekcji i zapisów)
+    from app.timetable import timetable_cache
+
+    timetable_cache.init_app(app)
+
+    # Indeks terminów lekcji do wykrywania kolizji (sala, prowadzący, studenci)
+    from app.scheduling import schedule_index
+
+    schedule_index.init_app(app)
+
+    # Numery zmian planu – ETag kalendarzy ICS i synchronizacja kalendarza
+    from app.changes import lesson_changes
+
+    lesson_changes.init_app(app)
+
+    # Komendy CLI (flask --app app ...)
+    from app.commands import register_commands
+
+    register_commands(app)
+
     return app
 
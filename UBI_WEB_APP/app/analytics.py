@@ -0,0 +1,328 @@
+"""
+app/analytics.py
+----------------
+Statystyki rozkładu ocen dla grup (ClassGroup) i kursów (Course):
+liczba ocen i studentów, średnia zwykła i ważona, mediana, percentyle,
+odsetek studentów, którzy zaliczyli (średnia ważona >= GRADE_PASS_THRESHOLD),
+oraz histogram według skali ocen (GRADE_SCALE).
+
+- oceny pobieramy JEDNYM zapytaniem (bez JOIN-a), strumieniowo (paczkami `fetchmany`),
+  prosto do kolumn NumPy – bez obiektów ORM,
+- statystyki liczymy dla wszystkich grup/kursów naraz (`np.bincount`
+  i dwa sortowania liczb całkowitych) – bez pętli po grupach,
+- bez NumPy (pakiet opcjonalny) liczymy to samo zwykłą pętlą w Pythonie
+  (`compute_python` – także punkt odniesienia w benchmarku).
+"""
+
+import math
+
+from app import db
+from config import GRADE_PASS_THRESHOLD, GRADE_SCALE
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - zależy od środowiska
+    np = None
+
+# Percentyle w raporcie (50 = mediana)
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Wierszy w jednej paczce strumienia z bazy
+FETCH_SIZE = 50_000
+
+LEVELS = ("group", "course")
+
+# Oceny bez JOIN-a z grupami (przy pełnym raporcie to skan samej tabeli
+# `grades`); kurs grupy dokładamy z małej tablicy przejść (_GROUPS_SQL).
+_GRADES_SQL = """
+    SELECT gr.group_id, gr.student_id, gr.value, COALESCE(gr.weight, 1.0)
+    FROM grades AS gr
+    {where}
+"""
+
+_GROUPS_SQL = """
+    SELECT g.id, g.course_id
+    FROM class_groups AS g
+    {where}
+"""
+
+_LABELS_SQL = {
+    "group": """
+        SELECT g.id, g.name || ' (' || c.code || ')'
+        FROM class_groups AS g JOIN courses AS c ON c.id = g.course_id
+        {where}
+    """,
+    "course": """
+        SELECT c.id, c.code || ' – ' || c.name
+        FROM courses AS c
+        WHERE c.id IN (SELECT g.course_id FROM class_groups AS g {where})
+    """,
+}
+
+
+def _scope(course_id=None, group_id=None, group_lecturer_id=None, course_lecturer_id=None):
+    """Warunek WHERE (na aliasie `g` = class_groups) i parametry zapytania."""
+    conditions, params = [], {}
+    if course_id is not None:
+        conditions.append("g.course_id = :course_id")
+        params["course_id"] = course_id
+    if group_id is not None:
+        conditions.append("g.id = :group_id")
+        params["group_id"] = group_id
+    if group_lecturer_id is not None:
+        conditions.append("g.lecturer_id = :group_lecturer_id")
+        params["group_lecturer_id"] = group_lecturer_id
+    if course_lecturer_id is not None:
+        conditions.append("g.course_id IN (SELECT id FROM courses WHERE lecturer_id = :course_lecturer_id)")
+        params["course_lecturer_id"] = course_lecturer_id
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+
+def _fetch_chunks(sql: str, params: dict):
+    """
+    Wiersze zapytania paczkami po FETCH_SIZE – zwykłe krotki prosto z kursora
+    DB-API (zapytanie idzie przez silnik, więc widzą je liczniki zapytań
+    i EXPLAIN w check-indexes). Przy milionach ocen tworzenie obiektów `Row`
+    SQLAlchemy kosztuje kilka razy więcej niż samo zapytanie.
+    """
+    result = db.session.connection().exec_driver_sql(sql, params)
+    try:
+        while True:
+            chunk = result.cursor.fetchmany(FETCH_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        result.close()
+
+
+def _dense_index(ids):
+    """
+    Kolejne numery 0..n-1 dla identyfikatorów (klucze główne >= 0) – tablica
+    przejść zamiast sortowania w np.unique.
+
+    Zwraca:
+        (posortowane różne id, indeks każdego wiersza)
+    """
+    present = np.bincount(ids) > 0
+    unique = np.flatnonzero(present)
+    lookup = np.zeros(len(present), dtype=np.int64)
+    lookup[unique] = np.arange(len(unique))
+    return unique, lookup[ids]
+
+
+def _percentile(sorted_values, q: float) -> float:
+    """Percentyl z interpolacją liniową (jak domyślnie w NumPy)."""
+    position = (len(sorted_values) - 1) * q
+    low, high = math.floor(position), math.ceil(position)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def _bin(value: float) -> int:
+    """Indeks przedziału skali ocen: najwyższa ocena ze skali <= value."""
+    index = 0
+    for i, grade in enumerate(GRADE_SCALE):
+        if value >= grade:
+            index = i
+    return index
+
+
+class CohortStats:
+    """Metody do liczenia statystyk ocen grup i kursów."""
+
+    @staticmethod
+    def available_engine() -> str:
+        return "numpy" if np is not None else "python"
+
+    @staticmethod
+    def load(engine: str = None, **scope):
+        """
+        Pobiera oceny (kurs, grupa, student, wartość, waga) jednym zapytaniem,
+        paczkami po FETCH_SIZE wierszy (plus krótka lista grup z ich kursami).
+
+        Parametry:
+            engine – "numpy" (kolumny jako tablice) albo "python" (lista krotek),
+            scope  – course_id, group_id, group_lecturer_id, course_lecturer_id.
+
+        Zwraca:
+            dla "numpy": słownik tablic {"course", "group", "student", "value", "weight"},
+            dla "python": listę krotek w tej samej kolejności kolumn.
+        """
+        engine = engine or CohortStats.available_engine()
+        where, params = _scope(**scope)
+        groups = db.session.execute(db.text(_GROUPS_SQL.format(where=where)), params).all()
+        grades_where = f"WHERE gr.group_id IN (SELECT g.id FROM class_groups AS g {where})" if where else ""
+        chunks = _fetch_chunks(_GRADES_SQL.format(where=grades_where), params)
+
+        if engine == "python":
+            course_of = dict(groups)
+            rows = []
+            for chunk in chunks:
+                rows.extend((course_of[row[0]],) + row for row in chunk)
+            return rows
+
+        group_ids, students = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+        values, weights = [np.empty(0)], [np.empty(0)]
+        for chunk in chunks:
+            array = np.array(chunk, dtype=np.float64)
+            group_ids.append(array[:, 0].astype(np.int64))
+            students.append(array[:, 1].astype(np.int64))
+            values.append(array[:, 2])
+            weights.append(array[:, 3])
+
+        group_ids = np.concatenate(group_ids)
+        course_of = np.zeros(max((group for group, _course in groups), default=-1) + 1, dtype=np.int64)
+        for group, course in groups:
+            course_of[group] = course
+        return {
+            "course": course_of[group_ids],
+            "group": group_ids,
+            "student": np.concatenate(students),
+            "value": np.concatenate(values),
+            "weight": np.concatenate(weights),
+        }
+
+    @staticmethod
+    def compute(columns: dict, level: str = "group") -> list:
+        """
+        Statystyki wszystkich grup albo kursów naraz (NumPy).
+
+        - sumy (liczba ocen, średnie) – `np.bincount` z wagami, bez sortowania,
+        - mediana, percentyle – jedno sortowanie liczb całkowitych
+          (indeks grupy × liczba różnych ocen + indeks oceny),
+        - zaliczenia – sumy per (grupa, student), pary numerowane jednym sortowaniem.
+
+        Zwraca:
+            listę słowników (posortowaną po id) – patrz `_item`.
+        """
+        students, values, weights = columns["student"], columns["value"], columns["weight"]
+        if len(values) == 0:
+            return []
+        key_ids, key = _dense_index(columns[level])
+        size = len(key_ids)
+
+        counts = np.bincount(key, minlength=size)
+        mean = np.bincount(key, weights=values, minlength=size) / counts
+        weight_sum = np.bincount(key, weights=weights, minlength=size)
+        weighted_values = values * weights
+        weighted = np.bincount(key, weights=weighted_values, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weighted_mean = np.where(weight_sum > 0, weighted / weight_sum, np.nan)
+
+        # Wartości posortowane w obrębie grupy: oceny przyjmują niewiele różnych
+        # wartości, więc sortujemy liczby całkowite (grupa, indeks wartości).
+        # Bez `sorted=False` w np.unique – ten argument jest dopiero od NumPy 2.3.
+        levels = np.unique(values)
+        level = np.searchsorted(levels, values)
+        ordered = levels[np.sort(key * len(levels) + level) % len(levels)]
+        starts = np.cumsum(counts) - counts
+        percentiles = {}
+        for p in PERCENTILES:
+            position = (counts - 1) * (p / 100)
+            low = np.floor(position).astype(np.int64)
+            high = np.ceil(position).astype(np.int64)
+            lower = ordered[starts + low]
+            percentiles[p] = lower + (ordered[starts + high] - lower) * (position - low)
+
+        level_bins = np.clip(np.searchsorted(GRADE_SCALE, levels, side="right") - 1, 0, len(GRADE_SCALE) - 1)
+        histogram = np.bincount(key * len(GRADE_SCALE) + level_bins[level],
+                                minlength=size * len(GRADE_SCALE)).reshape(size, len(GRADE_SCALE))
+
+        # Średnia ważona każdego studenta w grupie: numer pary (grupa, student)
+        # z jednego sortowania, sumy – znowu `np.bincount`
+        stride = int(students.max()) + 1
+        pair = key * stride + students
+        order = np.argsort(pair)
+        sorted_pair = pair[order]
+        first = np.r_[True, sorted_pair[1:] != sorted_pair[:-1]]
+        pair_index = np.empty_like(order)
+        pair_index[order] = np.cumsum(first) - 1
+        student_weights = np.bincount(pair_index, weights=weights)
+        student_weighted = np.bincount(pair_index, weights=weighted_values)
+        passed = (student_weights > 0) & (student_weighted >= GRADE_PASS_THRESHOLD * student_weights)
+        pair_key = sorted_pair[first] // stride
+        student_counts = np.bincount(pair_key, minlength=size)
+        passed_counts = np.bincount(pair_key, weights=passed, minlength=size)
+
+        rows = zip(
+            key_ids.tolist(), counts.tolist(), student_counts.tolist(), mean.tolist(),
+            weighted_mean.tolist(), *(percentiles[p].tolist() for p in PERCENTILES),
+            (passed_counts / student_counts).tolist(), histogram.tolist(),
+        )
+        return [CohortStats._item(*row) for row in rows]
+
+    @staticmethod
+    def compute_python(rows: list, level: str = "group") -> list:
+        """To samo co `compute`, zwykłą pętlą po wierszach (bez NumPy)."""
+        key_column = 0 if level == "course" else 1
+        groups = {}
+        for row in rows:
+            groups.setdefault(row[key_column], []).append(row)
+
+        items = []
+        for key in sorted(groups):
+            grades = groups[key]
+            values = sorted(row[3] for row in grades)
+            weight_sum = sum(row[4] for row in grades)
+            weighted_mean = (sum(row[3] * row[4] for row in grades) / weight_sum) if weight_sum > 0 else math.nan
+
+            per_student = {}
+            for _course, _group, student, value, weight in grades:
+                totals = per_student.setdefault(student, [0.0, 0.0])
+                totals[0] += value * weight
+                totals[1] += weight
+            passed = sum(1 for total, wsum in per_student.values()
+                         if wsum > 0 and total >= GRADE_PASS_THRESHOLD * wsum)
+
+            histogram = [0] * len(GRADE_SCALE)
+            for value in values:
+                histogram[_bin(value)] += 1
+
+            items.append(CohortStats._item(
+                key, len(values), len(per_student), sum(values) / len(values), weighted_mean,
+                *(_percentile(values, p / 100) for p in PERCENTILES),
+                passed / len(per_student), histogram,
+            ))
+        return items
+
+    @staticmethod
+    def _item(key, count, students, mean, weighted_mean, *rest) -> dict:
+        """Jeden wiersz raportu (ten sam format dla NumPy i Pythona)."""
+        *percentiles, pass_rate, histogram = rest
+        return {
+            "id": key,
+            "grades": count,
+            "students": students,
+            "mean": mean,
+            "weighted_mean": None if math.isnan(weighted_mean) else weighted_mean,
+            "median": percentiles[PERCENTILES.index(50)],
+            "percentiles": {f"p{p}": value for p, value in zip(PERCENTILES, percentiles)},
+            "pass_rate": pass_rate,
+            "histogram": {f"{grade:.1f}": n for grade, n in zip(GRADE_SCALE, histogram)},
+        }
+
+    @staticmethod
+    def report(level: str = "group", **scope) -> dict:
+        """
+        Raport dla widoku/API: statystyki + nazwy grup/kursów.
+
+        Zwraca:
+            {"level", "engine", "grades", "items": [{..., "label"}, ...]}
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Nieznany poziom raportu: {level!r} (dozwolone: {', '.join(LEVELS)})")
+        engine = CohortStats.available_engine()
+        data = CohortStats.load(engine, **scope)
+        if engine == "numpy":
+            items = CohortStats.compute(data, level)
+            total = len(data["value"])
+        else:
+            items = CohortStats.compute_python(data, level)
+            total = len(data)
+
+        where, params = _scope(**scope)
+        labels = dict(db.session.execute(db.text(_LABELS_SQL[level].format(where=where)), params).all())
+        for item in items:
+            item["label"] = labels.get(item["id"])
+        return {"level": level, "engine": engine, "grades": total, "items": items}
@@ -2,16 +2,212 @@
 app/auth.py
 ----------------
 Logika związana z autoryzacją:
-- haszowanie hasła,
-- logowanie,
+- haszowanie hasła (rejestr algorytmów z wersjonowanymi prefiksami),
+- logowanie (weryfikacja hasła w ograniczonej puli wątków),
 - tworzenie użytkownika (używane dla kont testowych).
 """
 
+import abc
+import base64
 import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 
 from app import db
 from app.models import User, UserRole
+from app.writebehind import last_login_buffer
+from config import (
+    PASSWORD_HASHER,
+    PASSWORD_VERIFY_WORKERS,
+    PASSWORD_VERIFY_QUEUE,
+    PASSWORD_VERIFY_TIMEOUT,
+)
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _new_salt() -> str:
+    """Losowa sól (16 bajtów) zapisana jako tekst base64."""
+    return _b64(os.urandom(16))
+
+
+class PasswordPoolBusy(RuntimeError):
+    """Pula haszująca jest pełna albo nie policzyła wyniku w PASSWORD_VERIFY_TIMEOUT sekund."""
+
+
+class AccountDisabled(RuntimeError):
+    """Poprawne hasło, ale konto zostało wyłączone przez admina."""
+
+
+class PasswordHasher(abc.ABC):
+    """
+    Bazowa klasa algorytmu haszowania haseł.
+
+    Zapisany hash ma postać `<algorytm>$<parametry...>$<sól>$<hash>`,
+    więc po prefiksie wiemy, którym algorytmem (i z jakimi parametrami) go utworzono.
+    """
+    algorithm = None
+
+    @abc.abstractmethod
+    def encode(self, password: str) -> str:
+        """Hash hasła razem z prefiksem algorytmu i parametrami."""
+
+    @abc.abstractmethod
+    def verify(self, password: str, encoded: str) -> bool:
+        """Czy hasło pasuje do zapisanego hasha."""
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """Czy hash został utworzony ze słabszymi parametrami niż obecne."""
+        return False
+
+
+class LegacySHA256Hasher(PasswordHasher):
+    """
+    Stary format: sam SHA-256 (hex) bez soli i bez prefiksu.
+
+    Zostawiony tylko po to, żeby dało się zalogować na stare konta –
+    przy udanym logowaniu hash jest od razu podmieniany na nowy.
+    """
+    algorithm = "sha256"
+
+    def encode(self, password: str) -> str:
+        return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+    def verify(self, password: str, encoded: str) -> bool:
+        return hmac.compare_digest(self.encode(password), encoded)
+
+
+class PBKDF2Hasher(PasswordHasher):
+    """PBKDF2-HMAC-SHA256 z biblioteki standardowej."""
+    algorithm = "pbkdf2_sha256"
+    iterations = 600_000
+
+    def _digest(self, password: str, salt: str, iterations: int) -> str:
+        raw = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), iterations)
+        return _b64(raw)
+
+    def encode(self, password: str) -> str:
+        salt = _new_salt()
+        digest = self._digest(password, salt, self.iterations)
+        return f"{self.algorithm}${self.iterations}${salt}${digest}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, iterations, salt, expected = encoded.split("$")
+        return hmac.compare_digest(self._digest(password, salt, int(iterations)), expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        return int(encoded.split("$")[1]) != self.iterations
+
+
+class ScryptHasher(PasswordHasher):
+    """scrypt z biblioteki standardowej (kosztowny pamięciowo, domyślny)."""
+    algorithm = "scrypt"
+    n = 2 ** 14
+    r = 8
+    p = 1
+
+    def _digest(self, password: str, salt: str, n: int, r: int, p: int) -> str:
+        raw = hashlib.scrypt(
+            password.encode("utf-8"),
+            salt=salt.encode("ascii"),
+            n=n, r=r, p=p,
+            maxmem=64 * 1024 * 1024,
+        )
+        return _b64(raw)
+
+    def encode(self, password: str) -> str:
+        salt = _new_salt()
+        digest = self._digest(password, salt, self.n, self.r, self.p)
+        return f"{self.algorithm}${self.n}${self.r}${self.p}${salt}${digest}"
+
+    def verify(self, password: str, encoded: str) -> bool:
+        _, n, r, p, salt, expected = encoded.split("$")
+        return hmac.compare_digest(self._digest(password, salt, int(n), int(r), int(p)), expected)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        _, n, r, p, _salt, _digest = encoded.split("$")
+        return (int(n), int(r), int(p)) != (self.n, self.r, self.p)
+
+
+# Rejestr algorytmów: prefiks zapisany w hashu -> obiekt haszujący.
+PASSWORD_HASHERS = {}
+
+
+def register_hasher(hasher: PasswordHasher) -> PasswordHasher:
+    """Dodaje algorytm do rejestru (można tak podpiąć np. argon2)."""
+    PASSWORD_HASHERS[hasher.algorithm] = hasher
+    return hasher
+
+
+register_hasher(LegacySHA256Hasher())
+register_hasher(PBKDF2Hasher())
+register_hasher(ScryptHasher())
+
+# Hash losowego hasła liczony raz przy imporcie. Logowanie na nieistniejący
+# login sprawdza hasło z tym hashem, żeby trwało tyle samo co na istniejący
+# (inaczej czas odpowiedzi zdradza, które loginy są w bazie).
+_DUMMY_HASH = PASSWORD_HASHERS[PASSWORD_HASHER].encode(_b64(os.urandom(16)))
+
+
+def identify_hasher(encoded: str):
+    """
+    Zwraca obiekt haszujący pasujący do zapisanego hasha.
+
+    Hash bez prefiksu to stary format SHA-256.
+    """
+    if "$" not in encoded:
+        return PASSWORD_HASHERS.get(LegacySHA256Hasher.algorithm)
+    return PASSWORD_HASHERS.get(encoded.split("$", 1)[0])
+
+
+# Pula wątków do liczenia KDF. hashlib zwalnia GIL podczas liczenia,
+# więc kilka logowań liczy się równolegle, ale nigdy więcej niż
+# PASSWORD_VERIFY_WORKERS naraz – reszta wątków serwera obsługuje inne żądania.
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(PASSWORD_VERIFY_WORKERS + PASSWORD_VERIFY_QUEUE)
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=PASSWORD_VERIFY_WORKERS,
+                    thread_name_prefix="password-hasher",
+                )
+    return _pool
+
+
+def _run_in_pool(func, *args):
+    """
+    Wykonuje `func(*args)` w puli haszującej i czeka na wynik.
+
+    Jeśli kolejka jest pełna albo wynik nie przyjdzie w PASSWORD_VERIFY_TIMEOUT
+    sekund, rzuca PasswordPoolBusy zamiast blokować wątek żądania – to nie
+    to samo co błędne hasło.
+    """
+    if not _pool_slots.acquire(blocking=False):
+        raise PasswordPoolBusy("kolejka haszowania jest pełna")
+
+    try:
+        future = _get_pool().submit(func, *args)
+    except RuntimeError:
+        _pool_slots.release()
+        raise PasswordPoolBusy("pula haszowania jest zamknięta")
+    future.add_done_callback(lambda _f: _pool_slots.release())
+
+    try:
+        return future.result(timeout=PASSWORD_VERIFY_TIMEOUT)
+    except FutureTimeoutError:
+        raise PasswordPoolBusy("przekroczony czas weryfikacji hasła") from None
 
 
 class AuthManager:
@@ -20,39 +216,84 @@ class AuthManager:
     @staticmethod
     def hash_password(password: str) -> str:
         """
-        Zwraca hash hasła (SHA256).
-
-        Uwaga: w projekcie produkcyjnym użyj raczej bcrypt / argon2,
-        tutaj dla prostoty stosujemy SHA256.
+        Zwraca hash hasła algorytmem ustawionym w config.PASSWORD_HASHER
+        (domyślnie scrypt, z losową solą i prefiksem algorytmu).
         """
-        return hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return PASSWORD_HASHERS[PASSWORD_HASHER].encode(password)
 
     @staticmethod
     def verify_password(password: str, password_hash: str) -> bool:
         """
         Sprawdza, czy podane hasło odpowiada zapisanemu hashowi.
+
+        Porównanie odbywa się w stałym czasie (hmac.compare_digest).
         """
-        return AuthManager.hash_password(password) == password_hash
+        hasher = identify_hasher(password_hash or "")
+        if hasher is None:
+            return False
+        try:
+            return hasher.verify(password, password_hash)
+        except ValueError:
+            # Uszkodzony / nieznany format hasha
+            return False
+
+    @staticmethod
+    def needs_rehash(password_hash: str) -> bool:
+        """
+        Czy hash trzeba przeliczyć (inny algorytm albo słabsze parametry
+        niż obecnie skonfigurowane).
+        """
+        hasher = identify_hasher(password_hash or "")
+        if hasher is None or hasher.algorithm != PASSWORD_HASHER:
+            return True
+        try:
+            return hasher.needs_rehash(password_hash)
+        except ValueError:
+            return True
 
     @staticmethod
     def login(username: str, password: str):
         """
         Próbuje zalogować użytkownika.
 
+        Hasło weryfikowane jest w puli wątków haszujących. Jeśli hash
+        jest w starym formacie, po poprawnym logowaniu zapisujemy nowy.
+
         Zwraca:
             (success: bool, user: User | None)
+
+        Rzuca:
+            PasswordPoolBusy – pula haszująca jest przeciążona (hasło nie zostało sprawdzone),
+            AccountDisabled – hasło poprawne, ale konto jest wyłączone.
         """
         user = User.query.filter_by(username=username).first()
 
         if not user:
+            # Ten sam koszt KDF co przy istniejącym loginie
+            _run_in_pool(AuthManager.verify_password, password, _DUMMY_HASH)
             return False, None
 
-        if not AuthManager.verify_password(password, user.password_hash):
+        if not _run_in_pool(AuthManager.verify_password, password, user.password_hash):
             return False, None
 
-        # Aktualizujemy czas ostatniego logowania
-        user.last_login = datetime.now()
-        db.session.commit()
+        # Dopiero po sprawdzeniu hasła: bez niego odpowiedź wygląda jak dla
+        # nieistniejącego loginu (ten sam komunikat i ten sam koszt KDF – _DUMMY_HASH)
+        if not user.is_active:
+            raise AccountDisabled(user.username)
+
+        # Hasło jest poprawne, więc możemy przeliczyć hash nowym algorytmem
+        # (jednorazowy zapis – tylko dla starych hashy)
+        if AuthManager.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = _run_in_pool(AuthManager.hash_password, password)
+                db.session.commit()
+            except PasswordPoolBusy:
+                # Logowanie i tak się udało – przeliczymy przy następnym
+                pass
+
+        # Czas ostatniego logowania trafia do bufora zapisywanego wsadowo
+        # (app/writebehind.py) – samo logowanie nie otwiera transakcji zapisu
+        last_login_buffer.record(user.id, datetime.now())
 
         return True, user
 
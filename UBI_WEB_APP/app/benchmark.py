@@ -0,0 +1,617 @@
+"""
+app/benchmark.py
+----------------
+Benchmark tras HTTP na dużej, wygenerowanej bazie (patrz app/datagen.py).
+
+Każda trasa z `auth_bp` i `main_bp` jest wywoływana wielokrotnie przez
+klienta testowego (pełny stos WSGI: routing, sesja, widok, szablon), a my
+mierzymy:
+- opóźnienia p50 / p95 / p99,
+- liczbę zapytań SQL na żądanie,
+- szczytowe zużycie pamięci (tracemalloc, osobny przebieg).
+
+Wynik można zapisać jako bazowy (JSON) i porównywać z nim kolejne przebiegi –
+trasa, która zwolni ponad `tolerance` razy albo zacznie wykonywać więcej
+zapytań, oznacza regresję.
+
+Osobno mierzymy zimny start: `create_app()` w świeżym procesie Pythona
+(import modułów + inicjalizacja aplikacji + zapytania wykonane przy starcie)
+oraz przepustowość serwera produkcyjnego (serve.py) dla różnej liczby procesów
+i opóźnienia czytelników SQLite podczas ciągłych zapisów (profile PRAGMA).
+
+Uruchomienie:
+    flask --app app generate-data --students 100000 --database bench.db
+    flask --app app benchmark --database bench.db --save-baseline benchmarks/baseline.json
+    flask --app app benchmark --database bench.db --baseline benchmarks/baseline.json
+    flask --app app startup-time --database bench.db
+    flask --app app throughput --database bench.db --workers 1,2,4,8
+    flask --app app sqlite-concurrency --database bench.db
+    flask --app app grade-stats-benchmark --database bench.db
+"""
+
+import http.client
+import json
+import math
+import os
+import random
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from app import create_app, db
+from app.querycheck import QueryCounter, logged_in_client
+from app.sqlite_pragmas import SQLitePragmas
+from config import BASE_DIR
+
+# Hasło kont z generatora danych
+BENCH_PASSWORD = "pass123"
+
+
+def percentile(values, pct: float) -> float:
+    """Percentyl metodą najbliższej rangi (values nie muszą być posortowane)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def pick_fixtures() -> dict:
+    """
+    Wybiera z bazy reprezentatywne dane: admina, wykładowcę z największą grupą,
+    studenta z największą liczbą zapisów oraz tydzień, w którym mają zajęcia.
+    """
+    from app.models import ClassGroup, Enrollment, Lesson, User, UserRole
+
+    admin = User.query.filter_by(role=UserRole.ADMIN, is_active=True).order_by(User.id).first()
+
+    group_size = db.func.count(Enrollment.id)
+    biggest = (
+        db.session.query(Enrollment.group_id, group_size)
+        .filter(Enrollment.is_active.is_(True))
+        .group_by(Enrollment.group_id)
+        .order_by(group_size.desc())
+        .first()
+    )
+    group = db.session.get(ClassGroup, biggest[0]) if biggest else ClassGroup.query.first()
+
+    busiest = (
+        db.session.query(Enrollment.student_id)
+        .join(User, User.id == Enrollment.student_id)
+        .filter(Enrollment.is_active.is_(True), User.is_active.is_(True))
+        .group_by(Enrollment.student_id)
+        .order_by(db.func.count(Enrollment.id).desc())
+        .first()
+    )
+    student = db.session.get(User, busiest[0]) if busiest else None
+
+    first_lesson = None
+    if group is not None:
+        first_lesson = (
+            Lesson.query.filter_by(group_id=group.id).order_by(Lesson.start_time.asc()).first()
+        )
+    week_start = None
+    if first_lesson is not None:
+        day = first_lesson.start_time.date()
+        week_start = day - timedelta(days=day.weekday())
+
+    return {
+        "admin": (admin.id, admin.username) if admin else None,
+        "lecturer": (group.lecturer.id, group.lecturer.username) if group else None,
+        "student": (student.id, student.username) if student else None,
+        "group_id": group.id if group else None,
+        "week_start": week_start.isoformat() if week_start else None,
+        "week_end": (week_start + timedelta(days=7)).isoformat() if week_start else None,
+        "search": student.last_name[:3] if student else "a",
+    }
+
+
+def benchmark_routes(f: dict):
+    """
+    Lista tras do zmierzenia: (nazwa, rola lub None, metoda, URL, dane formularza).
+    Trasy wymagające brakujących danych są pomijane.
+    """
+    routes = [
+        ("login_form", None, "GET", "/login", None),
+        ("calendar_view", "student", "GET", "/calendar", None),
+        ("dashboard", "student", "GET", "/dashboard", None),
+        ("admin_panel", "admin", "GET", "/admin", None),
+        ("admin_users", "admin", "GET", "/admin/users", None),
+        ("admin_users_students_by_name", "admin", "GET", "/admin/users?role=student&active=1&sort=last_name", None),
+        ("admin_courses", "admin", "GET", "/admin/courses", None),
+        ("admin_groups", "admin", "GET", "/admin/groups", None),
+        ("admin_search_students", "admin", "GET", f"/admin/api/students/search?q={f['search']}", None),
+        ("lecturer_courses", "lecturer", "GET", "/lecturer/courses", None),
+    ]
+    if f["student"]:
+        routes.append(("login_submit", None, "POST", "/login",
+                       {"username": f["student"][1], "password": BENCH_PASSWORD}))
+    if f["group_id"]:
+        routes += [
+            ("admin_group_students", "admin", "GET", f"/admin/groups/{f['group_id']}/students", None),
+            ("lecturer_group_details", "lecturer", "GET", f"/lecturer/groups/{f['group_id']}", None),
+        ]
+    if f["week_start"]:
+        week = f"start={f['week_start']}&end={f['week_end']}"
+        routes += [
+            ("api_calendar_events_lecturer", "lecturer", "GET", f"/api/calendar/events?{week}", None),
+            ("api_calendar_events_student", "student", "GET", f"/api/calendar/events?{week}", None),
+        ]
+    return [r for r in routes if r[1] is None or f[r[1]]]
+
+
+def run_benchmark(database_uri: str, iterations: int = 30, warmup: int = 3, progress=None) -> dict:
+    """
+    Mierzy wszystkie trasy na wskazanej bazie.
+
+    Zwraca:
+        {nazwa_trasy: {"p50_ms", "p95_ms", "p99_ms", "queries", "peak_kib", "status"}}
+    """
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": database_uri,
+        "METRICS_ENDPOINT_ENABLED": False,
+        "SLOW_QUERY_THRESHOLD_MS": None,
+        "SCHEMA_STARTUP_MODE": "auto",
+    })
+
+    with app.app_context():
+        fixtures = pick_fixtures()
+        engine = db.engine
+
+    results = {}
+    for name, role, method, url, form in benchmark_routes(fixtures):
+        if role:
+            user_id, username = fixtures[role]
+            client = logged_in_client(app, user_id, username, role)
+        else:
+            client = app.test_client()
+
+        def call():
+            return client.open(url, method=method, data=form)
+
+        for _ in range(warmup):
+            call()
+
+        timings = []
+        with QueryCounter(engine) as counter:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                response = call()
+                timings.append((time.perf_counter() - started) * 1000)
+
+        # Pamięć mierzymy osobno – tracemalloc mocno spowalnia wykonanie
+        tracemalloc.start()
+        call()
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "p99_ms": round(percentile(timings, 99), 2),
+            "queries": round(counter.queries / iterations, 1),
+            "peak_kib": round(peak / 1024, 1),
+            "status": response.status_code,
+        }
+        if progress:
+            progress(name, results[name])
+
+    with app.app_context():
+        db.engine.dispose()
+
+    return results
+
+
+# Skrypt wykonywany w osobnym procesie – mierzy import i create_app()
+_STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+queries = []
+event.listen(Engine, "after_cursor_execute", lambda *a: queries.append(1))
+from app import create_app
+imported = time.perf_counter()
+create_app(json.loads(sys.argv[1]))
+created = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000,
+                  "create_app_ms": (created - imported) * 1000,
+                  "queries": len(queries)}))
+"""
+
+
+def measure_startup(database_uri: str, mode: str = "verify", runs: int = 5) -> dict:
+    """
+    Mierzy zimny start aplikacji: każdy pomiar to nowy proces Pythona.
+
+    Zwraca:
+        {"import_ms", "create_app_ms", "total_ms", "queries"} – mediany z `runs` pomiarów.
+    """
+    overrides = json.dumps({
+        "SQLALCHEMY_DATABASE_URI": database_uri,
+        "SCHEMA_STARTUP_MODE": mode,
+    })
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, overrides],
+            cwd=BASE_DIR, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            lines = proc.stderr.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f"kod wyjścia {proc.returncode}")
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    result = {
+        key: round(percentile([s[key] for s in samples], 50), 1)
+        for key in ("import_ms", "create_app_ms")
+    }
+    result["total_ms"] = round(result["import_ms"] + result["create_app_ms"], 1)
+    result["queries"] = samples[-1]["queries"]
+    return result
+
+
+def login_cookie(host: str, port: int, username: str, password: str) -> str:
+    """Loguje się formularzem i zwraca nagłówek Cookie z sesją."""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    body = urlencode({"username": username, "password": password})
+    conn.request("POST", "/login", body, {"Content-Type": "application/x-www-form-urlencoded"})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    cookie = response.getheader("Set-Cookie")
+    if response.status != 302 or not cookie:
+        raise RuntimeError(f"Logowanie {username} nie powiodło się (HTTP {response.status})")
+    return cookie.split(";", 1)[0]
+
+
+def run_load(host: str, port: int, paths, cookie: str, concurrency: int = 16, duration: float = 10.0) -> dict:
+    """
+    Obciąża działający serwer: `concurrency` klientów, każdy z własnym
+    połączeniem keep-alive, wywołuje po kolei `paths` przez `duration` sekund.
+
+    Zwraca:
+        {"requests", "rps", "p50_ms", "p99_ms", "rejected" (503), "errors"}
+    """
+    deadline = time.perf_counter() + duration
+    lock = threading.Lock()
+    timings, counters = [], {"rejected": 0, "errors": 0}
+
+    def client(offset):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local, i = [], offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path, headers={"Cookie": cookie})
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    counters["errors"] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            if response.status == 503:
+                with lock:
+                    counters["rejected"] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            if response.status >= 400:
+                with lock:
+                    counters["errors"] += 1
+            local.append((time.perf_counter() - started) * 1000)
+        conn.close()
+        with lock:
+            timings.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(timings),
+        "rps": round(len(timings) / elapsed, 1),
+        "p50_ms": round(percentile(timings, 50), 1) if timings else None,
+        "p99_ms": round(percentile(timings, 99), 1) if timings else None,
+        **counters,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_server(host: str, port: int, proc, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Serwer zakończył się kodem {proc.returncode}")
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                pass
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            conn.request("GET", "/login")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Serwer nie wystartował w wyznaczonym czasie")
+
+
+def measure_throughput(database: str, workers_list=(1, 2, 4), threads: int = 8,
+                       concurrency: int = 16, duration: float = 10.0, progress=None):
+    """
+    Uruchamia serve.py na wygenerowanej bazie kolejno z różną liczbą procesów
+    roboczych i mierzy przepustowość typowego ruchu studenta
+    (pulpit, kalendarz, zdarzenia kalendarza na tydzień).
+
+    Zwraca:
+        listę {"workers", "threads", "rps", "p50_ms", "p99_ms", "requests", "rejected", "errors"}.
+    """
+    database = os.path.abspath(database)
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{database}",
+        "SCHEMA_STARTUP_MODE": "auto",
+        "SLOW_QUERY_THRESHOLD_MS": None,
+    })
+    with app.app_context():
+        fixtures = pick_fixtures()
+        db.engine.dispose()
+    if not fixtures["student"]:
+        raise RuntimeError("W bazie nie ma aktywnego studenta z zapisami (uruchom generate-data)")
+
+    paths = ["/dashboard", "/calendar"]
+    if fixtures["week_start"]:
+        paths.append(f"/api/calendar/events?start={fixtures['week_start']}&end={fixtures['week_end']}")
+
+    host = "127.0.0.1"
+    results = []
+    for workers in workers_list:
+        port = _free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "serve.py", "--database", database, "--host", host, "--port", str(port),
+             "--workers", str(workers), "--threads", str(threads), "--no-access-log"],
+            cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for_server(host, port, proc)
+            cookie = login_cookie(host, port, fixtures["student"][1], BENCH_PASSWORD)
+            result = {"workers": workers, "threads": threads,
+                      **run_load(host, port, paths, cookie, concurrency, duration)}
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+        results.append(result)
+        if progress:
+            progress(result)
+    return results
+
+
+def _reader(path, pragmas, group_ids, deadline, timings, errors, lock):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    SQLitePragmas.apply(conn, pragmas)
+    rng = random.Random()
+    local = []
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            # Jak kalendarz grupy: krótkie zapytanie po indeksie
+            conn.execute(
+                "SELECT id, title, start_time FROM lessons WHERE group_id = ? ORDER BY start_time",
+                (rng.choice(group_ids),),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            with lock:
+                errors["readers"] += 1
+            continue
+        local.append((time.perf_counter() - started) * 1000)
+    conn.close()
+    with lock:
+        timings.extend(local)
+
+
+def _writer(path, pragmas, group_ids, student_id, deadline, batch, counters, lock):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    SQLitePragmas.apply(conn, pragmas)
+    rng = random.Random(1)
+    while time.perf_counter() < deadline:
+        group_id = rng.choice(group_ids)
+        try:
+            # Jak wystawienie ocen całej grupie: jedna transakcja, wiele wierszy
+            conn.executemany(
+                "INSERT INTO grades (student_id, group_id, label, value, weight, created_at) "
+                "VALUES (?, ?, 'Benchmark', 4.0, 1.0, CURRENT_TIMESTAMP)",
+                [(student_id, group_id)] * batch,
+            )
+            conn.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?", (student_id,))
+            conn.commit()
+            with lock:
+                counters["commits"] += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            with lock:
+                counters["writer_errors"] += 1
+    conn.close()
+
+
+def measure_concurrency(database: str, pragmas: dict, readers: int = 4, duration: float = 5.0,
+                        batch: int = 500) -> dict:
+    """
+    Na KOPII bazy uruchamia jednego piszącego (ciągłe transakcje zapisu ocen)
+    i `readers` czytelników (plan zajęć grupy) z podanymi PRAGMA.
+
+    Zwraca:
+        {"journal_mode", "reads", "read_p50_ms", "read_p99_ms", "read_max_ms",
+         "reader_errors", "commits", "writer_errors"}
+    """
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="sqlite_concurrency_")
+    os.close(fd)
+    try:
+        # backup() zamiast kopii pliku – uwzględnia też zawartość pliku -wal
+        source = sqlite3.connect(database)
+        setup = sqlite3.connect(path)
+        source.backup(setup)
+        source.close()
+        SQLitePragmas.apply(setup, pragmas)
+        journal_mode = setup.execute("PRAGMA journal_mode").fetchone()[0]
+        group_ids = [row[0] for row in setup.execute("SELECT id FROM class_groups LIMIT 1000")]
+        student_id = setup.execute("SELECT MIN(id) FROM users").fetchone()[0]
+        setup.close()
+        if not group_ids:
+            raise RuntimeError("Baza nie zawiera grup (uruchom generate-data)")
+
+        lock = threading.Lock()
+        timings = []
+        errors = {"readers": 0}
+        counters = {"commits": 0, "writer_errors": 0}
+        deadline = time.perf_counter() + duration
+
+        threads = [threading.Thread(target=_writer, args=(path, pragmas, group_ids, student_id,
+                                                          deadline, batch, counters, lock))]
+        threads += [
+            threading.Thread(target=_reader, args=(path, pragmas, group_ids, deadline, timings, errors, lock))
+            for _ in range(readers)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        return {
+            "journal_mode": journal_mode,
+            "reads": len(timings),
+            "read_p50_ms": round(percentile(timings, 50), 2) if timings else None,
+            "read_p99_ms": round(percentile(timings, 99), 2) if timings else None,
+            "read_max_ms": round(max(timings), 2) if timings else None,
+            "reader_errors": errors["readers"],
+            **counters,
+        }
+    finally:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def _stats_match(expected: list, actual: list, tolerance: float = 1e-9) -> bool:
+    """Czy dwa wyniki CohortStats są równe (liczby zmiennoprzecinkowe z tolerancją)."""
+    def close(a, b):
+        if isinstance(a, dict):
+            return a.keys() == b.keys() and all(close(a[k], b[k]) for k in a)
+        if isinstance(a, float) or isinstance(b, float):
+            return a is not None and b is not None and math.isclose(a, b, rel_tol=tolerance, abs_tol=tolerance)
+        return a == b
+
+    return len(expected) == len(actual) and all(close(e, a) for e, a in zip(expected, actual))
+
+
+def measure_grade_stats(database: str, repeat: int = 3, progress=None) -> dict:
+    """
+    Porównuje statystyki ocen liczone wektorowo (NumPy) z pętlą w Pythonie
+    na wszystkich ocenach bazy – osobno wczytanie i obliczenia dla grup i kursów.
+
+    Zwraca:
+        {"grades": liczba ocen, "groups": …, "courses": …, "match": wyniki zgodne,
+         "numpy": {"load_ms", "group_ms", "course_ms"}, "python": {…}}
+    """
+    from app.analytics import CohortStats, np
+
+    if np is None:
+        raise RuntimeError("Brak pakietu numpy – zainstaluj: pip install numpy")
+
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.abspath(database)}",
+        "METRICS_ENDPOINT_ENABLED": False,
+        "SLOW_QUERY_THRESHOLD_MS": None,
+        "SCHEMA_STARTUP_MODE": "auto",
+    })
+
+    def best(fn):
+        timings, result = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return round(min(timings), 1), result
+
+    results = {}
+    with app.app_context():
+        for engine in ("numpy", "python"):
+            compute = CohortStats.compute if engine == "numpy" else CohortStats.compute_python
+            load_ms, data = best(lambda: CohortStats.load(engine))
+            group_ms, groups = best(lambda: compute(data, "group"))
+            course_ms, courses = best(lambda: compute(data, "course"))
+            results[engine] = {"load_ms": load_ms, "group_ms": group_ms, "course_ms": course_ms,
+                               "groups": groups, "courses": courses}
+            if progress:
+                progress(engine, results[engine])
+            del data
+        db.engine.dispose()
+
+    vectorized, loop = results["numpy"], results["python"]
+    return {
+        "grades": sum(item["grades"] for item in vectorized["groups"]),
+        "groups": len(vectorized["groups"]),
+        "courses": len(vectorized["courses"]),
+        "match": (_stats_match(loop["groups"], vectorized["groups"])
+                  and _stats_match(loop["courses"], vectorized["courses"])),
+        **{engine: {k: v for k, v in r.items() if k.endswith("_ms")} for engine, r in results.items()},
+    }
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float = 2.0,
+                          min_delta_ms: float = 5.0):
+    """
+    Porównuje wyniki z zapisanym przebiegiem bazowym.
+
+    Regresja, gdy:
+        - p95 > p95_bazowe × tolerance i jednocześnie wzrost przekracza
+          min_delta_ms (żeby szum na trasach poniżej milisekundy nie dawał alarmów),
+        - liczba zapytań na żądanie wzrosła,
+        - zmienił się status HTTP.
+
+    Zwraca:
+        listę opisów regresji (pusta = OK).
+    """
+    problems = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current["status"] != base["status"]:
+            problems.append(f"{name}: status {base['status']} -> {current['status']}")
+        slower = current["p95_ms"] - base["p95_ms"]
+        if current["p95_ms"] > base["p95_ms"] * tolerance and slower > min_delta_ms:
+            problems.append(
+                f"{name}: p95 {base['p95_ms']} ms -> {current['p95_ms']} ms "
+                f"({current['p95_ms'] / max(base['p95_ms'], 0.01):.1f}x)"
+            )
+        if current["queries"] > base["queries"]:
+            problems.append(f"{name}: zapytania {base['queries']} -> {current['queries']}")
+    return problems
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["routes"]
+
+
+def save_results(path: str, results: dict, meta: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "routes": results}, f, indent=2, ensure_ascii=False, sort_keys=True)
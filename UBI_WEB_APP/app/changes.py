@@ -0,0 +1,130 @@
+"""
+app/changes.py
+----------------
+Sekwencja zmian planu zajęć: kalendarze ICS (ETag, app/ical.py)
+i przyrostowa synchronizacja kalendarza (app/sync.py).
+
+- każdy flush, który zmienia lekcję, cykl albo grupę, dostaje kolejny numer
+  (największy dotąd + 1) – w tej samej transakcji, od razu po zapisie wierszy,
+- numer trafia do `lessons.change_seq` i `lesson_series.change_seq` zmienionych
+  wierszy oraz do `class_groups.lesson_version` ich grup; największa wartość
+  `lesson_version` to więc ostatni wydany numer (`LessonChanges.latest()`),
+- lekcja albo cykl usunięty lub przeniesiony do innej grupy zostawia
+  w starej grupie ślad (`lesson_tombstones`) z tym samym numerem,
+- zmiana nazwy grupy oznacza jako zmienione wszystkie jej lekcje i cykle
+  (nazwa grupy jest w każdym zdarzeniu kalendarza).
+
+Numery rosną w kolejności zatwierdzania transakcji, bo SQLite ma jednego
+piszącego naraz: numer czytamy już z blokadą zapisu po flush-u.
+Grup nie usuwamy (tylko wyłączamy), więc największy numer nigdy nie maleje
+– procesy porównują go z zapamiętanym, żeby zauważyć cudze zapisy
+(indeks kolizji w app/scheduling.py).
+"""
+
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import ClassGroup, Lesson, LessonSeries, LessonTombstone
+
+_TRACKED = (Lesson, LessonSeries, ClassGroup)
+
+
+class LessonChanges:
+    """
+    Numerowanie zmian planu – podłączane w `create_app()` tak jak `timetable_cache`.
+    """
+
+    def init_app(self, app):
+        if not db.event.contains(Session, "after_flush", _record_changes):
+            db.event.listen(Session, "after_flush", _record_changes)
+
+    @staticmethod
+    def latest() -> int:
+        """Ostatni wydany numer zmiany (indeks ix_class_groups_lesson_version)."""
+        return db.session.scalar(db.select(db.func.max(ClassGroup.lesson_version))) or 0
+
+    @staticmethod
+    def stamp(connection, group_ids, lesson_ids=(), series_ids=(), renamed_group_ids=(), tombstones=()) -> int:
+        """
+        Nadaje zmianie kolejny numer i zapisuje go w grupach, lekcjach, cyklach
+        oraz śladach usuniętych wierszy.
+
+        Zwraca:
+            nadany numer.
+        """
+        groups = ClassGroup.__table__
+        lessons = Lesson.__table__
+        series = LessonSeries.__table__
+
+        value = connection.scalar(db.select(db.func.coalesce(db.func.max(groups.c.lesson_version), 0) + 1))
+        connection.execute(groups.update().where(groups.c.id.in_(sorted(group_ids))).values(lesson_version=value))
+        if lesson_ids:
+            connection.execute(lessons.update().where(lessons.c.id.in_(sorted(lesson_ids))).values(change_seq=value))
+        if series_ids:
+            connection.execute(series.update().where(series.c.id.in_(sorted(series_ids))).values(change_seq=value))
+        if renamed_group_ids:
+            renamed = sorted(renamed_group_ids)
+            connection.execute(lessons.update().where(lessons.c.group_id.in_(renamed)).values(change_seq=value))
+            connection.execute(series.update().where(series.c.group_id.in_(renamed)).values(change_seq=value))
+        if tombstones:
+            connection.execute(LessonTombstone.__table__.insert(), [
+                {"group_id": group_id, "lesson_id": lesson_id, "series_id": series_id, "change_seq": value}
+                for group_id, lesson_id, series_id in tombstones
+            ])
+        return value
+
+
+def _old_values(obj, attribute: str) -> set:
+    """Poprzednie wartości kolumny z historii obiektu (przed tym flush-em)."""
+    return {value for value in (getattr(db.inspect(obj).attrs, attribute).history.deleted or ()) if value is not None}
+
+
+def _record_changes(session, flush_context):
+    """`after_flush`: numeruje zmiany lekcji, cykli i grup z tego flush-a."""
+    # `dirty` zawiera też obiekty bez zmian kolumn (np. dopisana lekcja do `group.lessons`)
+    changed = [obj for obj in session.dirty
+               if isinstance(obj, _TRACKED) and session.is_modified(obj, include_collections=False)]
+
+    group_ids, lesson_ids, series_ids, renamed, tombstones = set(), set(), set(), set(), []
+    for obj in (*session.new, *changed):
+        if isinstance(obj, Lesson):
+            lesson_ids.add(obj.id)
+            group_ids.add(obj.group_id)
+            # Lekcja przeniesiona do innej grupy znika z planu starej grupy
+            for old_group_id in _old_values(obj, "group_id") - {obj.group_id}:
+                group_ids.add(old_group_id)
+                tombstones.append((old_group_id, obj.id, None))
+            # Lekcja zastępująca termin cyklu – klienci odświeżają terminy cyklu
+            series_ids.update({obj.series_id} - {None} | _old_values(obj, "series_id"))
+        elif isinstance(obj, LessonSeries):
+            series_ids.add(obj.id)
+            group_ids.add(obj.group_id)
+            for old_group_id in _old_values(obj, "group_id") - {obj.group_id}:
+                group_ids.add(old_group_id)
+                tombstones.append((old_group_id, None, obj.id))
+        elif isinstance(obj, ClassGroup):
+            group_ids.add(obj.id)
+            if _old_values(obj, "name"):
+                renamed.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Lesson):
+            group_ids.add(obj.group_id)
+            tombstones.append((obj.group_id, obj.id, None))
+            if obj.series_id is not None:
+                # Termin cyklu znów wynika z reguły
+                series_ids.add(obj.series_id)
+        elif isinstance(obj, LessonSeries):
+            group_ids.add(obj.group_id)
+            tombstones.append((obj.group_id, None, obj.id))
+
+    group_ids.discard(None)
+    if group_ids:
+        value = LessonChanges.stamp(session.connection(), group_ids, lesson_ids, series_ids, renamed, tombstones)
+        # Numery tej transakcji – indeks kolizji (app/scheduling.py) po commit
+        # sprawdza, czy nikt inny nie zapisał nic pomiędzy
+        session.info.setdefault("change_seqs", []).append(value)
+
+
+# Globalny obiekt – tak jak `timetable_cache`
+lesson_changes = LessonChanges()
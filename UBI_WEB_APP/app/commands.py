@@ -0,0 +1,558 @@
+"""
+app/commands.py
+----------------
+Komendy CLI (uruchamiane przez `flask --app app <komenda>`).
+
+- init-db: tworzy/aktualizuje schemat bazy i dodaje użytkowników testowych,
+- migrate status|up|down: migracje schematu z raportem czasu kroków (i --dry-run),
+- enroll-students: masowy zapis studentów do grup z pliku CSV,
+- grade-summaries: zgodność średnich (grade_summaries) z ocenami, przeliczenie od zera,
+- check-queries: strażnik regresji N+1 dla wszystkich tras,
+- check-indexes: EXPLAIN QUERY PLAN zapytań tras – wykrywa brakujące indeksy,
+- generate-data: syntetyczna uczelnia (użytkownicy, kursy, grupy, zapisy, lekcje, oceny),
+- benchmark: opóźnienia, liczba zapytań i pamięć tras + porównanie z wynikami bazowymi,
+- startup-time: czas zimnego startu aplikacji (create_app w nowym procesie),
+- throughput: przepustowość serwera produkcyjnego (serve.py) dla różnej liczby procesów,
+- sqlite-concurrency: opóźnienia odczytów podczas ciągłych zapisów dla profili PRAGMA,
+- grade-stats-benchmark: statystyki ocen grup/kursów – NumPy kontra pętla w Pythonie,
+- check-schedule: kolizje zapisanych lekcji (sala, prowadzący, wspólni studenci),
+- materialize-series: wiersze lekcji dla terminów cykli zajęć.
+"""
+
+import csv
+import os
+import time
+
+import click
+from flask.cli import AppGroup, with_appcontext
+
+from app import db
+from config import MIGRATION_BATCH_PAUSE, MIGRATION_BATCH_SIZE
+
+
+def _echo_migration(result):
+    """Raport jednej migracji: czas każdego kroku i najdłuższa blokada zapisu."""
+    arrow = "->" if result["direction"] == "up" else "<-"
+    suffix = " (dry-run)" if result["dry_run"] else ""
+    click.echo(f"{arrow} {result['version']:3}  {result['description']}  "
+               f"{result['duration_ms'] / 1000:.2f} s{suffix}")
+    for step in result["steps"]:
+        if step["status"] == "dry-run":
+            batches = f"  [{step['batches']} paczek]" if step["batches"] > 1 else ""
+            click.echo(f"       {step['description']}{batches}")
+            for line in step["sql"].splitlines():
+                click.echo(f"         {line}")
+            continue
+        if step["status"] == "skipped":
+            click.echo(f"       {step['description']:58} pominięto (już jest)")
+            continue
+        rows = f"{step['rows']} wierszy" if step["rows"] is not None else ""
+        batches = f" w {step['batches']} paczkach" if step["batches"] > 1 else ""
+        click.echo(f"       {step['description']:58} {step['duration_ms'] / 1000:7.2f} s  "
+                   f"blokada maks. {step['max_lock_ms'] / 1000:.2f} s  {rows}{batches}")
+        if step["over_lock_budget"]:
+            click.echo("         ! blokada zapisu dłuższa niż busy_timeout – równoległe zapisy "
+                       "mogły dostać \"database is locked\"", err=True)
+
+
+@click.command("init-db")
+@click.option("--no-seed", is_flag=True, help="Nie dodawaj użytkowników testowych.")
+@with_appcontext
+def init_db_command(no_seed):
+    """
+    Wykonuje migracje schematu, tworzy indeks pełnotekstowy i dodaje
+    użytkowników testowych. Uruchamiane raz przed startem aplikacji
+    (bezpieczne do powtórzenia).
+    """
+    from app.schema import SchemaManager
+
+    result = SchemaManager.init_db(seed=not no_seed, progress=_echo_migration)
+    click.echo(
+        f"Schemat: {result['previous']} -> {result['version']}, "
+        f"dodani użytkownicy testowi: {result['seeded']}"
+    )
+
+
+migrate_cli = AppGroup("migrate", help="Migracje schematu bazy (skrypty w app/migrations/).")
+
+
+@migrate_cli.command("status")
+def migrate_status_command():
+    """Lista migracji: zastosowane (z datą) i oczekujące."""
+    from app.migrate import MigrationRunner
+
+    for row in MigrationRunner.status():
+        applied = str(row["applied_at"])[:19] if row["applied_at"] else "oczekuje"
+        note = "" if row["reversible"] else "  (nieodwracalna)"
+        click.echo(f"{row['version']:3}  {applied:19}  {row['description']}{note}")
+
+
+def _migration_options(command):
+    command = click.option("--dry-run", is_flag=True, help="Tylko pokaż SQL, nie zmieniaj bazy.")(command)
+    command = click.option("--batch-size", default=MIGRATION_BATCH_SIZE, show_default=True,
+                           help="Liczba id w jednej transakcji wypełniania danych.")(command)
+    command = click.option("--pause", default=MIGRATION_BATCH_PAUSE, show_default=True,
+                           help="Przerwa między paczkami (sekundy).")(command)
+    return command
+
+
+@migrate_cli.command("up")
+@click.option("--to", "target", type=int, default=None, help="Wersja docelowa (domyślnie najnowsza).")
+@_migration_options
+def migrate_up_command(target, dry_run, batch_size, pause):
+    """Wykonuje oczekujące migracje (do wersji --to włącznie)."""
+    from app.migrate import MigrationError, MigrationRunner
+
+    try:
+        results = MigrationRunner.upgrade(target, dry_run=dry_run, batch_size=batch_size,
+                                          pause=pause, progress=_echo_migration)
+    except MigrationError as e:
+        raise click.ClickException(str(e))
+    if not results:
+        click.echo("Schemat jest aktualny.")
+
+
+@migrate_cli.command("down")
+@click.option("--to", "target", type=int, required=True, help="Wersja, do której cofamy (zostaje zastosowana).")
+@_migration_options
+def migrate_down_command(target, dry_run, batch_size, pause):
+    """Cofa migracje nowsze niż --to."""
+    from app.migrate import MigrationError, MigrationRunner
+
+    try:
+        results = MigrationRunner.downgrade(target, dry_run=dry_run, batch_size=batch_size,
+                                            pause=pause, progress=_echo_migration)
+    except MigrationError as e:
+        raise click.ClickException(str(e))
+    if not results:
+        click.echo("Nic do cofnięcia.")
+
+
+@click.command("enroll-students")
+@click.argument("csv_file", type=click.File("r", encoding="utf-8"))
+@click.option("--group-id", type=int, default=None,
+              help="Grupa docelowa. Bez tej opcji plik musi mieć kolumny 'group_id' i 'student'.")
+@click.option("--quiet", is_flag=True, help="Wypisz tylko podsumowanie.")
+@with_appcontext
+def enroll_students_command(csv_file, group_id, quiet):
+    """
+    Zapisuje studentów z pliku CSV do grup zajęciowych.
+
+    Student może być podany jako login, e-mail albo id.
+    """
+    from sqlalchemy.exc import IntegrityError, OperationalError
+
+    from app.enrollment import BulkEnrollment, parse_identifiers
+    from app.models import ClassGroup
+
+    totals = {}
+    if group_id is not None:
+        batches = {group_id: parse_identifiers(csv_file.read())}
+    else:
+        reader = csv.DictReader(csv_file)
+        if not reader.fieldnames or not {"group_id", "student"} <= set(reader.fieldnames):
+            raise click.UsageError("Plik CSV musi mieć kolumny 'group_id' i 'student' (albo użyj --group-id).")
+        batches = {}
+        for row in reader:
+            student = (row["student"] or "").strip()
+            try:
+                gid = int(row["group_id"])
+            except (TypeError, ValueError):
+                gid = None
+            if gid is None or not student:
+                # Zły wiersz nie przerywa importu – raportujemy go z numerem linii
+                click.echo(f"Linia {reader.line_num}: niepoprawny wiersz "
+                           f"(group_id={row['group_id']!r}, student={row['student']!r}) – pomijam.", err=True)
+                totals["invalid_row"] = totals.get("invalid_row", 0) + 1
+                continue
+            batches.setdefault(gid, []).append(student)
+
+    for gid, identifiers in batches.items():
+        group = db.session.get(ClassGroup, gid)
+        if group is None:
+            click.echo(f"Grupa {gid} nie istnieje – pomijam {len(identifiers)} wierszy.", err=True)
+            continue
+
+        try:
+            report = BulkEnrollment.enroll(group, identifiers)
+        except (IntegrityError, OperationalError) as e:
+            # Transakcja grupy wycofana – pozostałe grupy zapisujemy dalej
+            click.echo(f"Grupa {gid}: zapis nie powiódł się ({e.__class__.__name__}) – "
+                       f"pomijam {len(identifiers)} wierszy, uruchom ponownie.", err=True)
+            totals["failed"] = totals.get("failed", 0) + len(identifiers)
+            continue
+        if not quiet:
+            for entry in report:
+                click.echo(f"{gid}\t{entry['identifier']}\t{entry['status']}")
+        for status, count in BulkEnrollment.summary(report).items():
+            totals[status] = totals.get(status, 0) + count
+
+    click.echo("Podsumowanie: " + ", ".join(f"{k}={v}" for k, v in sorted(totals.items())))
+
+
+@click.command("grade-summaries")
+@click.option("--rebuild", is_flag=True, help="Przelicz zestawienie od zera (po sprawdzeniu).")
+@with_appcontext
+def grade_summaries_command(rebuild):
+    """
+    Sprawdza, czy średnie w grade_summaries zgadzają się z ocenami w grades;
+    z --rebuild przelicza je od zera. Bez --rebuild niezgodność daje kod 1.
+    """
+    from app.grades import GradeBook
+
+    mismatched = GradeBook.verify()
+    click.echo(f"Niezgodne zestawienia (student, grupa): {len(mismatched)}")
+    for student_id, group_id in mismatched[:20]:
+        click.echo(f"  student {student_id}, grupa {group_id}")
+
+    if rebuild:
+        click.echo(f"Przeliczono zestawienia: {GradeBook.rebuild()}")
+    elif mismatched:
+        raise SystemExit(1)
+
+
+@click.command("check-queries")
+@click.option("--small", default=5, show_default=True, help="Liczba wierszy w małej bazie.")
+@click.option("--large", default=40, show_default=True, help="Liczba wierszy w dużej bazie.")
+def check_queries_command(small, large):
+    """
+    Wykrywa regresje N+1: liczba zapytań SQL na trasę nie może rosnąć
+    razem z liczbą wierszy. Kończy się kodem 1, jeśli któraś trasa nie przejdzie.
+    """
+    from app.querycheck import check_queries
+
+    report = check_queries(small=small, large=large)
+
+    failed = 0
+    for row in report:
+        verdict = "OK" if row["ok"] else "BŁĄD"
+        failed += not row["ok"]
+        click.echo(
+            f"{verdict:5} {row['route']:32} zapytania: {row['small']:3} -> {row['large']:3}"
+            f"   HTTP {row['status'][0]}/{row['status'][1]}"
+        )
+
+    if failed:
+        click.echo(f"{failed} tras(y) z N+1 lub błędem.", err=True)
+        raise SystemExit(1)
+    click.echo("Wszystkie trasy mają stałą liczbę zapytań.")
+
+
+@click.command("check-indexes")
+@click.option("--rows", default=40, show_default=True, help="Liczba wierszy w tymczasowej bazie.")
+@click.option("--verbose", is_flag=True, help="Wypisz treść zapytań bez indeksu.")
+def check_indexes_command(rows, verbose):
+    """
+    Sprawdza EXPLAIN QUERY PLAN zapytań każdej trasy: pełny przegląd
+    tabeli (SCAN bez indeksu) kończy komendę kodem 1.
+    """
+    from app.querycheck import check_indexes
+
+    report = check_indexes(rows=rows)
+
+    failed = 0
+    for row in report:
+        verdict = "OK" if row["ok"] else "BŁĄD"
+        failed += not row["ok"]
+        tables = ", ".join(sorted({table for table, _sql in row["scans"]})) or "-"
+        click.echo(f"{verdict:5} {row['route']:32} zapytania: {row['queries']:3}   HTTP {row['status']}   SCAN: {tables}")
+        if verbose:
+            for table, sql in row["scans"]:
+                click.echo(f"        {table}: {' '.join(sql.split())}")
+
+    if failed:
+        click.echo(f"{failed} tras(y) z pełnym przeglądem tabeli lub błędem.", err=True)
+        raise SystemExit(1)
+    click.echo("Wszystkie zapytania korzystają z indeksów.")
+
+
+@click.command("generate-data")
+@click.option("--students", default=1000, show_default=True, help="Liczba studentów.")
+@click.option("--lecturers", type=int, default=None, help="Liczba wykładowców (domyślnie studenci/50).")
+@click.option("--courses", type=int, default=None, help="Liczba kursów (domyślnie studenci/25).")
+@click.option("--groups-per-course", default=3, show_default=True)
+@click.option("--enrollments-per-student", default=5, show_default=True)
+@click.option("--grades-per-enrollment", default=10, show_default=True, help="Średnia liczba ocen na zapis.")
+@click.option("--lessons-per-group", default=15, show_default=True, help="Liczba tygodni zajęć.")
+@click.option("--seed", default=42, show_default=True, help="Ziarno losowania (te same dane dla tego samego ziarna).")
+@click.option("--database", type=click.Path(dir_okay=False), default=None,
+              help="Plik SQLite, do którego generujemy dane (domyślnie baza aplikacji).")
+@with_appcontext
+def generate_data_command(database, **options):
+    """
+    Generuje syntetyczną uczelnię do testów wydajności.
+
+    Przykład (ok. 5 mln ocen):
+        flask --app app generate-data --students 100000 --database bench.db
+    """
+    from app import create_app
+    from app.datagen import generate_dataset
+
+    if database:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.abspath(database)}",
+            "SCHEMA_STARTUP_MODE": "auto",
+        })
+        with app.app_context():
+            counts = generate_dataset(progress=click.echo, **options)
+    else:
+        counts = generate_dataset(progress=click.echo, **options)
+
+    seconds = counts.pop("seconds")
+    click.echo("Dodano: " + ", ".join(f"{k}={v}" for k, v in counts.items()) + f" w {seconds} s")
+
+
+@click.command("benchmark")
+@click.option("--database", type=click.Path(exists=True, dir_okay=False), required=True,
+              help="Plik SQLite z wygenerowanymi danymi (generate-data).")
+@click.option("--iterations", default=30, show_default=True, help="Liczba pomiarów na trasę.")
+@click.option("--warmup", default=3, show_default=True, help="Liczba wywołań rozgrzewających.")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Plik JSON z wynikami bazowymi do porównania.")
+@click.option("--tolerance", default=2.0, show_default=True,
+              help="Ile razy p95 może wzrosnąć względem bazowego, zanim uznamy to za regresję.")
+@click.option("--save-baseline", type=click.Path(dir_okay=False), default=None,
+              help="Zapisz wyniki jako nowy plik bazowy.")
+def benchmark_command(database, iterations, warmup, baseline, tolerance, save_baseline):
+    """
+    Mierzy p50/p95/p99, liczbę zapytań i pamięć dla każdej trasy.
+    Kończy się kodem 1, jeśli wynik jest gorszy od bazowego.
+    """
+    import platform
+    from datetime import datetime
+
+    from app.benchmark import compare_with_baseline, load_baseline, run_benchmark, save_results
+
+    click.echo(f"{'trasa':32} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>6} {'pamięć':>10}  HTTP")
+
+    def progress(name, r):
+        click.echo(
+            f"{name:32} {r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms {r['p99_ms']:7.1f}ms "
+            f"{r['queries']:6} {r['peak_kib']:8.0f}KiB  {r['status']}"
+        )
+
+    results = run_benchmark(
+        f"sqlite:///{os.path.abspath(database)}",
+        iterations=iterations,
+        warmup=warmup,
+        progress=progress,
+    )
+
+    if save_baseline:
+        save_results(save_baseline, results, {
+            "database": os.path.basename(database),
+            "iterations": iterations,
+            "python": platform.python_version(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        click.echo(f"Zapisano wyniki bazowe: {save_baseline}")
+
+    if baseline:
+        problems = compare_with_baseline(results, load_baseline(baseline), tolerance)
+        if problems:
+            click.echo("REGRESJE WYDAJNOŚCI:", err=True)
+            for problem in problems:
+                click.echo(f"  - {problem}", err=True)
+            raise SystemExit(1)
+        click.echo(f"Brak regresji względem {baseline} (tolerancja {tolerance}x).")
+
+
+@click.command("startup-time")
+@click.option("--database", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Plik SQLite (domyślnie baza aplikacji).")
+@click.option("--mode", type=click.Choice(["auto", "verify"]), default="verify", show_default=True,
+              help="Tryb sprawdzania schematu przy starcie.")
+@click.option("--runs", default=5, show_default=True, help="Liczba pomiarów (każdy w nowym procesie).")
+@with_appcontext
+def startup_time_command(database, mode, runs):
+    """Mierzy czas zimnego startu: import aplikacji i create_app()."""
+    from flask import current_app
+
+    from app.benchmark import measure_startup
+
+    uri = f"sqlite:///{os.path.abspath(database)}" if database else current_app.config["SQLALCHEMY_DATABASE_URI"]
+    try:
+        r = measure_startup(uri, mode=mode, runs=runs)
+    except RuntimeError as e:
+        raise click.ClickException(f"Aplikacja nie wystartowała: {e}")
+    click.echo(
+        f"import: {r['import_ms']:.1f} ms, create_app(): {r['create_app_ms']:.1f} ms, "
+        f"razem: {r['total_ms']:.1f} ms, zapytania SQL przy starcie: {r['queries']}"
+    )
+
+
+@click.command("throughput")
+@click.option("--database", type=click.Path(exists=True, dir_okay=False), required=True,
+              help="Plik SQLite z wygenerowanymi danymi (generate-data).")
+@click.option("--workers", "workers_list", default="1,2,4", show_default=True,
+              help="Liczby procesów roboczych do porównania, po przecinku.")
+@click.option("--threads", default=8, show_default=True, help="Wątki w każdym procesie.")
+@click.option("--concurrency", default=16, show_default=True, help="Liczba równoległych klientów.")
+@click.option("--duration", default=10.0, show_default=True, help="Czas pomiaru (sekundy) dla każdej konfiguracji.")
+def throughput_command(database, workers_list, threads, concurrency, duration):
+    """Mierzy żądania/s serwera produkcyjnego przy rosnącej liczbie procesów."""
+    from app.benchmark import measure_throughput
+
+    try:
+        counts = [int(w) for w in workers_list.split(",") if w.strip()]
+    except ValueError:
+        raise click.BadParameter("podaj liczby po przecinku, np. 1,2,4", param_hint="--workers")
+
+    click.echo(f"rdzenie CPU: {os.cpu_count()}, klienci: {concurrency}, wątki/proces: {threads}")
+    click.echo(f"{'procesy':>8} {'żądania/s':>10} {'p50':>9} {'p99':>9} {'503':>6} {'błędy':>6}")
+
+    def progress(r):
+        click.echo(
+            f"{r['workers']:8} {r['rps']:10.1f} {r['p50_ms']:7.1f}ms {r['p99_ms']:7.1f}ms "
+            f"{r['rejected']:6} {r['errors']:6}"
+        )
+
+    try:
+        measure_throughput(database, counts, threads=threads, concurrency=concurrency,
+                           duration=duration, progress=progress)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+
+@click.command("sqlite-concurrency")
+@click.option("--database", type=click.Path(exists=True, dir_okay=False), required=True,
+              help="Plik SQLite z danymi (pomiar odbywa się na kopii).")
+@click.option("--profiles", default="legacy,production", show_default=True,
+              help="Profile z SQLITE_PRAGMA_PROFILES do porównania, po przecinku.")
+@click.option("--readers", default=4, show_default=True, help="Liczba wątków czytających.")
+@click.option("--duration", default=5.0, show_default=True, help="Czas pomiaru (sekundy) na profil.")
+@click.option("--batch", default=500, show_default=True, help="Liczba ocen w jednej transakcji zapisu.")
+def sqlite_concurrency_command(database, profiles, readers, duration, batch):
+    """
+    Sprawdza, czy czytelnicy czekają na piszącego: jeden wątek ciągle zapisuje
+    oceny, pozostałe czytają – dla każdego profilu PRAGMA.
+    """
+    from app.benchmark import measure_concurrency
+    from config import SQLITE_PRAGMA_PROFILES
+
+    names = [p.strip() for p in profiles.split(",") if p.strip()]
+    unknown = [p for p in names if p not in SQLITE_PRAGMA_PROFILES]
+    if unknown:
+        raise click.BadParameter(f"nieznane profile: {', '.join(unknown)}", param_hint="--profiles")
+
+    click.echo(f"{'profil':12} {'tryb':8} {'odczyty':>8} {'p50':>9} {'p99':>9} {'max':>9} "
+               f"{'błędy odczytu':>14} {'zapisy':>7}")
+    for name in names:
+        r = measure_concurrency(database, SQLITE_PRAGMA_PROFILES[name], readers=readers,
+                                duration=duration, batch=batch)
+        click.echo(
+            f"{name:12} {r['journal_mode']:8} {r['reads']:8} {r['read_p50_ms']:7.2f}ms "
+            f"{r['read_p99_ms']:7.2f}ms {r['read_max_ms']:7.2f}ms {r['reader_errors']:14} {r['commits']:7}"
+        )
+
+
+
+@click.command("grade-stats-benchmark")
+@click.option("--database", type=click.Path(exists=True, dir_okay=False), required=True,
+              help="Plik SQLite z wygenerowanymi danymi (generate-data).")
+@click.option("--repeat", default=3, show_default=True, help="Liczba pomiarów (liczy się najlepszy).")
+def grade_stats_benchmark_command(database, repeat):
+    """Porównuje statystyki ocen liczone wektorowo (NumPy) z pętlą w Pythonie."""
+    from app.benchmark import measure_grade_stats
+
+    click.echo(f"{'silnik':8} {'wczytanie':>11} {'grupy':>11} {'kursy':>11}")
+
+    def progress(engine, r):
+        click.echo(f"{engine:8} {r['load_ms']:9.1f}ms {r['group_ms']:9.1f}ms {r['course_ms']:9.1f}ms")
+
+    try:
+        r = measure_grade_stats(database, repeat=repeat, progress=progress)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"ocen: {r['grades']}, grup: {r['groups']}, kursów: {r['courses']}")
+    for level in ("group", "course"):
+        speedup = r["python"][f"{level}_ms"] / max(r["numpy"][f"{level}_ms"], 0.1)
+        click.echo(f"przyspieszenie obliczeń ({'grupy' if level == 'group' else 'kursy'}): {speedup:.1f}x")
+    if not r["match"]:
+        raise click.ClickException("Wyniki NumPy i pętli w Pythonie się różnią.")
+    click.echo("Wyniki zgodne.")
+
+@click.command("check-schedule")
+@click.option("--year", type=int, default=None, help="Tylko grupy z tego roku.")
+@click.option("--semester", type=int, default=None, help="Tylko grupy z tego semestru.")
+@click.option("--limit", default=20, show_default=True, help="Ile kolizji wypisać.")
+@with_appcontext
+def check_schedule_command(year, semester, limit):
+    """
+    Szuka kolizji między zapisanymi lekcjami (sala, prowadzący, wspólni
+    studenci). Znalezione kolizje dają kod 1.
+    """
+    from app.models import ClassGroup
+    from app.scheduling import REASON_LABELS, LessonScheduler, ref_label, schedule_index
+
+    group_ids = None
+    if year is not None or semester is not None:
+        statement = db.select(ClassGroup.id)
+        if year is not None:
+            statement = statement.where(ClassGroup.year == year)
+        if semester is not None:
+            statement = statement.where(ClassGroup.semester == semester)
+        group_ids = db.session.scalars(statement).all()
+
+    started = time.perf_counter()
+    schedule_index.rebuild()
+    built = time.perf_counter()
+    pairs = LessonScheduler.existing_conflicts(group_ids)
+    checked = time.perf_counter()
+
+    click.echo(f"Terminów w indeksie: {len(schedule_index)} (budowa {(built - started) * 1000:.0f} ms), "
+               f"sprawdzenie: {(checked - built) * 1000:.0f} ms")
+    totals = {}
+    for _, _, reasons in pairs:
+        for reason in reasons:
+            totals[reason] = totals.get(reason, 0) + 1
+    click.echo(f"Kolidujące pary lekcji: {len(pairs)}"
+               + "".join(f", {REASON_LABELS[r]}: {n}" for r, n in sorted(totals.items())))
+    for ref, other, reasons in pairs[:limit]:
+        click.echo(f"  {ref_label(ref)} <-> {ref_label(other)}: " + ", ".join(REASON_LABELS[r] for r in sorted(reasons)))
+    if pairs:
+        raise SystemExit(1)
+
+
+@click.command("materialize-series")
+@click.option("--series-id", type=int, default=None, help="Tylko ten cykl (domyślnie wszystkie).")
+@click.option("--until", "until", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Tylko terminy przed tym dniem (domyślnie cały cykl).")
+@with_appcontext
+def materialize_series_command(series_id, until):
+    """
+    Tworzy wiersze lekcji dla terminów cykli zajęć, które ich jeszcze nie mają
+    (np. przed wydrukiem list obecności).
+    """
+    from app.models import LessonSeries
+    from app.recurrence import RecurringLessons
+
+    statement = db.select(LessonSeries).order_by(LessonSeries.id)
+    if series_id is not None:
+        statement = statement.where(LessonSeries.id == series_id)
+
+    total = 0
+    for series in db.session.scalars(statement).all():
+        created = RecurringLessons.materialize(series, end=until)
+        total += created
+        click.echo(f"cykl {series.id} ({series.title}): {created}")
+    click.echo(f"Utworzono lekcje: {total}")
+
+
+def register_commands(app):
+    """Rejestruje komendy CLI w aplikacji."""
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(migrate_cli)
+    app.cli.add_command(enroll_students_command)
+    app.cli.add_command(grade_summaries_command)
+    app.cli.add_command(check_queries_command)
+    app.cli.add_command(check_indexes_command)
+    app.cli.add_command(generate_data_command)
+    app.cli.add_command(benchmark_command)
+    app.cli.add_command(startup_time_command)
+    app.cli.add_command(throughput_command)
+    app.cli.add_command(sqlite_concurrency_command)
+    app.cli.add_command(grade_stats_benchmark_command)
+    app.cli.add_command(check_schedule_command)
+    app.cli.add_command(materialize_series_command)
@@ -0,0 +1,274 @@
+"""
+app/datagen.py
+----------------
+Generator syntetycznej uczelni do testów wydajności.
+
+Tworzy zadaną liczbę wykładowców, studentów, kursów, grup, zapisów,
+lekcji i ocen – z realistycznymi rozkładami (imiona i nazwiska, rozkład
+ocen zależny od "zdolności" studenta, zajęcia co tydzień przez semestr).
+
+- Ten sam `seed` daje zawsze te same dane (własny random.Random, stała data bazowa).
+- Wiersze wstawiamy paczkami przez `executemany` (INSERT z Core, bez obiektów ORM),
+  z góry nadając id – dzięki temu nie potrzebujemy RETURNING.
+
+Uruchomienie:
+    flask --app app generate-data --students 100000 --seed 42
+"""
+
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import db
+from app.grades import GradeBook
+from app.models import ClassGroup, Course, Enrollment, Grade, Lesson, User, UserRole
+
+BATCH_SIZE = 50_000
+
+# Stała data bazowa – wynik nie zależy od dnia uruchomienia
+BASE_DATE = datetime(2025, 10, 6, 8, 0)
+
+FIRST_NAMES = [
+    "Anna", "Maria", "Katarzyna", "Małgorzata", "Agnieszka", "Barbara", "Ewa", "Krystyna",
+    "Magdalena", "Joanna", "Aleksandra", "Zofia", "Julia", "Natalia", "Karolina", "Monika",
+    "Piotr", "Krzysztof", "Andrzej", "Tomasz", "Paweł", "Jan", "Michał", "Marcin", "Jakub",
+    "Adam", "Kacper", "Mateusz", "Łukasz", "Szymon", "Filip", "Wojciech", "Bartosz", "Igor",
+]
+LAST_NAMES = [
+    "Nowak", "Kowalski", "Wiśniewski", "Wójcik", "Kowalczyk", "Kamiński", "Lewandowski",
+    "Zieliński", "Szymański", "Woźniak", "Dąbrowski", "Kozłowski", "Jankowski", "Mazur",
+    "Kwiatkowski", "Krawczyk", "Piotrowski", "Grabowski", "Nowakowski", "Pawłowski",
+    "Michalski", "Nowicki", "Adamczyk", "Dudek", "Zając", "Wieczorek", "Jabłoński", "Król",
+    "Majewski", "Olszewski", "Jaworski", "Wróbel", "Malinowski", "Pawlak", "Witkowski", "Łach",
+    "Sosnowski", "Stępień", "Górski", "Rutkowski", "Michalak", "Sikora", "Ostrowski", "Baran",
+]
+COURSE_SUBJECTS = [
+    "Programowanie", "Analiza matematyczna", "Algebra liniowa", "Bazy danych", "Sieci komputerowe",
+    "Systemy operacyjne", "Inżynieria oprogramowania", "Fizyka", "Statystyka", "Grafika komputerowa",
+    "Sztuczna inteligencja", "Algorytmy i struktury danych", "Ekonomia", "Język angielski",
+    "Bezpieczeństwo systemów", "Aplikacje webowe", "Metody numeryczne", "Elektronika",
+]
+GROUP_KINDS = ["Wykład", "Ćwiczenia", "Laboratorium", "Projekt", "Seminarium"]
+GRADE_LABELS = ["Kolokwium 1", "Kolokwium 2", "Projekt", "Sprawozdanie", "Kartkówka", "Aktywność", "Egzamin"]
+GRADE_VALUES = [2.0, 3.0, 3.5, 4.0, 4.5, 5.0]
+# Bazowy rozkład ocen (przeciętny student)
+GRADE_DISTRIBUTION = [0.08, 0.20, 0.18, 0.22, 0.17, 0.15]
+GRADE_WEIGHTS = [1.0, 1.0, 1.0, 2.0, 0.5, 3.0]
+
+
+def _strip_polish(text: str) -> str:
+    return text.lower().translate(str.maketrans("ąćęłńóśźż", "acelnoszz"))
+
+
+def _last_name_for(first_name: str, last_name: str) -> str:
+    """Żeńska forma nazwiska dla imion żeńskich (Kowalski -> Kowalska)."""
+    if first_name.endswith("a") and last_name.endswith("ki"):
+        return last_name[:-1] + "a"
+    return last_name
+
+
+def _next_id(model) -> int:
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+class _BatchInserter:
+    """Zbiera wiersze i wstawia je paczkami jednym executemany."""
+
+    def __init__(self, model, counts: dict):
+        self.table = model.__table__
+        self.rows = []
+        self.counts = counts
+        self.counts.setdefault(self.table.name, 0)
+
+    def add(self, row: dict):
+        self.rows.append(row)
+        if len(self.rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            db.session.execute(self.table.insert(), self.rows)
+            self.counts[self.table.name] += len(self.rows)
+            self.rows = []
+
+
+def generate_dataset(seed: int = 42, students: int = 1000, lecturers: int = None,
+                     courses: int = None, groups_per_course: int = 3,
+                     enrollments_per_student: int = 5, grades_per_enrollment: int = 10,
+                     lessons_per_group: int = 15, password: str = "pass123", progress=None) -> dict:
+    """
+    Dopisuje do bieżącej bazy syntetyczne dane.
+
+    Domyślnie: 1 wykładowca na 50 studentów, 1 kurs na 25 studentów.
+    100 000 studentów × 5 zapisów × 10 ocen ≈ 5 mln ocen.
+
+    Parametry:
+        progress – (opcjonalnie) funkcja wywoływana z komunikatem po każdym etapie.
+
+    Zwraca:
+        słownik {nazwa_tabeli: liczba dodanych wierszy} oraz "seconds".
+    """
+    from app.auth import AuthManager
+
+    rng = random.Random(seed)
+    lecturers = lecturers or max(1, students // 50)
+    courses = courses or max(1, students // 25)
+    started = time.perf_counter()
+    counts = {}
+
+    def report(stage):
+        if progress:
+            progress(f"{stage} ({time.perf_counter() - started:.1f} s)")
+
+    # Jedno (kosztowne) haszowanie dla wszystkich wygenerowanych kont
+    password_hash = AuthManager.hash_password(password)
+
+    # --- Użytkownicy ---
+    users = _BatchInserter(User, counts)
+    first_user_id = _next_id(User)
+    lecturer_ids = list(range(first_user_id, first_user_id + lecturers))
+    student_ids = list(range(first_user_id + lecturers, first_user_id + lecturers + students))
+    abilities = {}
+
+    for user_id in lecturer_ids + student_ids:
+        is_student = user_id >= first_user_id + lecturers
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = _last_name_for(first_name, rng.choice(LAST_NAMES))
+        prefix = "s" if is_student else "l"
+        username = f"{prefix}{user_id:07d}"
+        domain = "student.uczelni.edu" if is_student else "uczelni.edu"
+        users.add({
+            "id": user_id,
+            "username": username,
+            "email": f"{_strip_polish(first_name)}.{_strip_polish(last_name)}.{user_id}@{domain}",
+            "password_hash": password_hash,
+            "first_name": first_name,
+            "last_name": last_name,
+            "role": UserRole.STUDENT if is_student else UserRole.LECTURER,
+            # ok. 2% kont nieaktywnych
+            "is_active": rng.random() > 0.02,
+            "created_at": BASE_DATE - timedelta(days=rng.randint(0, 4 * 365)),
+            "last_login": None,
+        })
+        if is_student:
+            # "Zdolność" studenta przesuwa rozkład jego ocen
+            abilities[user_id] = rng.gauss(0.0, 1.0)
+    users.flush()
+    report(f"użytkownicy: {counts['users']}")
+
+    # --- Kursy i grupy ---
+    course_rows = _BatchInserter(Course, counts)
+    group_rows = _BatchInserter(ClassGroup, counts)
+    first_course_id = _next_id(Course)
+    next_group_id = _next_id(ClassGroup)
+    group_ids = []
+
+    for course_id in range(first_course_id, first_course_id + courses):
+        lecturer_id = rng.choice(lecturer_ids)
+        course_rows.add({
+            "id": course_id,
+            "code": f"GEN{course_id:06d}",
+            "name": f"{rng.choice(COURSE_SUBJECTS)} {rng.randint(1, 3)}",
+            "ects": rng.choice([2, 3, 4, 5, 6, 8]),
+            "description": None,
+            "lecturer_id": lecturer_id,
+            "is_active": rng.random() > 0.05,
+        })
+        for k in range(groups_per_course):
+            group_rows.add({
+                "id": next_group_id,
+                "name": f"{GROUP_KINDS[k % len(GROUP_KINDS)]} {chr(ord('A') + k)}",
+                "semester": rng.randint(1, 7),
+                "year": BASE_DATE.year,
+                "course_id": course_id,
+                # Pierwszą grupę prowadzi zwykle główny wykładowca kursu
+                "lecturer_id": lecturer_id if k == 0 else rng.choice(lecturer_ids),
+                "is_active": True,
+            })
+            group_ids.append(next_group_id)
+            next_group_id += 1
+    course_rows.flush()
+    group_rows.flush()
+    report(f"kursy: {counts['courses']}, grupy: {counts['class_groups']}")
+
+    # --- Lekcje: co tydzień o stałej porze przez semestr ---
+    lesson_rows = _BatchInserter(Lesson, counts)
+    next_lesson_id = _next_id(Lesson)
+    for group_id in group_ids:
+        weekday = rng.randint(0, 4)
+        hour = rng.choice([8, 10, 12, 14, 16, 18])
+        room = f"{rng.randint(1, 4)}{rng.randint(0, 30):02d}"
+        title = rng.choice(GROUP_KINDS)
+        first = BASE_DATE.replace(hour=hour) + timedelta(days=weekday)
+        for week in range(lessons_per_group):
+            start = first + timedelta(weeks=week)
+            lesson_rows.add({
+                "id": next_lesson_id,
+                "group_id": group_id,
+                "title": f"{title} {week + 1}",
+                "room": room,
+                "start_time": start,
+                "end_time": start + timedelta(minutes=90),
+                "is_canceled": rng.random() < 0.03,
+            })
+            next_lesson_id += 1
+    lesson_rows.flush()
+    report(f"lekcje: {counts['lessons']}")
+
+    # --- Zapisy i oceny ---
+    enrollment_rows = _BatchInserter(Enrollment, counts)
+    grade_rows = _BatchInserter(Grade, counts)
+    next_enrollment_id = _next_id(Enrollment)
+    next_grade_id = _next_id(Grade)
+    per_student = min(enrollments_per_student, len(group_ids))
+
+    for student_id in student_ids:
+        ability = abilities[student_id]
+        # Przesunięcie rozkładu ocen w stronę lepszych/gorszych
+        weights = [
+            base * math.exp(0.6 * ability * (i - 2.5) / 2.5)
+            for i, base in enumerate(GRADE_DISTRIBUTION)
+        ]
+        for group_id in rng.sample(group_ids, per_student):
+            enrolled_at = BASE_DATE - timedelta(days=rng.randint(1, 30))
+            enrollment_rows.add({
+                "id": next_enrollment_id,
+                "student_id": student_id,
+                "group_id": group_id,
+                "created_at": enrolled_at,
+                "is_active": rng.random() > 0.01,
+            })
+            next_enrollment_id += 1
+
+            n_grades = max(0, int(rng.gauss(grades_per_enrollment, grades_per_enrollment / 4)))
+            values = rng.choices(GRADE_VALUES, weights=weights, k=n_grades)
+            for value in values:
+                grade_rows.add({
+                    "id": next_grade_id,
+                    "student_id": student_id,
+                    "group_id": group_id,
+                    "label": rng.choice(GRADE_LABELS),
+                    "value": value,
+                    "weight": rng.choice(GRADE_WEIGHTS),
+                    "created_at": enrolled_at + timedelta(days=rng.randint(7, 120)),
+                })
+                next_grade_id += 1
+    enrollment_rows.flush()
+    grade_rows.flush()
+    report(f"zapisy: {counts['enrollments']}, oceny: {counts['grades']}")
+
+    db.session.commit()
+
+    # Oceny wstawione z pominięciem GradeBook.add_grade – średnie liczymy od zera
+    counts["grade_summaries"] = GradeBook.rebuild()
+    report(f"średnie: {counts['grade_summaries']}")
+
+    # Aktualne statystyki dla planera zapytań SQLite
+    if db.engine.dialect.name == "sqlite":
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    report("ANALYZE")
+
+    counts["seconds"] = round(time.perf_counter() - started, 2)
+    return counts
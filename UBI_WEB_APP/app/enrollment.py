@@ -0,0 +1,205 @@
+"""
+app/enrollment.py
+----------------
+Masowe zapisy studentów do grup (np. na początku semestru).
+
+Zamiast jednego formularza, jednego zapytania i jednego commita na studenta:
+- identyfikatory (login, e-mail albo id) rozwiązujemy kilkoma zapytaniami IN,
+- już zapisanych studentów odrzucamy jednym anti-joinem,
+- resztę wstawiamy jednym `executemany` w jednej transakcji.
+"""
+
+import csv
+import io
+from datetime import datetime
+
+from app import db
+from app.models import ClassGroup, Enrollment, User, UserRole
+from app.timetable import timetable_cache
+
+# SQLite ma limit liczby parametrów w zapytaniu – IN (...) dzielimy na paczki.
+CHUNK_SIZE = 500
+
+# Największa wartość kolumny INTEGER w SQLite (większa liczba nie jest id)
+_MAX_ID = 2 ** 63 - 1
+
+# Statusy zwracane w raporcie dla każdego wiersza
+STATUS_ENROLLED = "enrolled"
+STATUS_ALREADY_ENROLLED = "already_enrolled"
+STATUS_DUPLICATE = "duplicate"
+STATUS_NOT_FOUND = "not_found"
+STATUS_NOT_STUDENT = "not_student"
+STATUS_INACTIVE = "inactive"
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def parse_identifiers(text: str):
+    """
+    Wyciąga identyfikatory studentów z tekstu: jeden na linię albo
+    pierwsza kolumna CSV. Nagłówek 'student' / 'username' / 'email' / 'id' jest pomijany.
+    """
+    identifiers = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row or not row[0].strip():
+            continue
+        value = row[0].strip()
+        if not identifiers and value.lower() in ("student", "username", "email", "id", "login"):
+            continue
+        identifiers.append(value)
+    return identifiers
+
+
+class BulkEnrollment:
+    """Metody do masowego zapisywania studentów do grup."""
+
+    @staticmethod
+    def _resolve(identifiers):
+        """
+        Zamienia identyfikatory na użytkowników – po jednym zapytaniu IN
+        (na paczkę) dla id, e-maili i loginów.
+
+        Zwraca:
+            słownik {identyfikator: (id, role, is_active)}
+        """
+        # isdigit() przepuszcza np. "²", którego int() nie zamieni – tylko cyfry ASCII
+        ids = [i for i in identifiers if i.isascii() and i.isdecimal()]
+        emails = [i for i in identifiers if "@" in i]
+        usernames = [i for i in identifiers if not (i.isascii() and i.isdecimal()) and "@" not in i]
+
+        # "007" i "7" to ten sam student – szukamy po znormalizowanym id,
+        # a wynik wpisujemy pod każdy podany identyfikator
+        tokens_by_id = {}
+        for i in ids:
+            tokens_by_id.setdefault(int(i), []).append(i)
+        # Liczby spoza zakresu INTEGER w SQLite nie mogą być id (i tak "not_found")
+        id_values = [value for value in tokens_by_id if value <= _MAX_ID]
+
+        columns = (User.id, User.username, User.email, User.role, User.is_active)
+        resolved = {}
+
+        for chunk in _chunks(id_values):
+            for row in db.session.execute(db.select(*columns).where(User.id.in_(chunk))):
+                for token in tokens_by_id[row.id]:
+                    resolved[token] = (row.id, row.role, row.is_active)
+        for chunk in _chunks(emails):
+            for row in db.session.execute(db.select(*columns).where(User.email.in_(chunk))):
+                resolved[row.email] = (row.id, row.role, row.is_active)
+        for chunk in _chunks(usernames):
+            for row in db.session.execute(db.select(*columns).where(User.username.in_(chunk))):
+                resolved[row.username] = (row.id, row.role, row.is_active)
+
+        return resolved
+
+    @staticmethod
+    def _not_enrolled(group_id: int, student_ids):
+        """
+        Zwraca zbiór id studentów, którzy NIE mają aktywnego zapisu do grupy.
+
+        Kandydatów wrzucamy do tabeli tymczasowej i robimy jeden anti-join
+        (LEFT JOIN ... WHERE e.id IS NULL) zamiast osobnego zapytania na studenta.
+        """
+        if not student_ids:
+            return set()
+
+        db.session.execute(db.text(
+            "CREATE TEMP TABLE IF NOT EXISTS bulk_enrollment_candidates (student_id INTEGER PRIMARY KEY)"
+        ))
+        db.session.execute(db.text("DELETE FROM bulk_enrollment_candidates"))
+        db.session.execute(
+            db.text("INSERT INTO bulk_enrollment_candidates (student_id) VALUES (:student_id)"),
+            [{"student_id": sid} for sid in student_ids],
+        )
+
+        rows = db.session.execute(db.text(
+            """
+            SELECT c.student_id
+            FROM bulk_enrollment_candidates AS c
+            LEFT JOIN enrollments AS e
+                ON e.student_id = c.student_id
+               AND e.group_id = :group_id
+               AND e.is_active = 1
+            WHERE e.id IS NULL
+            """
+        ), {"group_id": group_id})
+        result = {row.student_id for row in rows}
+
+        db.session.execute(db.text("DELETE FROM bulk_enrollment_candidates"))
+        return result
+
+    @staticmethod
+    def enroll(group: ClassGroup, identifiers, commit: bool = True):
+        """
+        Zapisuje listę studentów do grupy w jednej transakcji.
+
+        Parametry:
+            group       – grupa zajęciowa,
+            identifiers – loginy, e-maile albo id studentów (w dowolnej mieszance),
+            commit      – czy od razu zatwierdzić transakcję.
+
+        Zwraca:
+            listę słowników {"identifier", "student_id", "status"}
+            w kolejności wejściowej (status: enrolled, already_enrolled,
+            duplicate, not_found, not_student, inactive).
+        """
+        identifiers = [i.strip() for i in identifiers if i and i.strip()]
+        resolved = BulkEnrollment._resolve(list(dict.fromkeys(identifiers)))
+
+        report = []
+        candidates = []
+        seen = set()
+        for identifier in identifiers:
+            entry = {"identifier": identifier, "student_id": None, "status": None}
+            report.append(entry)
+
+            if identifier not in resolved:
+                entry["status"] = STATUS_NOT_FOUND
+                continue
+
+            student_id, role, is_active = resolved[identifier]
+            entry["student_id"] = student_id
+            if role != UserRole.STUDENT:
+                entry["status"] = STATUS_NOT_STUDENT
+            elif not is_active:
+                entry["status"] = STATUS_INACTIVE
+            elif student_id in seen:
+                entry["status"] = STATUS_DUPLICATE
+            else:
+                seen.add(student_id)
+                candidates.append(entry)
+
+        try:
+            to_insert = BulkEnrollment._not_enrolled(group.id, [e["student_id"] for e in candidates])
+
+            now = datetime.now()
+            rows = [
+                {"student_id": sid, "group_id": group.id, "created_at": now, "is_active": True}
+                for sid in sorted(to_insert)
+            ]
+            if rows:
+                # Jedno executemany zamiast N osobnych INSERT-ów z ORM
+                db.session.execute(db.insert(Enrollment), rows)
+                # INSERT z pominięciem ORM – plan zajęć tych studentów trzeba odświeżyć
+                timetable_cache.touch(student_ids=to_insert)
+
+            if commit:
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        for entry in candidates:
+            entry["status"] = STATUS_ENROLLED if entry["student_id"] in to_insert else STATUS_ALREADY_ENROLLED
+
+        return report
+
+    @staticmethod
+    def summary(report) -> dict:
+        """Liczba wierszy w raporcie dla każdego statusu."""
+        counts = {}
+        for entry in report:
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
@@ -0,0 +1,144 @@
+"""
+app/exports.py
+----------------
+Eksport CSV: dziennik ocen grupy, lista zapisów kursu i wszystkie oceny uczelni.
+
+- dane czytamy strumieniowo (`yield_per` – kursor po stronie serwera),
+  więc w pamięci jest jedna paczka EXPORT_BATCH_SIZE wierszy, a nie miliony ocen,
+- każdą paczkę od razu zamieniamy na tekst CSV i oddajemy generatorem;
+  widok owija go w `Response(stream_with_context(...))` – nagłówek pliku
+  trafia do przeglądarki, zanim baza zwróci pierwszy wiersz,
+- plik zaczyna się od BOM UTF-8, żeby Excel poprawnie pokazał polskie znaki,
+- tekst zaczynający się od =, +, -, @ (albo tabulatora / CR) dostaje na początku
+  apostrof – arkusz nie wykona go jako formuły (CSV injection).
+"""
+
+import csv
+import io
+
+from flask import Response, stream_with_context
+
+from app import db
+from app.models import ClassGroup, Course, Enrollment, Grade, User
+from config import EXPORT_BATCH_SIZE
+
+# Początki komórek, które Excel / LibreOffice traktują jako formułę
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _as_text(column):
+    """
+    Data jako tekst zapisany w bazie ("2026-03-15 08:00:00.000000") – bez
+    zamiany na datetime i z powrotem przy każdym z milionów wierszy.
+    """
+    return db.type_coerce(column, db.String).label(column.key)
+
+
+def _safe_cell(value):
+    """Komórka tekstowa wyglądająca na formułę poprzedzona apostrofem; liczby bez zmian."""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _safe_rows(partition, text_columns: list) -> list:
+    """
+    Wiersze paczki gotowe do zapisu – sprawdzamy tylko kolumny tekstowe,
+    a przepisujemy jedynie (rzadkie) wiersze z komórką wyglądającą na formułę.
+    """
+    rows = []
+    for row in partition:
+        for i in text_columns:
+            value = row[i]
+            if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+                row = [_safe_cell(cell) for cell in row]
+                break
+        rows.append(row)
+    return rows
+
+
+class CsvExport:
+    """Metody budujące strumienie CSV (generatory kawałków tekstu)."""
+
+    @staticmethod
+    def stream(header: list, statement, batch_size: int = EXPORT_BATCH_SIZE):
+        """
+        Generator CSV: najpierw BOM i nagłówek, potem po jednym kawałku tekstu
+        na każdą paczkę `batch_size` wierszy zapytania.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        buffer.write("\ufeff")
+        writer.writerow(header)
+        yield buffer.getvalue()
+
+        text_columns = [i for i, column in enumerate(statement.selected_columns)
+                        if isinstance(column.type, db.String)]
+
+        # Połączenie sesji bez warstwy ORM – zwykłe wiersze, bez drugiego opakowania
+        result = db.session.connection().execute(statement.execution_options(yield_per=batch_size))
+        try:
+            for partition in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(_safe_rows(partition, text_columns))
+                yield buffer.getvalue()
+        finally:
+            # Także gdy klient przerwie pobieranie (GeneratorExit)
+            result.close()
+
+    @staticmethod
+    def response(rows, filename: str) -> Response:
+        """Odpowiedź HTTP wysyłana kawałkami, w miarę generowania CSV."""
+        return Response(
+            stream_with_context(rows),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    @staticmethod
+    def group_grades(group_id: int):
+        """Dziennik ocen grupy: jedna linia na ocenę, studenci alfabetycznie."""
+        statement = (
+            db.select(User.username, User.last_name, User.first_name,
+                      Grade.label, Grade.value, Grade.weight, _as_text(Grade.created_at))
+            .join(User, Grade.student_id == User.id)
+            .where(Grade.group_id == group_id)
+            .order_by(User.last_name, User.first_name, Grade.created_at, Grade.id)
+        )
+        header = ["login", "nazwisko", "imię", "ocena", "wartość", "waga", "wystawiono"]
+        return CsvExport.stream(header, statement)
+
+    @staticmethod
+    def course_enrollments(course_id: int):
+        """Aktywne zapisy do wszystkich grup kursu."""
+        statement = (
+            db.select(ClassGroup.name, User.username, User.last_name, User.first_name,
+                      User.email, _as_text(Enrollment.created_at))
+            .join(ClassGroup, Enrollment.group_id == ClassGroup.id)
+            .join(User, Enrollment.student_id == User.id)
+            .where(ClassGroup.course_id == course_id, Enrollment.is_active.is_(True))
+            .order_by(ClassGroup.name, User.last_name, User.first_name)
+        )
+        header = ["grupa", "login", "nazwisko", "imię", "e-mail", "data zapisu"]
+        return CsvExport.stream(header, statement)
+
+    @staticmethod
+    def all_grades():
+        """
+        Wszystkie oceny uczelni w kolejności wystawienia (id) – bez sortowania
+        milionów wierszy przed wysłaniem pierwszego.
+        """
+        statement = (
+            db.select(Course.code, ClassGroup.name, ClassGroup.year, ClassGroup.semester,
+                      User.username, User.last_name, User.first_name,
+                      Grade.label, Grade.value, Grade.weight, _as_text(Grade.created_at))
+            .join(ClassGroup, Grade.group_id == ClassGroup.id)
+            .join(Course, ClassGroup.course_id == Course.id)
+            .join(User, Grade.student_id == User.id)
+            .order_by(Grade.id)
+        )
+        header = ["kurs", "grupa", "rok", "semestr", "login", "nazwisko", "imię",
+                  "ocena", "wartość", "waga", "wystawiono"]
+        return CsvExport.stream(header, statement)
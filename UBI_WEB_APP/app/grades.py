@@ -0,0 +1,206 @@
+"""
+app/grades.py
+----------------
+Średnie ważone ocen i średnia semestru (ważona punktami ECTS).
+
+Średnich nie liczymy przy każdym wyświetleniu z tabeli `grades`
+(miliony wierszy), tylko z tabeli zmaterializowanej `grade_summaries`:
+jeden wiersz na (student, grupa) z sumami value * weight, weight i liczbą ocen.
+
+- nowa ocena (`GradeBook.add_grade`) aktualizuje wiersz przyrostowo
+  – w tej samej transakcji co INSERT oceny,
+- średnia grupy = weighted_sum / weight_sum,
+- średnia kursu (wszystkie grupy kursu, np. wykład + laboratorium)
+  i semestru – jedno zapytanie GROUP BY na sumach,
+- średnia ECTS semestru = Σ(średnia kursu × ECTS) / Σ ECTS (kursy z ocenami),
+- `rebuild()` przelicza tabelę od zera jednym INSERT ... SELECT ... GROUP BY
+  (po imporcie danych z pominięciem aplikacji, np. generate-data).
+"""
+
+from datetime import datetime
+
+from app import db
+from app.models import Grade, GradeSummary
+
+# Przeliczenie sum z tabeli `grades` (wszystkich albo jednej grupy)
+_SUMMARY_SELECT = """
+    SELECT student_id, group_id,
+           SUM(value * COALESCE(weight, 1.0)) AS weighted_sum,
+           SUM(COALESCE(weight, 1.0)) AS weight_sum,
+           COUNT(*) AS grade_count
+    FROM grades
+    {where}
+    GROUP BY group_id, student_id
+"""
+
+# Średnie studenta per kurs w semestrze (kurs = wszystkie jego grupy)
+_COURSE_AVERAGES = """
+    SELECT c.id AS course_id, c.code, c.name, COALESCE(c.ects, 0) AS ects,
+           g.year, g.semester,
+           SUM(s.weighted_sum) AS weighted_sum,
+           SUM(s.weight_sum) AS weight_sum,
+           SUM(s.grade_count) AS grade_count
+    FROM grade_summaries AS s
+    JOIN class_groups AS g ON g.id = s.group_id
+    JOIN courses AS c ON c.id = g.course_id
+    WHERE s.student_id = :student_id
+    GROUP BY g.year, g.semester, c.id
+"""
+
+# Średnie studenta per semestr: zwykła średnia ważona wszystkich ocen
+# i średnia ECTS z średnich kursów (na wynikach powyższego zapytania)
+_SEMESTER_AVERAGES = f"""
+    WITH course_averages AS ({_COURSE_AVERAGES})
+    SELECT year, semester,
+           SUM(weighted_sum) / NULLIF(SUM(weight_sum), 0) AS average,
+           SUM(CASE WHEN weight_sum > 0 THEN ects * weighted_sum / weight_sum END)
+               / NULLIF(SUM(CASE WHEN weight_sum > 0 THEN ects END), 0) AS ects_average,
+           SUM(CASE WHEN weight_sum > 0 THEN ects ELSE 0 END) AS ects,
+           SUM(grade_count) AS grade_count
+    FROM course_averages
+    GROUP BY year, semester
+    ORDER BY year DESC, semester DESC
+"""
+
+
+class GradeBook:
+    """Metody do wystawiania ocen i odczytu średnich."""
+
+    @staticmethod
+    def add_grade(student_id: int, group_id: int, label: str, value: float, weight: float = 1.0,
+                  commit: bool = True) -> Grade:
+        """
+        Dodaje ocenę i przyrostowo aktualizuje `grade_summaries` (ta sama transakcja).
+
+        Zwraca:
+            nowy obiekt `Grade`.
+        """
+        if weight is None:
+            weight = 1.0
+        grade = Grade(student_id=student_id, group_id=group_id, label=label, value=value, weight=weight)
+        db.session.add(grade)
+
+        summaries = GradeSummary.__table__
+        now = datetime.now()
+        updated = db.session.execute(
+            summaries.update()
+            .where(summaries.c.student_id == student_id, summaries.c.group_id == group_id)
+            .values(
+                weighted_sum=summaries.c.weighted_sum + value * weight,
+                weight_sum=summaries.c.weight_sum + weight,
+                grade_count=summaries.c.grade_count + 1,
+                updated_at=now,
+            )
+        )
+        if updated.rowcount == 0:
+            db.session.execute(summaries.insert().values(
+                student_id=student_id, group_id=group_id,
+                weighted_sum=value * weight, weight_sum=weight, grade_count=1, updated_at=now,
+            ))
+
+        if commit:
+            db.session.commit()
+        return grade
+
+    @staticmethod
+    def rebuild(group_id: int = None) -> int:
+        """
+        Przelicza `grade_summaries` od zera (całą tabelę albo jedną grupę).
+
+        Zwraca:
+            liczbę wierszy zestawienia.
+        """
+        params = {"now": datetime.now()}
+        where = ""
+        if group_id is not None:
+            where = "WHERE group_id = :group_id"
+            params["group_id"] = group_id
+            db.session.execute(db.delete(GradeSummary).where(GradeSummary.group_id == group_id))
+        else:
+            db.session.execute(db.delete(GradeSummary))
+
+        result = db.session.execute(db.text(
+            "INSERT INTO grade_summaries (student_id, group_id, weighted_sum, weight_sum, grade_count, updated_at) "
+            "SELECT student_id, group_id, weighted_sum, weight_sum, grade_count, :now "
+            f"FROM ({_SUMMARY_SELECT.format(where=where)})"
+        ), params)
+        db.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def verify() -> list:
+        """
+        Porównuje `grade_summaries` z ocenami w `grades` (jedno zapytanie).
+
+        Zwraca:
+            listę (student_id, group_id) z niezgodnym lub brakującym zestawieniem.
+        """
+        rows = db.session.execute(db.text(f"""
+            SELECT fresh.student_id, fresh.group_id
+            FROM ({_SUMMARY_SELECT.format(where="")}) AS fresh
+            LEFT JOIN grade_summaries AS s
+                ON s.student_id = fresh.student_id AND s.group_id = fresh.group_id
+            WHERE s.student_id IS NULL
+               OR s.grade_count != fresh.grade_count
+               OR ABS(s.weighted_sum - fresh.weighted_sum) > 1e-6
+               OR ABS(s.weight_sum - fresh.weight_sum) > 1e-6
+            UNION ALL
+            SELECT s.student_id, s.group_id
+            FROM grade_summaries AS s
+            WHERE s.grade_count > 0 AND NOT EXISTS (
+                SELECT 1 FROM grades AS gr WHERE gr.student_id = s.student_id AND gr.group_id = s.group_id
+            )
+        """)).all()
+        return [(row.student_id, row.group_id) for row in rows]
+
+    @staticmethod
+    def group_averages(group_id: int) -> dict:
+        """
+        Średnie wszystkich studentów grupy (dziennik ocen) – jedno zapytanie,
+        same kolumny (bez obiektów ORM).
+
+        Zwraca:
+            {student_id: {"average": średnia albo None, "grade_count": liczba ocen}}
+        """
+        rows = db.session.execute(
+            db.select(GradeSummary.student_id, GradeSummary.weighted_sum,
+                      GradeSummary.weight_sum, GradeSummary.grade_count)
+            .where(GradeSummary.group_id == group_id)
+        )
+        return {
+            row.student_id: {
+                "average": row.weighted_sum / row.weight_sum if row.weight_sum else None,
+                "grade_count": row.grade_count,
+            }
+            for row in rows
+        }
+
+    @staticmethod
+    def student_report(student_id: int) -> list:
+        """
+        Średnie studenta (pulpit) – dwa zapytania niezależnie od liczby kursów.
+
+        Zwraca:
+            listę semestrów (od najnowszego):
+            {"year", "semester", "average", "ects_average", "ects", "grade_count",
+             "courses": [{"course_id", "code", "name", "ects", "average", "grade_count"}, ...]}
+        """
+        params = {"student_id": student_id}
+        semesters = [dict(row._mapping) for row in db.session.execute(db.text(_SEMESTER_AVERAGES), params)]
+        if not semesters:
+            return []
+
+        by_semester = {(s["year"], s["semester"]): s for s in semesters}
+        for s in semesters:
+            s["courses"] = []
+        courses = db.session.execute(db.text(_COURSE_AVERAGES + " ORDER BY c.code"), params)
+        for row in courses:
+            by_semester[(row.year, row.semester)]["courses"].append({
+                "course_id": row.course_id,
+                "code": row.code,
+                "name": row.name,
+                "ects": row.ects,
+                "average": row.weighted_sum / row.weight_sum if row.weight_sum else None,
+                "grade_count": row.grade_count,
+            })
+        return semesters
@@ -0,0 +1,276 @@
+"""
+app/ical.py
+----------------
+Kalendarze iCalendar (ICS) do subskrypcji w telefonie: plan użytkownika,
+plan grupy i zajęcia w sali.
+
+- aplikacje kalendarza pytają o plik co kilkanaście minut, więc zwykle
+  odpowiadamy 304 Not Modified: ETag liczymy z liczników zmian planu grup
+  (`class_groups.lesson_version`) – jedno małe zapytanie, bez czytania lekcji,
+- licznik to numer ostatniej zmiany planu grupy z globalnej sekwencji
+  (app/changes.py), więc największa wartość to wersja planu całej uczelni
+  – ETag kalendarzy sal,
+- treść (lekcje z okna ICS_FEED_PAST_WEEKS..ICS_FEED_FUTURE_WEEKS, cykle jako
+  RRULE z EXDATE) wysyłamy strumieniowo, paczkami jak eksport CSV,
+- telefon nie ma sesji – adres kalendarza zawiera podpisany token
+  użytkownika (`IcsFeed.token`), a nie hasło; token niesie też wersję linku
+  (`users.ics_feed_version`) – „Wygeneruj nowy link” podnosi ją i wszystkie
+  wcześniej wydane adresy przestają działać.
+"""
+
+import hashlib
+from datetime import datetime
+
+from flask import Response, current_app, request, stream_with_context
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from app import db
+from app.changes import LessonChanges
+from app.models import ClassGroup, Enrollment, Lesson, LessonSeries
+from app.timetable import WEEK, week_start
+from config import (
+    EXPORT_BATCH_SIZE,
+    ICS_FEED_FUTURE_WEEKS,
+    ICS_FEED_MAX_AGE,
+    ICS_FEED_PAST_WEEKS,
+    ICS_TIMEZONE,
+    ICS_UID_DOMAIN,
+)
+
+# Zmiana formatu pliku = nowe ETag-i u wszystkich subskrybentów
+FEED_FORMAT = 1
+
+# Czas lokalny bez strefy ("floating" w RFC 5545) – tak jak w bazie
+ICS_TIME = "%Y%m%dT%H%M%S"
+
+
+def _text(value) -> str:
+    """Tekst właściwości ICS (RFC 5545 3.3.11): \\ ; , i nowe linie poprzedzone \\."""
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _line(content: str) -> str:
+    """Linia ICS zakończona CRLF, zawinięta co 75 bajtów (RFC 5545 3.1)."""
+    if len(content) <= 75 and content.isascii():
+        return content + "\r\n"
+    parts, current, size, limit = [], [], 0, 75
+    for char in content:
+        width = len(char.encode())
+        if size + width > limit:
+            parts.append("".join(current))
+            # Linia kontynuacji zaczyna się spacją – zostaje 74 bajty
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += width
+    parts.append("".join(current))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _ics_time(column):
+    """Data jako tekst ICS prosto z SQLite – bez zamiany na datetime przy każdej lekcji."""
+    return db.func.strftime(ICS_TIME, column).label(column.key)
+
+
+def _details(title, room, group_name) -> list:
+    lines = [f"SUMMARY:{_text(title)} ({_text(group_name)})"]
+    if room:
+        lines.append(f"LOCATION:{_text(room)}")
+    return lines
+
+
+def _lesson_event(row, stamp: str) -> str:
+    """VEVENT jednej lekcji (wiersz z zapytania `IcsFeed.stream`)."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:lesson-{row.id}@{ICS_UID_DOMAIN}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{row.start_time}",
+        f"DTEND:{row.end_time}",
+        *_details(row.title, row.room, row.name),
+    ]
+    if row.is_canceled:
+        lines.append("STATUS:CANCELLED")
+    lines.append("END:VEVENT")
+    return "".join(_line(line) for line in lines)
+
+
+def _series_event(row, replaced, stamp: str) -> str:
+    """
+    VEVENT cyklu zajęć z RRULE. Dni pominięte i terminy zastąpione wierszem
+    `Lesson` (odwołane, zmaterializowane) trafiają do EXDATE – te lekcje są
+    w pliku jako osobne zdarzenia.
+    """
+    excluded = {datetime.combine(day, row.start_time.time()) for day in LessonSeries.parse_dates(row.excluded_dates)}
+    excluded.update(replaced)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:series-{row.id}@{ICS_UID_DOMAIN}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{row.start_time:{ICS_TIME}}",
+        f"DTEND:{row.end_time:{ICS_TIME}}",
+        f"RRULE:FREQ=WEEKLY;INTERVAL={row.interval_weeks};UNTIL={row.until:%Y%m%d}T235959",
+    ]
+    if excluded:
+        lines.append("EXDATE:" + ",".join(f"{moment:{ICS_TIME}}" for moment in sorted(excluded)))
+    lines += _details(row.title, row.room, row.name)
+    lines.append("END:VEVENT")
+    return "".join(_line(line) for line in lines)
+
+
+class IcsFeed:
+    """Metody budujące kalendarze ICS i odpowiedzi HTTP z ETag."""
+
+    @staticmethod
+    def _serializer() -> URLSafeSerializer:
+        return URLSafeSerializer(current_app.config["SECRET_KEY"], salt="ics-feed")
+
+    @staticmethod
+    def token(user_id: int, feed_version: int = 0) -> str:
+        """Podpisany token użytkownika (id i wersja linku) do adresu kalendarza."""
+        if not feed_version:
+            # Wersja 0 – ten sam token co przed wersjonowaniem linków
+            return IcsFeed._serializer().dumps(user_id)
+        return IcsFeed._serializer().dumps([user_id, feed_version])
+
+    @staticmethod
+    def payload(token: str):
+        """(id użytkownika, wersja linku) z tokenu albo None (zły podpis lub format)."""
+        try:
+            data = IcsFeed._serializer().loads(token)
+        except BadSignature:
+            return None
+        if isinstance(data, int):
+            return data, 0
+        if (isinstance(data, list) and len(data) == 2
+                and all(isinstance(part, int) for part in data)):
+            return data[0], data[1]
+        return None
+
+    @staticmethod
+    def window(now: datetime = None) -> tuple:
+        """Zakres dat pliku [początek, koniec) – od poniedziałku, przesuwa się co tydzień."""
+        monday = week_start(now or datetime.now())
+        return monday - ICS_FEED_PAST_WEEKS * WEEK, monday + ICS_FEED_FUTURE_WEEKS * WEEK
+
+    @staticmethod
+    def etag(*parts) -> str:
+        """Silny ETag z wersji danych (ten sam plik = ten sam ETag we wszystkich procesach)."""
+        return hashlib.sha1("|".join(str(part) for part in (FEED_FORMAT, *parts)).encode()).hexdigest()
+
+    @staticmethod
+    def stream(name: str, lesson_filter, series_filter, start: datetime, end: datetime,
+               batch_size: int = EXPORT_BATCH_SIZE):
+        """
+        Generator pliku ICS: nagłówek, cykle zajęć (RRULE), potem lekcje
+        z zakresu [start, end) paczkami po `batch_size`.
+        """
+        # DTSTAMP z danych, nie z zegara – ten sam ETag musi oznaczać te same bajty
+        stamp = f"{start:%Y%m%d}T000000Z"
+        yield "".join((
+            "BEGIN:VCALENDAR\r\n",
+            "VERSION:2.0\r\n",
+            "PRODID:-//UBI//Plan zajec//PL\r\n",
+            "CALSCALE:GREGORIAN\r\n",
+            "METHOD:PUBLISH\r\n",
+            _line(f"X-WR-CALNAME:{_text(name)}"),
+            _line(f"X-WR-TIMEZONE:{ICS_TIMEZONE}"),
+        ))
+
+        series = db.session.execute(
+            db.select(LessonSeries.id, LessonSeries.title, LessonSeries.room,
+                      LessonSeries.start_time, LessonSeries.end_time, LessonSeries.interval_weeks,
+                      LessonSeries.until, LessonSeries.excluded_dates, ClassGroup.name)
+            .join(ClassGroup, LessonSeries.group_id == ClassGroup.id)
+            .where(series_filter, LessonSeries.start_time < end, LessonSeries.until >= start.date())
+            .order_by(LessonSeries.id)
+        ).all()
+        if series:
+            replaced = {}
+            for series_id, occurrence in db.session.execute(
+                db.select(Lesson.series_id, Lesson.occurrence_start)
+                .where(Lesson.series_id.in_([row.id for row in series]))
+            ):
+                replaced.setdefault(series_id, []).append(occurrence)
+            yield "".join(_series_event(row, replaced.get(row.id, ()), stamp) for row in series)
+
+        statement = (
+            db.select(Lesson.id, Lesson.title, Lesson.room, _ics_time(Lesson.start_time),
+                      _ics_time(Lesson.end_time), Lesson.is_canceled, ClassGroup.name)
+            .join(ClassGroup, Lesson.group_id == ClassGroup.id)
+            .where(lesson_filter, Lesson.start_time >= start, Lesson.start_time < end)
+            .order_by(Lesson.start_time, Lesson.id)
+        )
+        result = db.session.connection().execute(statement.execution_options(yield_per=batch_size))
+        try:
+            for partition in result.partitions():
+                yield "".join(_lesson_event(row, stamp) for row in partition)
+        finally:
+            # Także gdy klient przerwie pobieranie (GeneratorExit)
+            result.close()
+        yield "END:VCALENDAR\r\n"
+
+    @staticmethod
+    def response(etag: str, rows, filename: str) -> Response:
+        """
+        304 bez generowania pliku, gdy klient ma aktualną wersję (If-None-Match),
+        inaczej plik wysyłany kawałkami. `rows` to generator – nieuruchomiony nic nie czyta.
+        """
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(
+                stream_with_context(rows),
+                mimetype="text/calendar",
+                headers={"Content-Disposition": f'inline; filename="{filename}"'},
+            )
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = f"private, max-age={ICS_FEED_MAX_AGE}"
+        return response
+
+    @staticmethod
+    def user_feed(user_id: int, role: str) -> Response:
+        """Plan studenta (grupy z aktywnym zapisem) albo wykładowcy (prowadzone grupy)."""
+        if role == "student":
+            group_ids = db.select(Enrollment.group_id).where(
+                Enrollment.student_id == user_id, Enrollment.is_active.is_(True)
+            )
+        elif role == "lecturer":
+            group_ids = db.select(ClassGroup.id).where(ClassGroup.lecturer_id == user_id)
+        else:
+            group_ids = db.select(ClassGroup.id).where(db.false())
+
+        versions = db.session.execute(
+            db.select(ClassGroup.id, ClassGroup.lesson_version)
+            .where(ClassGroup.id.in_(group_ids))
+            .order_by(ClassGroup.id)
+        ).all()
+        start, end = IcsFeed.window()
+        etag = IcsFeed.etag("user", f"{start:%Y%m%d}", ",".join(f"{gid}:{version}" for gid, version in versions))
+
+        ids = [gid for gid, _ in versions]
+        rows = IcsFeed.stream("Plan zajęć", Lesson.group_id.in_(ids), LessonSeries.group_id.in_(ids), start, end)
+        return IcsFeed.response(etag, rows, "plan.ics")
+
+    @staticmethod
+    def group_feed(group: ClassGroup) -> Response:
+        """Plan jednej grupy – ETag z wersji już wczytanej grupy, bez dodatkowych zapytań."""
+        start, end = IcsFeed.window()
+        etag = IcsFeed.etag("group", f"{start:%Y%m%d}", group.id, group.lesson_version)
+        rows = IcsFeed.stream(group.name, Lesson.group_id == group.id, LessonSeries.group_id == group.id,
+                              start, end)
+        return IcsFeed.response(etag, rows, f"grupa_{group.id}.ics")
+
+    @staticmethod
+    def room_feed(room: str) -> Response:
+        """Zajęcia w sali (wszystkie grupy) – ETag z numeru ostatniej zmiany planu."""
+        start, end = IcsFeed.window()
+        etag = IcsFeed.etag("room", f"{start:%Y%m%d}", room, LessonChanges.latest())
+        rows = IcsFeed.stream(f"Sala {room}", Lesson.room == room, LessonSeries.room == room, start, end)
+        return IcsFeed.response(etag, rows, "sala.ics")
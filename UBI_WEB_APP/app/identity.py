@@ -0,0 +1,123 @@
+"""
+app/identity.py
+----------------
+Zalogowany użytkownik w bieżącym żądaniu.
+
+- `before_request` raz na żądanie ustala tożsamość (`g.identity`: id, login,
+  rola, czy aktywny) na podstawie `session["user_id"]`,
+- tożsamości trzymamy w krótkotrwałej pamięci podręcznej procesu
+  (IDENTITY_CACHE_TTL sekund), więc zwykłe żądanie nie pyta bazy o rolę,
+- konto wyłączone przez admina (`admin_toggle_user`) jest usuwane z pamięci
+  podręcznej od razu, a jego sesja zostaje wyczyszczona przy następnym żądaniu,
+- `current_user()` zwraca pełny obiekt `User` – ładowany najwyżej raz na żądanie.
+
+Pamięć podręczna jest osobna w każdym procesie roboczym serve.py – w pozostałych
+procesach wyłączenie konta działa najpóźniej po IDENTITY_CACHE_TTL sekundach.
+"""
+
+import threading
+import time
+
+from flask import g, redirect, request, session, url_for
+
+from app import db
+from app.models import User
+
+
+class Identity:
+    """Dane zalogowanego użytkownika potrzebne do autoryzacji (bez zapytań do bazy)."""
+
+    __slots__ = ("id", "username", "role", "is_active", "ics_feed_version")
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role.value  # enum -> tekst, jak w sesji
+        self.is_active = bool(user.is_active)
+        self.ics_feed_version = user.ics_feed_version or 0
+
+
+class IdentityCache:
+    """
+    Pamięć podręczna tożsamości {user_id: (ważne_do, Identity)} –
+    podłączana w `create_app()` tak jak `db.init_app(app)`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.ttl = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("IDENTITY_CACHE_TTL") or 0
+        # Nowa aplikacja = być może inna baza – nie ufamy starym wpisom
+        self.clear()
+
+        app.before_request(load_current_user)
+        app.context_processor(lambda: {"current_identity": g.get("identity")})
+
+    def get(self, user_id: int):
+        """Tożsamość z pamięci podręcznej albo z bazy (None, gdy konta nie ma)."""
+        if self.ttl:
+            with self._lock:
+                entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        # Pełny obiekt i tak już mamy – current_user() nie musi pytać bazy drugi raz
+        g.user = user
+        return self.put(user)
+
+    def put(self, user: User) -> Identity:
+        identity = Identity(user)
+        if self.ttl:
+            with self._lock:
+                self._entries[user.id] = (time.monotonic() + self.ttl, identity)
+        return identity
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def load_current_user():
+    """
+    `before_request`: ustawia `g.identity` (albo None dla niezalogowanych).
+
+    Jeśli konto zostało usunięte lub wyłączone – czyścimy sesję
+    i przekierowujemy na stronę logowania.
+    """
+    g.identity = None
+    user_id = session.get("user_id")
+    if not user_id:
+        return None
+
+    identity = identity_cache.get(user_id)
+    if identity is None or not identity.is_active:
+        session.clear()
+        if request.endpoint and not request.endpoint.startswith("auth.") and request.endpoint != "static":
+            return redirect(url_for("auth.login"))
+        return None
+
+    g.identity = identity
+    return None
+
+
+def current_user():
+    """Obiekt `User` zalogowanego użytkownika (jedno zapytanie na żądanie) albo None."""
+    if g.get("identity") is None:
+        return None
+    if g.get("user") is None:
+        g.user = db.session.get(User, g.identity.id)
+    return g.user
+
+
+# Globalny obiekt – tak jak `db`
+identity_cache = IdentityCache()
@@ -0,0 +1,185 @@
+"""
+app/instrumentation.py
+----------------
+Pomiary wydajności dla każdego żądania HTTP:
+- liczba zapytań SQL i łączny czas spędzony w bazie,
+- czas renderowania szablonów,
+- całkowity czas obsługi żądania.
+
+Wyniki trafiają do nagłówka `Server-Timing` (widoczny w narzędziach
+deweloperskich przeglądarki) oraz do zbiorczych statystyk pod `/metrics`
+(domyślnie wyłączone – METRICS_ENDPOINT_ENABLED; po włączeniu tylko dla
+admina i połączeń z tej samej maszyny, np. lokalnego Prometheusa).
+Zapytania wolniejsze niż SLOW_QUERY_THRESHOLD_MS są logowane.
+"""
+
+import threading
+import time
+
+from flask import abort, before_render_template, g, has_request_context, request, template_rendered, Response
+
+from app import db
+
+# Adresy, z których /metrics jest dostępne bez logowania (scraper na tej samej maszynie)
+LOCAL_ADDRESSES = {"127.0.0.1", "::1"}
+
+
+class RequestStats:
+    """Statystyki jednego żądania (trzymane w `flask.g`)."""
+
+    __slots__ = ("started", "queries", "db_time", "template_time", "_template_started")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._template_started = []
+
+    @property
+    def wall_time(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def current_stats():
+    """Zwraca statystyki bieżącego żądania albo None (np. poza żądaniem)."""
+    if not has_request_context():
+        return None
+    return g.get("request_stats")
+
+
+class RequestMetrics:
+    """
+    Rozszerzenie zbierające pomiary – podłączane w `create_app()`
+    tak jak `db.init_app(app)`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # endpoint -> [liczba żądań, czas całkowity, czas DB, czas szablonów, liczba zapytań]
+        self._totals = {}
+        self.slow_query_threshold = None
+        self.logger = None
+
+    def init_app(self, app):
+        self.slow_query_threshold = app.config.get("SLOW_QUERY_THRESHOLD_MS")
+        self.logger = app.logger
+
+        with app.app_context():
+            db.event.listen(db.engine, "before_cursor_execute", self._before_cursor_execute)
+            db.event.listen(db.engine, "after_cursor_execute", self._after_cursor_execute)
+
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+        if app.config.get("METRICS_ENDPOINT_ENABLED"):
+            app.add_url_rule("/metrics", "metrics", self.metrics_view)
+
+    # --- SQLAlchemy ---
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Czas startu na kontekście tego zapytania, nie na połączeniu: gdy
+        # zapytanie rzuci wyjątek, after_cursor_execute się nie wykona,
+        # a kontekst znika razem z zapytaniem (połączenie z puli zostaje czyste)
+        context._ubi_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._ubi_started
+
+        stats = current_stats()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+
+        if self.slow_query_threshold is not None and elapsed * 1000 >= self.slow_query_threshold:
+            endpoint = request.endpoint if has_request_context() else "-"
+            self.logger.warning(
+                "Wolne zapytanie (%.1f ms, endpoint=%s): %s",
+                elapsed * 1000, endpoint, " ".join(statement.split()),
+            )
+
+    # --- Szablony ---
+
+    def _before_render(self, sender, template, context, **extra):
+        stats = current_stats()
+        if stats is not None:
+            stats._template_started.append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        stats = current_stats()
+        if stats is not None and stats._template_started:
+            stats.template_time += time.perf_counter() - stats._template_started.pop()
+
+    # --- Cykl życia żądania ---
+
+    def _before_request(self):
+        g.request_stats = RequestStats()
+
+    def _after_request(self, response):
+        stats = current_stats()
+        if stats is None:
+            return response
+
+        wall = stats.wall_time
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+            f"tpl;dur={stats.template_time * 1000:.2f}",
+            f"total;dur={wall * 1000:.2f}",
+        ])
+
+        endpoint = request.endpoint or "-"
+        with self._lock:
+            totals = self._totals.setdefault(endpoint, [0, 0.0, 0.0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += stats.db_time
+            totals[3] += stats.template_time
+            totals[4] += stats.queries
+
+        return response
+
+    # --- /metrics ---
+
+    def snapshot(self) -> dict:
+        """Kopia zbiorczych statystyk {endpoint: {...}}."""
+        with self._lock:
+            return {
+                endpoint: {
+                    "requests": t[0],
+                    "wall_seconds": t[1],
+                    "db_seconds": t[2],
+                    "template_seconds": t[3],
+                    "queries": t[4],
+                }
+                for endpoint, t in self._totals.items()
+            }
+
+    def metrics_view(self):
+        """Statystyki w formacie tekstowym Prometheusa – admin albo połączenie lokalne."""
+        identity = g.get("identity")
+        is_admin = identity is not None and identity.role == "admin"
+        if not is_admin and request.remote_addr not in LOCAL_ADDRESSES:
+            abort(403)
+
+        lines = []
+        metrics = [
+            ("requests", "http_requests_total", "Liczba obsłużonych żądań"),
+            ("wall_seconds", "http_request_seconds_total", "Łączny czas obsługi żądań"),
+            ("db_seconds", "http_request_db_seconds_total", "Łączny czas zapytań SQL"),
+            ("template_seconds", "http_request_template_seconds_total", "Łączny czas renderowania szablonów"),
+            ("queries", "http_request_queries_total", "Łączna liczba zapytań SQL"),
+        ]
+        snapshot = self.snapshot()
+        for key, name, help_text in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for endpoint, values in sorted(snapshot.items()):
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {values[key]}')
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+# Globalny obiekt – tak jak `db`
+request_metrics = RequestMetrics()
@@ -0,0 +1,418 @@
+"""
+app/migrate.py
+----------------
+Migracje schematu bazy: wersjonowane skrypty w katalogu app/migrations/.
+
+Każdy skrypt `vNNN_nazwa.py` (NNN = numer wersji) definiuje:
+- DESCRIPTION    – krótki opis (zapisywany w tabeli `schema_version`),
+- upgrade(op)    – zmiany schematu wykonywane przez obiekt `Operations`,
+- downgrade(op)  – (opcjonalnie) cofnięcie zmian; bez niej migracja jest nieodwracalna.
+
+Operacje są idempotentne (IF NOT EXISTS, sprawdzenie kolumny), więc przerwaną
+migrację wystarczy uruchomić ponownie – wersja jest zapisywana dopiero po
+wykonaniu wszystkich kroków.
+
+Duże tabele bez blokowania bazy na minuty:
+- każdy krok to osobna, krótka transakcja (a nie jedna na całą migrację),
+- ALTER TABLE ... ADD COLUMN w SQLite zmienia tylko definicję tabeli (czas stały),
+- wypełnianie danych (`backfill`, `execute_in_batches`) idzie paczkami po zakresach id, z przerwą
+  między paczkami – czekający zapis (np. wystawienie oceny) wchodzi pomiędzy
+  paczki zamiast czekać na koniec migracji,
+- indeks SQLite powstaje jedną instrukcją CREATE INDEX (nie da się go budować
+  paczkami), dlatego każdy indeks to osobny krok – blokada zapisu trwa tylko
+  tyle, ile budowa jednego indeksu; raport pokazuje ile i ostrzega, gdy dłużej
+  niż busy_timeout (wtedy równoległe zapisy dostają "database is locked"
+  – taką migrację lepiej uruchomić poza godzinami pracy),
+- ANALYZE z PRAGMA analysis_limit – statystyki z próbki zamiast pełnego przeglądu.
+
+Uruchomienie:
+    flask --app app migrate status
+    flask --app app migrate up [--to N] [--dry-run]
+    flask --app app migrate down --to N [--dry-run]
+"""
+
+import importlib
+import pkgutil
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateTable
+
+from app import db
+from config import MIGRATION_BATCH_SIZE, MIGRATION_BATCH_PAUSE
+
+_SCRIPT_NAME = re.compile(r"^v(\d{3})_\w+$")
+
+# Liczba wierszy próbki dla ANALYZE (SQLite: PRAGMA analysis_limit)
+ANALYSIS_LIMIT = 1000
+
+
+class MigrationError(RuntimeError):
+    """Błąd planu migracji (np. brak skryptu, migracja nieodwracalna)."""
+
+
+class Migration:
+    """Jeden skrypt migracji."""
+
+    def __init__(self, version: int, name: str, module):
+        self.version = version
+        self.name = name
+        self.module = module
+        self.description = module.DESCRIPTION
+        self.reversible = hasattr(module, "downgrade")
+
+    def __repr__(self) -> str:
+        return f"<Migration {self.version} {self.name}>"
+
+
+@lru_cache(maxsize=None)
+def load_migrations() -> tuple:
+    """
+    Wczytuje skrypty z app/migrations/ (raz na proces).
+
+    Zwraca:
+        krotkę obiektów `Migration` posortowaną po wersji (1, 2, 3, ...).
+    """
+    from app import migrations as package
+
+    found = {}
+    for info in pkgutil.iter_modules(package.__path__):
+        match = _SCRIPT_NAME.match(info.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in found:
+            raise MigrationError(f"Dwa skrypty migracji w wersji {version}: {found[version].name}, {info.name}")
+        module = importlib.import_module(f"{package.__name__}.{info.name}")
+        found[version] = Migration(version, info.name, module)
+
+    versions = sorted(found)
+    if versions != list(range(1, len(versions) + 1)):
+        raise MigrationError(f"Wersje migracji muszą być kolejne od 1, są: {versions}")
+    return tuple(found[v] for v in versions)
+
+
+class Operations:
+    """
+    Operacje dostępne w skryptach migracji (`op` w upgrade/downgrade).
+
+    Każda operacja to osobny krok z pomiarem czasu. W trybie `dry_run`
+    kroki są tylko zapisywane (treść SQL), baza nie jest zmieniana.
+    """
+
+    def __init__(self, engine, dry_run=False, batch_size=MIGRATION_BATCH_SIZE, pause=MIGRATION_BATCH_PAUSE):
+        self.engine = engine
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.pause = pause
+        self.steps = []
+        self.lock_budget_ms = self._busy_timeout()
+
+    def _busy_timeout(self):
+        """
+        Jak długo zapis aplikacji czeka na blokadę (SQLite: PRAGMA busy_timeout).
+        Krok trzymający blokadę dłużej może skończyć się u innych "database is locked".
+        """
+        if self.engine.dialect.name != "sqlite":
+            return None
+        with self.engine.connect() as conn:
+            return conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+
+    # --- sprawdzenia stanu bazy (tylko odczyt – działają też w dry-run) ---
+
+    def has_table(self, table: str) -> bool:
+        return db.inspect(self.engine).has_table(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        inspector = db.inspect(self.engine)
+        if not inspector.has_table(table):
+            return False
+        return any(c["name"] == column for c in inspector.get_columns(table))
+
+    def has_index(self, table: str, name: str) -> bool:
+        # Prosto z sqlite_master – inspektor SQLAlchemy pomija indeksy na wyrażeniach (lower(...))
+        with self.engine.connect() as conn:
+            return conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND name = ?",
+                (table, name),
+            ).first() is not None
+
+    # --- kroki ---
+
+    def _step(self, description: str, sql: str, action=None, skip: bool = False) -> dict:
+        """
+        Wykonuje `action(conn)` w osobnej transakcji i zapisuje czas kroku.
+        `action` zwraca liczbę zmienionych wierszy (albo None).
+        """
+        step = self._new_step(description, sql)
+
+        if skip:
+            step["status"] = "skipped"
+            return step
+        if self.dry_run or action is None:
+            return step
+
+        start = time.perf_counter()
+        with self.engine.begin() as conn:
+            rows = action(conn)
+        step["duration_ms"] = step["max_lock_ms"] = (time.perf_counter() - start) * 1000
+        step["rows"] = rows if rows is None or rows >= 0 else None
+        step["batches"] = 1
+        self._finish(step)
+        return step
+
+    def _new_step(self, description: str, sql: str) -> dict:
+        step = {"description": description, "sql": sql, "status": "dry-run", "rows": None,
+                "batches": 0, "duration_ms": 0.0, "max_lock_ms": 0.0, "over_lock_budget": False}
+        self.steps.append(step)
+        return step
+
+    def _finish(self, step: dict):
+        step["status"] = "done"
+        step["over_lock_budget"] = bool(self.lock_budget_ms) and step["max_lock_ms"] > self.lock_budget_ms
+
+    def execute(self, sql: str, params=None, description: str = None) -> dict:
+        """Dowolna instrukcja SQL (jedna transakcja)."""
+        return self._step(
+            description or " ".join(sql.split())[:60],
+            sql,
+            lambda conn: conn.execute(db.text(sql), params or {}).rowcount,
+        )
+
+    def create_all(self) -> dict:
+        """Tabele z modeli, których w bazie jeszcze nie ma (z indeksami)."""
+        missing = [t for t in db.metadata.sorted_tables if not self.has_table(t.name)]
+        sql = ";\n".join(str(CreateTable(t).compile(dialect=self.engine.dialect)).strip() for t in missing)
+        return self._step(
+            f"create_all ({len(missing)} tabel)",
+            sql,
+            lambda conn: db.metadata.create_all(conn, checkfirst=True),
+            skip=not missing,
+        )
+
+    def create_table(self, table) -> dict:
+        """Tabela (obiekt `Table`, np. `Model.__table__`) razem z jej indeksami."""
+        sql = str(CreateTable(table).compile(dialect=self.engine.dialect)).strip()
+        return self._step(
+            f"create table {table.name}",
+            sql,
+            lambda conn: table.create(conn, checkfirst=True),
+            skip=self.has_table(table.name),
+        )
+
+    def drop_table(self, table: str) -> dict:
+        return self.execute(f"DROP TABLE IF EXISTS {table}", description=f"drop table {table}")
+
+    def add_column(self, table: str, column: str, type_sql: str, default=None, nullable: bool = True) -> dict:
+        """
+        ALTER TABLE ... ADD COLUMN. Kolumna NOT NULL musi mieć wartość domyślną
+        (`default` – wyrażenie SQL, np. "0" albo "'brak'").
+        """
+        sql = f"ALTER TABLE {table} ADD COLUMN {column} {type_sql}"
+        if not nullable:
+            sql += " NOT NULL"
+        if default is not None:
+            sql += f" DEFAULT {default}"
+        return self._step(
+            f"add column {table}.{column}",
+            sql,
+            lambda conn: conn.exec_driver_sql(sql).rowcount,
+            skip=self.has_column(table, column),
+        )
+
+    def drop_column(self, table: str, column: str) -> dict:
+        sql = f"ALTER TABLE {table} DROP COLUMN {column}"
+        return self._step(
+            f"drop column {table}.{column}",
+            sql,
+            lambda conn: conn.exec_driver_sql(sql).rowcount,
+            skip=not self.has_column(table, column),
+        )
+
+    def create_index(self, name: str, table: str, columns, unique: bool = False, where: str = None) -> dict:
+        """Indeks (opcjonalnie unikalny i częściowy – `where`) w osobnej transakcji."""
+        sql = (
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+            f"ON {table} ({', '.join(columns)})"
+        )
+        if where:
+            sql += f" WHERE {where}"
+        return self._step(
+            f"create index {name}",
+            sql,
+            lambda conn: conn.exec_driver_sql(sql).rowcount,
+            skip=self.has_index(table, name),
+        )
+
+    def drop_index(self, name: str) -> dict:
+        return self.execute(f"DROP INDEX IF EXISTS {name}", description=f"drop index {name}")
+
+    def backfill(self, table: str, set_sql: str, where: str = None, params=None, key: str = "id",
+                 description: str = None) -> dict:
+        """
+        UPDATE {table} SET {set_sql} paczkami po `batch_size` kolejnych wartości
+        klucza – każda paczka to osobna, krótka transakcja.
+        """
+        sql = f"UPDATE {table} SET {set_sql} WHERE {key} >= :batch_start AND {key} < :batch_end"
+        if where:
+            sql += f" AND ({where})"
+        return self.execute_in_batches(sql, table, key=key, params=params,
+                                       description=description or f"backfill {table}: {set_sql}")
+
+    def execute_in_batches(self, sql: str, table: str, key: str = "id", params=None,
+                           batch_size: int = None, description: str = None) -> dict:
+        """
+        Wykonuje `sql` (z parametrami :batch_start i :batch_end) dla kolejnych
+        zakresów `table.key` – np. INSERT ... SELECT ... WHERE group_id >= :batch_start
+        AND group_id < :batch_end. Każda paczka to osobna, krótka transakcja.
+        """
+        batch_size = batch_size or self.batch_size
+        step = self._new_step(description or " ".join(sql.split())[:60], sql)
+
+        with self.engine.connect() as conn:
+            # Dwa podzapytania: MIN i MAX w jednym SELECT-cie SQLite liczy przeglądem tabeli
+            low, high = conn.exec_driver_sql(
+                f"SELECT (SELECT MIN({key}) FROM {table}), (SELECT MAX({key}) FROM {table})"
+            ).one()
+        starts = range(low, high + 1, batch_size) if low is not None else range(0)
+        step["batches"] = len(starts)
+        if self.dry_run:
+            return step
+
+        statement = db.text(sql)
+        rows = 0
+        start = time.perf_counter()
+        for batch_start in starts:
+            batch_started = time.perf_counter()
+            with self.engine.begin() as conn:
+                result = conn.execute(statement, {**(params or {}), "batch_start": batch_start,
+                                                  "batch_end": batch_start + batch_size})
+                rows += max(result.rowcount, 0)
+            step["max_lock_ms"] = max(step["max_lock_ms"], (time.perf_counter() - batch_started) * 1000)
+            if self.pause:
+                time.sleep(self.pause)
+
+        step["duration_ms"] = (time.perf_counter() - start) * 1000
+        step["rows"] = rows
+        self._finish(step)
+        return step
+
+    def analyze(self) -> dict:
+        """Odświeża statystyki planera (SQLite: z próbki ANALYSIS_LIMIT wierszy na indeks)."""
+        sqlite = self.engine.dialect.name == "sqlite"
+        sql = f"PRAGMA analysis_limit={ANALYSIS_LIMIT}; ANALYZE" if sqlite else "ANALYZE"
+
+        def action(conn):
+            if sqlite:
+                conn.exec_driver_sql(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+            conn.exec_driver_sql("ANALYZE")
+
+        return self._step("analyze", sql, action)
+
+
+class MigrationRunner:
+    """Metody do planowania i wykonywania migracji."""
+
+    @staticmethod
+    def applied() -> dict:
+        """Zastosowane wersje: {wersja: data} (pusty słownik, gdy bazy nie zainicjowano)."""
+        try:
+            with db.engine.connect() as conn:
+                rows = conn.exec_driver_sql("SELECT version, applied_at FROM schema_version").all()
+        except OperationalError:
+            return {}
+        return {version: applied_at for version, applied_at in rows}
+
+    @staticmethod
+    def current_version():
+        applied = MigrationRunner.applied()
+        return max(applied) if applied else None
+
+    @staticmethod
+    def status() -> list:
+        """Lista {"version", "description", "reversible", "applied_at"} dla wszystkich skryptów."""
+        applied = MigrationRunner.applied()
+        return [
+            {"version": m.version, "description": m.description,
+             "reversible": m.reversible, "applied_at": applied.get(m.version)}
+            for m in load_migrations()
+        ]
+
+    @staticmethod
+    def _run(migration: Migration, direction: str, dry_run: bool, batch_size: int, pause: float) -> dict:
+        from app.models import SchemaVersion
+
+        op = Operations(db.engine, dry_run=dry_run, batch_size=batch_size, pause=pause)
+        start = time.perf_counter()
+        getattr(migration.module, "upgrade" if direction == "up" else "downgrade")(op)
+
+        if not dry_run:
+            versions = SchemaVersion.__table__
+            with db.engine.begin() as conn:
+                if direction == "up":
+                    conn.execute(versions.insert().values(
+                        version=migration.version, description=migration.description, applied_at=datetime.now(),
+                    ))
+                else:
+                    conn.execute(versions.delete().where(versions.c.version == migration.version))
+
+        return {
+            "version": migration.version,
+            "description": migration.description,
+            "direction": direction,
+            "dry_run": dry_run,
+            "steps": op.steps,
+            "duration_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    @staticmethod
+    def upgrade(target: int = None, dry_run: bool = False, batch_size: int = MIGRATION_BATCH_SIZE,
+                pause: float = MIGRATION_BATCH_PAUSE, progress=None) -> list:
+        """
+        Wykonuje brakujące migracje (wersje > bieżąca, do `target` włącznie).
+
+        Zwraca:
+            listę raportów {"version", "description", "direction", "dry_run", "steps", "duration_ms"}.
+        """
+        migrations = load_migrations()
+        latest = migrations[-1].version
+        if target is not None and not 1 <= target <= latest:
+            raise MigrationError(f"Nie ma migracji w wersji {target} (dostępne: 1–{latest})")
+
+        current = MigrationRunner.current_version() or 0
+        results = []
+        for migration in migrations:
+            if migration.version <= current or (target is not None and migration.version > target):
+                continue
+            result = MigrationRunner._run(migration, "up", dry_run, batch_size, pause)
+            results.append(result)
+            if progress:
+                progress(result)
+        return results
+
+    @staticmethod
+    def downgrade(target: int, dry_run: bool = False, batch_size: int = MIGRATION_BATCH_SIZE,
+                  pause: float = MIGRATION_BATCH_PAUSE, progress=None) -> list:
+        """
+        Cofa migracje od bieżącej wersji do `target` (wersja `target` zostaje).
+        Jeśli któraś z nich jest nieodwracalna – nie cofa niczego.
+        """
+        current = MigrationRunner.current_version() or 0
+        if target < 0 or target > current:
+            raise MigrationError(f"Nie można cofnąć do wersji {target} (bieżąca: {current})")
+
+        to_revert = [m for m in reversed(load_migrations()) if target < m.version <= current]
+        irreversible = [m.version for m in to_revert if not m.reversible]
+        if irreversible:
+            raise MigrationError(f"Migracje nieodwracalne (brak downgrade): {irreversible}")
+
+        results = []
+        for migration in to_revert:
+            result = MigrationRunner._run(migration, "down", dry_run, batch_size, pause)
+            results.append(result)
+            if progress:
+                progress(result)
+        return results
@@ -0,0 +1,23 @@
+"""
+app/migrations/
+----------------
+Wersjonowane skrypty migracji schematu: vNNN_nazwa.py (NNN = kolejny numer wersji).
+
+Szablon nowego skryptu:
+
+    DESCRIPTION = "Krótki opis zmiany"
+
+    def upgrade(op):
+        op.add_column("grades", "weight", "INTEGER", default="1", nullable=False)
+        op.create_index("ix_grades_weight", "grades", ["weight"])
+
+    def downgrade(op):
+        op.drop_index("ix_grades_weight")
+        op.drop_column("grades", "weight")
+
+Dostępne operacje – patrz `Operations` w app/migrate.py. Skrypt nie powinien
+importować modeli do opisu zmian (modele opisują schemat NAJNOWSZY, a skrypt
+– konkretny krok), wyjątkiem jest `op.create_table(Model.__table__)` dla nowej tabeli.
+Nową tabelę trzeba dodać migracją – `init-db` nie wywołuje już `create_all()`
+dla istniejących baz.
+"""
@@ -0,0 +1,17 @@
+"""
+app/migrations/v001_initial.py
+----------------
+Schemat początkowy: tabele z modeli i indeksy sprzed wprowadzenia migracji.
+
+Na pustej bazie `create_all()` tworzy od razu schemat najnowszy – kolejne
+migracje tylko to potwierdzają (ich operacje są idempotentne).
+"""
+
+DESCRIPTION = "Schemat początkowy"
+
+
+def upgrade(op):
+    op.create_all()
+    # Bazy sprzed wersjonowania schematu mogły nie mieć tych indeksów
+    op.create_index("ix_users_role_is_active_last_name", "users", ["role", "is_active", "last_name"])
+    op.create_index("ix_lessons_group_id_start_time", "lessons", ["group_id", "start_time"])
@@ -0,0 +1,43 @@
+"""
+app/migrations/v002_foreign_key_indexes.py
+----------------
+Indeksy kluczy obcych (SQLite sam ich nie tworzy) i częściowy indeks
+unikalny aktywnych zapisów studenta do grupy.
+"""
+
+DESCRIPTION = "Indeksy kluczy obcych i unikalny indeks aktywnych zapisów"
+
+_INDEXES = [
+    ("ix_courses_lecturer_id_code", "courses", ["lecturer_id", "code"]),
+    ("ix_class_groups_course_id", "class_groups", ["course_id"]),
+    ("ix_class_groups_lecturer_id_name", "class_groups", ["lecturer_id", "name"]),
+    ("ix_enrollments_group_id_is_active", "enrollments", ["group_id", "is_active"]),
+    ("ix_enrollments_student_id_is_active", "enrollments", ["student_id", "is_active"]),
+    ("ix_grades_group_id_student_id", "grades", ["group_id", "student_id"]),
+    ("ix_grades_student_id", "grades", ["student_id"]),
+]
+
+
+def upgrade(op):
+    # Przed unikalnym indeksem: zostawiamy najstarszy aktywny zapis studenta
+    # do grupy, duplikaty oznaczamy jako nieaktywne.
+    op.execute(
+        "UPDATE enrollments SET is_active = 0 "
+        "WHERE is_active = 1 AND id NOT IN ("
+        "  SELECT MIN(id) FROM enrollments WHERE is_active = 1 GROUP BY student_id, group_id"
+        ")",
+        description="dezaktywacja zdublowanych aktywnych zapisów",
+    )
+    for name, table, columns in _INDEXES:
+        op.create_index(name, table, columns)
+    op.create_index("uq_enrollments_active_student_group", "enrollments", ["student_id", "group_id"],
+                    unique=True, where="is_active = 1")
+    # Statystyki dla planera – bez nich SQLite gorzej wybiera indeksy
+    op.analyze()
+
+
+def downgrade(op):
+    # Zdublowanych zapisów nie przywracamy – zostają nieaktywne
+    op.drop_index("uq_enrollments_active_student_group")
+    for name, _table, _columns in reversed(_INDEXES):
+        op.drop_index(name)
@@ -0,0 +1,39 @@
+"""
+app/migrations/v003_grade_summaries.py
+----------------
+Tabela zmaterializowana `grade_summaries` (sumy ocen studenta w grupie)
+wypełniona z istniejących ocen – paczkami po grupach, żeby wystawianie ocen
+nie czekało na przeliczenie milionów wierszy.
+"""
+
+from datetime import datetime
+
+from app.models import GradeSummary
+
+DESCRIPTION = "Zestawienie ocen (średnie ważone) w tabeli grade_summaries"
+
+# Ile grup przelicza jedna transakcja
+GROUPS_PER_BATCH = 200
+
+
+def upgrade(op):
+    op.create_table(GradeSummary.__table__)
+    # Od zera – przerwaną migrację można bezpiecznie powtórzyć
+    op.execute("DELETE FROM grade_summaries", description="wyczyszczenie grade_summaries")
+    op.execute_in_batches(
+        """
+        INSERT INTO grade_summaries (student_id, group_id, weighted_sum, weight_sum, grade_count, updated_at)
+        SELECT student_id, group_id,
+               SUM(value * COALESCE(weight, 1.0)), SUM(COALESCE(weight, 1.0)), COUNT(*), :now
+        FROM grades
+        WHERE group_id >= :batch_start AND group_id < :batch_end
+        GROUP BY group_id, student_id
+        """,
+        "grades", key="group_id", params={"now": datetime.now()}, batch_size=GROUPS_PER_BATCH,
+        description="przeliczenie średnich z grades",
+    )
+    op.analyze()
+
+
+def downgrade(op):
+    op.drop_table("grade_summaries")
@@ -0,0 +1,25 @@
+"""
+app/migrations/v004_lesson_series.py
+----------------
+Cykle zajęć (`lesson_series`) i powiązanie lekcji z terminem cyklu
+(`lessons.series_id`, `lessons.occurrence_start`).
+"""
+
+from app.models import LessonSeries
+
+DESCRIPTION = "Cykle zajęć (lesson_series) rozwijane w locie"
+
+
+def upgrade(op):
+    op.create_table(LessonSeries.__table__)
+    op.add_column("lessons", "series_id", "INTEGER REFERENCES lesson_series (id)")
+    op.add_column("lessons", "occurrence_start", "DATETIME")
+    op.create_index("uq_lessons_series_id_occurrence_start", "lessons", ["series_id", "occurrence_start"],
+                    unique=True, where="series_id IS NOT NULL")
+
+
+def downgrade(op):
+    op.drop_index("uq_lessons_series_id_occurrence_start")
+    op.drop_column("lessons", "occurrence_start")
+    op.drop_column("lessons", "series_id")
+    op.drop_table("lesson_series")
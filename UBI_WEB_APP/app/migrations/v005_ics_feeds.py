@@ -0,0 +1,23 @@
+"""
+app/migrations/v005_ics_feeds.py
+----------------
+Licznik zmian planu grupy (`class_groups.lesson_version`) dla ETag kalendarzy
+ICS oraz indeksy kalendarza sali.
+"""
+
+DESCRIPTION = "Kalendarze ICS: licznik zmian planu grup i indeksy sal"
+
+
+def upgrade(op):
+    op.add_column("class_groups", "lesson_version", "INTEGER", default="0", nullable=False)
+    op.create_index("ix_class_groups_lesson_version", "class_groups", ["lesson_version"])
+    op.create_index("ix_lessons_room_start_time", "lessons", ["room", "start_time"])
+    op.create_index("ix_lesson_series_room", "lesson_series", ["room"])
+    op.analyze()
+
+
+def downgrade(op):
+    op.drop_index("ix_lesson_series_room")
+    op.drop_index("ix_lessons_room_start_time")
+    op.drop_index("ix_class_groups_lesson_version")
+    op.drop_column("class_groups", "lesson_version")
@@ -0,0 +1,28 @@
+"""
+app/migrations/v006_calendar_sync.py
+----------------
+Numery zmian lekcji i cykli (`change_seq`) oraz ślady usuniętych lekcji
+(`lesson_tombstones`) dla przyrostowej synchronizacji kalendarza.
+Istniejące wiersze dostają numer 0 – są starsze od każdego tokenu.
+"""
+
+from app.models import LessonTombstone
+
+DESCRIPTION = "Synchronizacja kalendarza: numery zmian lekcji i ślady usuniętych"
+
+
+def upgrade(op):
+    op.add_column("lessons", "change_seq", "INTEGER", default="0", nullable=False)
+    op.add_column("lesson_series", "change_seq", "INTEGER", default="0", nullable=False)
+    op.create_table(LessonTombstone.__table__)
+    op.create_index("ix_lessons_group_id_change_seq", "lessons", ["group_id", "change_seq"])
+    op.create_index("ix_lesson_series_group_id_change_seq", "lesson_series", ["group_id", "change_seq"])
+    op.analyze()
+
+
+def downgrade(op):
+    op.drop_index("ix_lesson_series_group_id_change_seq")
+    op.drop_index("ix_lessons_group_id_change_seq")
+    op.drop_table("lesson_tombstones")
+    op.drop_column("lesson_series", "change_seq")
+    op.drop_column("lessons", "change_seq")
@@ -0,0 +1,23 @@
+"""
+app/migrations/v007_user_search_indexes.py
+----------------
+Indeksy listy użytkowników w panelu admina: wyszukiwanie po prefiksie
+na lower(kolumna) i sortowanie po nazwisku bez filtrów.
+"""
+
+DESCRIPTION = "Lista użytkowników: indeksy wyszukiwania i sortowania po nazwisku"
+
+_SEARCH_COLUMNS = ("last_name", "first_name", "username", "email")
+
+
+def upgrade(op):
+    for column in _SEARCH_COLUMNS:
+        op.create_index(f"ix_users_lower_{column}", "users", [f"lower({column})"])
+    op.create_index("ix_users_last_name_id", "users", ["last_name", "id"])
+    op.analyze()
+
+
+def downgrade(op):
+    op.drop_index("ix_users_last_name_id")
+    for column in reversed(_SEARCH_COLUMNS):
+        op.drop_index(f"ix_users_lower_{column}")
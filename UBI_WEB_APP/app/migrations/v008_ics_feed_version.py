@@ -0,0 +1,17 @@
+"""
+app/migrations/v008_ics_feed_version.py
+----------------
+Wersja linku kalendarza ICS użytkownika (`users.ics_feed_version`) – nowy link
+unieważnia wszystkie wcześniej wydane. Istniejące konta dostają wersję 0,
+więc ich dotychczasowe linki dalej działają.
+"""
+
+DESCRIPTION = "Kalendarze ICS: wersja linku użytkownika (unieważnianie linków)"
+
+
+def upgrade(op):
+    op.add_column("users", "ics_feed_version", "INTEGER", default="0", nullable=False)
+
+
+def downgrade(op):
+    op.drop_column("users", "ics_feed_version")
@@ -7,7 +7,7 @@ Na początek:
 - User: użytkownik systemu (student, wykładowca, admin).
 """
 
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import enum
 
 from app import db
@@ -27,6 +27,13 @@ class User(db.Model):
     Pole `role` określa, czy ktoś jest studentem, wykładowcą czy administratorem.
     """
     __tablename__ = "users"
+    __table_args__ = (
+        # Lista użytkowników w panelu admina filtruje po roli i aktywności
+        # i sortuje po nazwisku – ten indeks obsługuje taką stronę jednym skanem zakresu.
+        db.Index("ix_users_role_is_active_last_name", "role", "is_active", "last_name"),
+        # Sortowanie po nazwisku bez filtrów i kursor (last_name, id) > (...)
+        db.Index("ix_users_last_name_id", "last_name", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -38,6 +45,8 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
     last_login = db.Column(db.DateTime, nullable=True)
+    # Wersja adresu kalendarza ICS – podniesienie unieważnia wszystkie wydane linki
+    ics_feed_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     def __repr__(self) -> str:
         return f"<User {self.username} ({self.role})>"
@@ -57,6 +66,14 @@ class User(db.Model):
     def is_student(self) -> bool:
         return self.role == UserRole.STUDENT
 
+
+# Wyszukiwanie użytkowników po prefiksie bez rozróżniania wielkości liter
+# (lista użytkowników w panelu admina) – indeksy na lower(kolumna).
+db.Index("ix_users_lower_last_name", db.func.lower(User.last_name))
+db.Index("ix_users_lower_first_name", db.func.lower(User.first_name))
+db.Index("ix_users_lower_username", db.func.lower(User.username))
+db.Index("ix_users_lower_email", db.func.lower(User.email))
+
 class Course(db.Model):
     """
     Kurs (przedmiot), np. 'Programowanie 1', 'Matematyka dyskretna'.
@@ -65,6 +82,10 @@ class Course(db.Model):
     - może mieć wiele grup (ClassGroup).
     """
     __tablename__ = "courses"
+    __table_args__ = (
+        # Kursy wykładowcy posortowane po kodzie (panel wykładowcy)
+        db.Index("ix_courses_lecturer_id_code", "lecturer_id", "code"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(20), unique=True, nullable=False, index=True)  # np. INF101
@@ -89,6 +110,13 @@ class ClassGroup(db.Model):
         Grupa: 'Grupa A (laboratoria poniedziałek 8:00)'
     """
     __tablename__ = "class_groups"
+    __table_args__ = (
+        # Grupy kursu (JOIN z kursami) oraz grupy wykładowcy posortowane po nazwie
+        db.Index("ix_class_groups_course_id", "course_id"),
+        db.Index("ix_class_groups_lecturer_id_name", "lecturer_id", "name"),
+        # Największa wartość = ostatni numer sekwencji zmian (kalendarze sal, synchronizacja)
+        db.Index("ix_class_groups_lesson_version", "lesson_version"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), nullable=False)  # np. 'Grupa A'
@@ -104,8 +132,45 @@ class ClassGroup(db.Model):
 
     is_active = db.Column(db.Boolean, default=True)
 
+    # Numer ostatniej zmiany lekcji i cykli grupy (globalna sekwencja, app/changes.py)
+    # – ETag kalendarzy ICS i token synchronizacji kalendarza. Nie ustawiać ręcznie.
+    lesson_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     def __repr__(self) -> str:
         return f"<ClassGroup {self.name} ({self.course.code})>"
+
+    def gradebook(self):
+        """
+        Dane do dziennika ocen grupy, pobrane stałą liczbą zapytań.
+
+        - jedno zapytanie: aktywne zapisy razem ze studentami (JOIN),
+        - jedno zapytanie: tylko oceny z TEJ grupy (a nie wszystkie oceny studenta).
+
+        Zwraca:
+            (enrollments, grades_by_student) – lista zapisów posortowana po nazwisku
+            oraz słownik {student_id: [Grade, ...]}.
+        """
+        enrollments = (
+            Enrollment.query
+            .filter_by(group_id=self.id, is_active=True)
+            .join(User, Enrollment.student_id == User.id)
+            .options(db.contains_eager(Enrollment.student))
+            .order_by(User.last_name.asc(), User.first_name.asc())
+            .all()
+        )
+
+        grades = (
+            Grade.query
+            .filter_by(group_id=self.id)
+            .order_by(Grade.created_at.asc(), Grade.id.asc())
+            .all()
+        )
+
+        grades_by_student = {}
+        for grade in grades:
+            grades_by_student.setdefault(grade.student_id, []).append(grade)
+
+        return enrollments, grades_by_student
     
 
 class Enrollment(db.Model):
@@ -118,6 +183,15 @@ class Enrollment(db.Model):
     - będziemy też przypisywać oceny.
     """
     __tablename__ = "enrollments"
+    __table_args__ = (
+        # Lista studentów grupy i grupy studenta – prawie zawsze z is_active=True
+        db.Index("ix_enrollments_group_id_is_active", "group_id", "is_active"),
+        db.Index("ix_enrollments_student_id_is_active", "student_id", "is_active"),
+        # Student może mieć tylko jeden AKTYWNY zapis do danej grupy
+        # (wyłączone zapisy zostają w historii, więc indeks jest częściowy)
+        db.Index("uq_enrollments_active_student_group", "student_id", "group_id",
+                 unique=True, sqlite_where=db.text("is_active = 1")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -145,6 +219,18 @@ class Lesson(db.Model):
         Sala: 201
     """
     __tablename__ = "lessons"
+    __table_args__ = (
+        # Kalendarz zawsze pyta o lekcje konkretnych grup w zakresie dat,
+        # więc indeks (grupa, początek) pozwala odczytać tydzień jednym skanem zakresu.
+        db.Index("ix_lessons_group_id_start_time", "group_id", "start_time"),
+        # Kalendarz sali (ICS) – lekcje jednej sali w zakresie dat
+        db.Index("ix_lessons_room_start_time", "room", "start_time"),
+        # Lekcje grup zmienione od ostatniej synchronizacji kalendarza (app/sync.py)
+        db.Index("ix_lessons_group_id_change_seq", "group_id", "change_seq"),
+        # Jeden wiersz na termin cyklu (zmaterializowany albo odwołany termin)
+        db.Index("uq_lessons_series_id_occurrence_start", "series_id", "occurrence_start",
+                 unique=True, sqlite_where=db.text("series_id IS NOT NULL")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey("class_groups.id"), nullable=False)
@@ -158,9 +244,139 @@ class Lesson(db.Model):
 
     is_canceled = db.Column(db.Boolean, default=False)
 
+    # Termin cyklu, który ta lekcja zastępuje (None = lekcja spoza cyklu).
+    # `occurrence_start` to początek wynikający z reguły – nawet gdy lekcję przeniesiono.
+    series_id = db.Column(db.Integer, db.ForeignKey("lesson_series.id"), nullable=True)
+    occurrence_start = db.Column(db.DateTime, nullable=True)
+
+    # Numer ostatniej zmiany z globalnej sekwencji (app/changes.py) – nie ustawiać ręcznie
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     def __repr__(self) -> str:
         return f"<Lesson {self.title} ({self.start_time})>"
 
+    def to_event(self) -> dict:
+        """
+        Zamienia lekcję na słownik w formacie zdarzenia FullCalendar.
+
+        Dodatkowe pola (room, group_name, ...) trafiają w JS do `extendedProps`.
+        """
+        return Lesson.event(self.id, self.title, self.room, self.start_time,
+                            self.end_time, self.is_canceled, self.group.name)
+
+    @staticmethod
+    def event(lesson_id, title, room, start_time, end_time, is_canceled, group_name) -> dict:
+        """Zdarzenie FullCalendar z samych kolumn – bez obiektu lekcji (plan studenta)."""
+        event = {
+            "id": lesson_id,
+            "title": title,
+            "start": start_time.isoformat(),
+            "end": end_time.isoformat() if end_time else None,
+            "room": room,
+            "group_name": group_name,
+            "description": "Zajęcia odwołane" if is_canceled else None,
+            "canceled": bool(is_canceled),
+        }
+        if is_canceled:
+            event["color"] = "#999999"
+        return event
+
+class LessonSeries(db.Model):
+    """
+    Cykl zajęć: ten sam termin co tydzień (albo co dwa tygodnie) do daty `until`.
+
+    Pojedynczych terminów NIE zapisujemy w `lessons` – rozwijamy je w locie
+    dla oglądanego zakresu dat (app/recurrence.py). Wiersz `Lesson`
+    z `series_id` powstaje dopiero dla terminu odwołanego (`is_canceled`)
+    albo gdy potrzebny jest konkretny wiersz (materializacja) – zastępuje
+    wtedy termin wynikający z reguły.
+    """
+    __tablename__ = "lesson_series"
+    __table_args__ = (
+        # Cykle grup trwające w zakresie kalendarza
+        db.Index("ix_lesson_series_group_id_until", "group_id", "until"),
+        # Cykle w sali (kalendarz sali ICS)
+        db.Index("ix_lesson_series_room", "room"),
+        db.Index("ix_lesson_series_group_id_change_seq", "group_id", "change_seq"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey("class_groups.id"), nullable=False)
+    group = db.relationship("ClassGroup", backref="lesson_series")
+
+    title = db.Column(db.String(120), nullable=False)
+    room = db.Column(db.String(50), nullable=True)
+
+    # Pierwsze zajęcia cyklu – kolejne są przesunięte o `interval_weeks` tygodni
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    interval_weeks = db.Column(db.Integer, nullable=False, default=1)  # 1 = co tydzień, 2 = co dwa tygodnie
+    until = db.Column(db.Date, nullable=False)  # ostatni możliwy dzień zajęć
+
+    # Dni bez zajęć (święta, przerwa), np. "2026-11-11,2026-12-23" – jak EXDATE w iCalendar
+    excluded_dates = db.Column(db.Text, nullable=True)
+
+    # Jak `Lesson.change_seq` – zmiana cyklu albo lekcji zastępującej jego termin
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+    def __repr__(self) -> str:
+        return f"<LessonSeries {self.title} (co {self.interval_weeks} tydz. do {self.until})>"
+
+    @staticmethod
+    def parse_dates(text) -> set:
+        """Zbiór dat z tekstu "RRRR-MM-DD, RRRR-MM-DD ..." (przecinki, spacje, nowe linie)."""
+        if not text:
+            return set()
+        return {date.fromisoformat(part) for part in text.replace(",", " ").split()}
+
+    @staticmethod
+    def expand(first_start, interval_weeks, until, excluded=(), start=None, end=None) -> list:
+        """
+        Początki terminów cyklu z zakresu [start, end) – bez przeglądania
+        terminów sprzed `start` (pierwszy numer terminu liczymy dzieleniem).
+        """
+        step = timedelta(weeks=interval_weeks)
+        k = 0
+        if start is not None and start > first_start:
+            k = -(-(start - first_start) // step)  # zaokrąglenie w górę
+        occurrences = []
+        occurrence = first_start + k * step
+        while occurrence.date() <= until and (end is None or occurrence < end):
+            if occurrence.date() not in excluded:
+                occurrences.append(occurrence)
+            occurrence += step
+        return occurrences
+
+    def occurrence_starts(self, start=None, end=None) -> list:
+        """Początki terminów tego cyklu (z pominięciem dni bez zajęć)."""
+        return LessonSeries.expand(self.start_time, self.interval_weeks, self.until,
+                                   LessonSeries.parse_dates(self.excluded_dates), start, end)
+
+
+class LessonTombstone(db.Model):
+    """
+    Ślad po lekcji albo cyklu, który zniknął z planu grupy (usunięty albo
+    przeniesiony do innej grupy) – synchronizacja kalendarza (app/sync.py)
+    zgłasza go klientom jako usunięte zdarzenie.
+    """
+    __tablename__ = "lesson_tombstones"
+    __table_args__ = (
+        db.Index("ix_lesson_tombstones_group_id_change_seq", "group_id", "change_seq"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, nullable=False)  # bez klucza obcego – grupa mogła zniknąć
+    lesson_id = db.Column(db.Integer, nullable=True)
+    series_id = db.Column(db.Integer, nullable=True)
+    change_seq = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+    def __repr__(self) -> str:
+        return f"<LessonTombstone {self.lesson_id or 's' + str(self.series_id)} @{self.change_seq}>"
+
+
 class Grade(db.Model):
     """
     Ocena studenta w ramach grupy/kursu.
@@ -170,6 +386,11 @@ class Grade(db.Model):
     - późniejsze liczenie średniej.
     """
     __tablename__ = "grades"
+    __table_args__ = (
+        # Dziennik ocen grupy (wszystkie oceny grupy, per student) i oceny studenta
+        db.Index("ix_grades_group_id_student_id", "group_id", "student_id"),
+        db.Index("ix_grades_student_id", "student_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -187,3 +408,52 @@ class Grade(db.Model):
 
     def __repr__(self) -> str:
         return f"<Grade {self.label}: {self.value} ({self.student_id})>"
+
+
+class GradeSummary(db.Model):
+    """
+    Zestawienie ocen studenta w grupie – tabela zmaterializowana.
+
+    Trzymamy sumy (a nie gotową średnią), więc nowa ocena tylko dodaje
+    value * weight i weight do wiersza (patrz app/grades.py). Średnie
+    kursu i semestru liczymy z tych sum jednym zapytaniem GROUP BY.
+    """
+    __tablename__ = "grade_summaries"
+    __table_args__ = (
+        # Średnie wszystkich studentów grupy (dziennik ocen)
+        db.Index("ix_grade_summaries_group_id", "group_id"),
+    )
+
+    student_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey("class_groups.id"), primary_key=True)
+
+    weighted_sum = db.Column(db.Float, nullable=False, default=0.0)  # suma value * weight
+    weight_sum = db.Column(db.Float, nullable=False, default=0.0)    # suma wag
+    grade_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.now)
+
+    @property
+    def average(self):
+        """Średnia ważona albo None (brak ocen lub same wagi 0)."""
+        return self.weighted_sum / self.weight_sum if self.weight_sum else None
+
+    def __repr__(self) -> str:
+        return f"<GradeSummary {self.student_id}/{self.group_id}: {self.average}>"
+
+
+class SchemaVersion(db.Model):
+    """
+    Wersje schematu zastosowane w bazie (jeden wiersz na wersję).
+
+    Aktualna wersja to MAX(version) – sprawdzana jednym zapytaniem
+    przy starcie aplikacji (patrz app/schema.py).
+    """
+    __tablename__ = "schema_version"
+
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200), nullable=True)
+    applied_at = db.Column(db.DateTime, default=datetime.now)
+
+    def __repr__(self) -> str:
+        return f"<SchemaVersion {self.version}>"
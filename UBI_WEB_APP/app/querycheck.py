@@ -0,0 +1,349 @@
+"""
+app/querycheck.py
+----------------
+Strażnik regresji N+1: sprawdza, czy liczba zapytań SQL na stronę
+NIE rośnie razem z liczbą wierszy.
+
+Dla każdej skali (np. 5 i 40 wierszy na listę) tworzymy osobną, tymczasową
+bazę SQLite, wypełniamy ją danymi i wywołujemy każdą trasę przez klienta
+testowego Flaska, licząc zapytania. Jeśli przy większych danych jakaś trasa
+wykonuje więcej zapytań – to znak, że szablon lub widok doczytuje relacje
+wiersz po wierszu (N+1).
+
+Drugie sprawdzenie (check-indexes) zbiera zapytania SELECT tych samych tras
+i przepuszcza je przez EXPLAIN QUERY PLAN – pełny przegląd tabeli
+("SCAN grades" zamiast "SEARCH grades USING INDEX ...") oznacza brakujący indeks.
+
+Uruchomienie:
+    flask --app app check-queries
+    flask --app app check-indexes
+"""
+
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from app import create_app, db
+from app.grades import GradeBook
+from app.timetable import timetable_cache
+
+# Pełny przegląd tabeli w planie SQLite: "SCAN grades" (bez "USING ... INDEX").
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+# "FROM grades AS gr" – nowsze SQLite podają w planie tylko alias ("SCAN gr")
+_TABLE_ALIAS = re.compile(r"\b(\w+)\s+AS\s+(\w+)", re.IGNORECASE)
+
+# Tabele, których pełny przegląd jest zamierzony: listy wszystkich
+# użytkowników i wszystkich grup w panelu admina.
+ALLOWED_SCANS = {"users", "class_groups"}
+
+# (nazwa, rola zalogowanego, funkcja budująca URL z danych zasianych w bazie)
+ROUTES = [
+    ("dashboard", "student", lambda d: "/dashboard"),
+    ("admin_panel", "admin", lambda d: "/admin"),
+    ("admin_users", "admin", lambda d: "/admin/users"),
+    ("admin_users_search", "admin", lambda d: "/admin/users?q=stu&sort=last_name"),
+    ("admin_courses", "admin", lambda d: "/admin/courses"),
+    ("admin_groups", "admin", lambda d: "/admin/groups"),
+    ("admin_group_students", "admin", lambda d: f"/admin/groups/{d['group_id']}/students"),
+    ("admin_search_students", "admin", lambda d: "/admin/api/students/search?q=Student"),
+    ("lecturer_courses", "lecturer", lambda d: "/lecturer/courses"),
+    ("lecturer_group_details", "lecturer", lambda d: f"/lecturer/groups/{d['group_id']}"),
+    ("api_calendar_events", "lecturer", lambda d: f"/api/calendar/events?start={d['week_start']}&end={d['week_end']}"),
+    ("api_calendar_events_student", "student", lambda d: f"/api/calendar/events?start={d['week_start']}&end={d['week_end']}"),
+    ("calendar_view", "student", lambda d: "/calendar"),
+    ("api_calendar_changes", "student", lambda d: f"/api/calendar/changes?start={d['week_start']}&end={d['week_end']}"),
+    ("api_calendar_changes_lecturer", "lecturer", lambda d: f"/api/calendar/changes?start={d['week_start']}&end={d['week_end']}"),
+    ("api_grade_stats", "admin", lambda d: f"/api/reports/grade-stats?level=group&group_id={d['group_id']}"),
+    ("api_grade_stats_lecturer", "lecturer", lambda d: "/api/reports/grade-stats?level=course"),
+    ("export_group_grades", "lecturer", lambda d: f"/groups/{d['group_id']}/grades.csv"),
+    ("admin_export_course_enrollments", "admin", lambda d: f"/admin/courses/{d['course_id']}/enrollments.csv"),
+    ("ics_user_feed", "student", lambda d: f"/ics/{d['ics_tokens']['student']}/plan.ics"),
+    ("ics_user_feed_lecturer", "lecturer", lambda d: f"/ics/{d['ics_tokens']['lecturer']}/plan.ics"),
+    ("ics_group_feed", "lecturer", lambda d: f"/ics/{d['ics_tokens']['lecturer']}/groups/{d['group_id']}.ics"),
+    ("ics_room_feed", "student", lambda d: f"/ics/{d['ics_tokens']['student']}/rooms/100.ics"),
+]
+
+
+class QueryCounter:
+    """
+    Licznik zapytań SQL wykonanych na danym silniku (engine).
+
+    Użycie:
+        with QueryCounter(engine) as counter:
+            client.get("/dashboard")
+        counter.queries
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queries = 0
+
+    def _count(self, *args, **kwargs):
+        self.queries += 1
+
+    def __enter__(self):
+        self.queries = 0
+        db.event.listen(self.engine, "after_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        db.event.remove(self.engine, "after_cursor_execute", self._count)
+        return False
+
+
+class StatementRecorder:
+    """
+    Zapamiętuje zapytania SELECT / WITH ... SELECT (treść i parametry) wykonane na danym silniku –
+    do sprawdzenia ich planu wykonania (EXPLAIN QUERY PLAN).
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and not executemany:
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        self.statements = []
+        db.event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        db.event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+
+def logged_in_client(app, user_id: int, username: str, role: str):
+    """Klient testowy z sesją zalogowanego użytkownika (bez formularza logowania)."""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+        sess["username"] = username
+        sess["role"] = role
+    return client
+
+
+def seed_dataset(rows: int) -> dict:
+    """
+    Wypełnia pustą bazę danymi, w których każda lista ma ok. `rows` wierszy.
+
+    Zwraca:
+        słownik z identyfikatorami potrzebnymi do budowy URL-i oraz
+        id użytkowników dla każdej roli.
+    """
+    from app.ical import IcsFeed
+    from app.models import ClassGroup, Course, Enrollment, Grade, Lesson, LessonSeries, User, UserRole
+
+    def make_user(i, role):
+        return User(
+            username=f"qc_{role.value}{i}",
+            email=f"qc_{role.value}{i}@example.edu",
+            password_hash="-",
+            first_name=f"Imie{i}",
+            last_name=f"{role.value.capitalize()}{i:05d}",
+            role=role,
+        )
+
+    admin = make_user(0, UserRole.ADMIN)
+    lecturers = [make_user(i, UserRole.LECTURER) for i in range(rows)]
+    students = [make_user(i, UserRole.STUDENT) for i in range(rows)]
+    db.session.add_all([admin, *lecturers, *students])
+    db.session.flush()
+
+    main_lecturer = lecturers[0]
+    courses = [
+        Course(code=f"C{i:05d}", name=f"Kurs {i}", ects=5, lecturer_id=lecturers[i].id)
+        for i in range(rows)
+    ]
+    db.session.add_all(courses)
+    db.session.flush()
+
+    # Wszystkie grupy prowadzi ten sam wykładowca – jego strony rosną z `rows`
+    groups = [
+        ClassGroup(name=f"Grupa {i}", course_id=courses[i].id, lecturer_id=main_lecturer.id,
+                   semester=1, year=2025)
+        for i in range(rows)
+    ]
+    db.session.add_all(groups)
+    db.session.flush()
+
+    main_group = groups[0]
+    week_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start -= timedelta(days=week_start.weekday())
+
+    for i, student in enumerate(students):
+        db.session.add(Enrollment(student_id=student.id, group_id=main_group.id))
+        if i:
+            # Pierwszy student chodzi do wszystkich grup – jego kalendarz rośnie z `rows`
+            db.session.add(Enrollment(student_id=students[0].id, group_id=groups[i].id))
+        for k in range(2):
+            db.session.add(Grade(student_id=student.id, group_id=main_group.id,
+                                 label=f"Ocena {k}", value=4.0, weight=1.0))
+        if i:
+            # ... i ma oceny w każdej z nich – jego średnie na pulpicie też
+            db.session.add(Grade(student_id=students[0].id, group_id=groups[i].id,
+                                 label="Kolokwium", value=3.5, weight=2.0))
+        start = week_start + timedelta(days=i % 5, hours=8 + i % 10)
+        db.session.add(Lesson(group_id=groups[i].id, title=f"Zajęcia {i}", room=str(100 + i),
+                              start_time=start, end_time=start + timedelta(minutes=90)))
+
+    # Cykl zajęć głównej grupy – kalendarze rozwijają jego terminy w locie
+    series_start = week_start + timedelta(days=4, hours=19)
+    db.session.add(LessonSeries(group_id=main_group.id, title="Cykl", room="Lab",
+                                start_time=series_start, end_time=series_start + timedelta(minutes=90),
+                                interval_weeks=1, until=(series_start + timedelta(weeks=10)).date()))
+
+    db.session.commit()
+    GradeBook.rebuild()
+
+    return {
+        "group_id": main_group.id,
+        "course_id": main_group.course_id,
+        "week_start": week_start.date().isoformat(),
+        "week_end": (week_start + timedelta(days=7)).date().isoformat(),
+        # Kalendarze ICS nie mają sesji – token w adresie
+        "ics_tokens": {
+            "student": IcsFeed.token(students[0].id),
+            "lecturer": IcsFeed.token(main_lecturer.id),
+        },
+        "users": {
+            "admin": (admin.id, admin.username),
+            "lecturer": (main_lecturer.id, main_lecturer.username),
+            "student": (students[0].id, students[0].username),
+        },
+    }
+
+
+@contextmanager
+def seeded_app(rows: int):
+    """
+    Aplikacja na tymczasowej bazie SQLite wypełnionej przez `seed_dataset(rows)`.
+
+    Zwraca (w `with`):
+        (app, data, engine) – baza jest usuwana po wyjściu z bloku.
+    """
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="querycheck_")
+    os.close(fd)
+    try:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "METRICS_ENDPOINT_ENABLED": False,
+            "SLOW_QUERY_THRESHOLD_MS": None,
+            "SCHEMA_STARTUP_MODE": "auto",
+        })
+        with app.app_context():
+            data = seed_dataset(rows)
+            engine = db.engine
+        try:
+            yield app, data, engine
+        finally:
+            engine.dispose()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def count_route_queries(rows: int) -> dict:
+    """
+    Tworzy tymczasową bazę o zadanej skali i zwraca
+    {nazwa_trasy: (status HTTP, liczba zapytań)}.
+    """
+    results = {}
+    with seeded_app(rows) as (app, data, engine):
+        for name, role, build_url in ROUTES:
+            user_id, username = data["users"][role]
+            client = logged_in_client(app, user_id, username, role)
+            # Każda trasa od zera – plan studenta z pulpitu nie może ukryć zapytań kalendarza
+            timetable_cache.clear()
+
+            with QueryCounter(engine) as counter:
+                response = client.get(build_url(data))
+                response.get_data()  # odpowiedzi strumieniowe (eksport CSV) czytają bazę dopiero tutaj
+            results[name] = (response.status_code, counter.queries)
+    return results
+
+
+def check_queries(small: int = 5, large: int = 40):
+    """
+    Porównuje liczbę zapytań każdej trasy dla małej i dużej bazy.
+
+    Zwraca:
+        listę słowników {"route", "small", "large", "status", "ok"}.
+        Trasa jest "ok", gdy zwraca 200 i liczba zapytań nie rośnie.
+    """
+    small_counts = count_route_queries(small)
+    large_counts = count_route_queries(large)
+
+    report = []
+    for name, _role, _url in ROUTES:
+        small_status, small_queries = small_counts[name]
+        large_status, large_queries = large_counts[name]
+        report.append({
+            "route": name,
+            "small": small_queries,
+            "large": large_queries,
+            "status": (small_status, large_status),
+            "ok": small_status == 200 and large_status == 200 and large_queries <= small_queries,
+        })
+    return report
+
+
+def full_scans(conn, statement: str, parameters) -> list:
+    """
+    Tabele przeglądane w całości (bez indeksu) przez dane zapytanie
+    – na podstawie EXPLAIN QUERY PLAN.
+    """
+    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    aliases = {alias: table for table, alias in _TABLE_ALIAS.findall(statement)}
+    tables = []
+    for row in plan:
+        match = _FULL_SCAN.match(row[-1])
+        if not match:
+            continue
+        table = aliases.get(match.group(1), match.group(1))
+        # Tylko tabele z modeli – "SCAN course_averages" to przegląd wyniku CTE
+        if table in db.metadata.tables:
+            tables.append(table)
+    return tables
+
+
+def check_indexes(rows: int = 40, allowed=ALLOWED_SCANS):
+    """
+    Sprawdza plan wykonania każdego zapytania SELECT wykonywanego przez trasy
+    z ROUTES. Pełny przegląd tabeli spoza `allowed` oznacza brakujący indeks.
+
+    Zwraca:
+        listę słowników {"route", "queries", "scans": [(tabela, zapytanie)], "status", "ok"}.
+    """
+    report = []
+    with seeded_app(rows) as (app, data, engine):
+        for name, role, build_url in ROUTES:
+            user_id, username = data["users"][role]
+            client = logged_in_client(app, user_id, username, role)
+            timetable_cache.clear()
+
+            with StatementRecorder(engine) as recorder:
+                response = client.get(build_url(data))
+                response.get_data()
+
+            scans = []
+            with engine.connect() as conn:
+                for statement, parameters in recorder.statements:
+                    for table in full_scans(conn, statement, parameters):
+                        if table not in allowed:
+                            scans.append((table, statement))
+
+            report.append({
+                "route": name,
+                "queries": len(recorder.statements),
+                "scans": scans,
+                "status": response.status_code,
+                "ok": response.status_code == 200 and not scans,
+            })
+    return report
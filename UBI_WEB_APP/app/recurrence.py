@@ -0,0 +1,165 @@
+"""
+app/recurrence.py
+----------------
+Cykle zajęć (`LessonSeries`): ten sam termin co tydzień albo co dwa tygodnie.
+
+- semestr laboratoriów to jeden formularz i jeden wiersz `lesson_series`,
+  a nie 15 formularzy i 15 commitów,
+- terminy cyklu rozwijamy w locie tylko dla oglądanego zakresu dat
+  (kalendarz, plan studenta) – dwoma zapytaniami niezależnie od długości cyklu,
+- termin, który ma już wiersz `Lesson` (`series_id` + `occurrence_start`),
+  jest zastępowany tym wierszem; tak działa odwołanie pojedynczych zajęć
+  (`is_canceled`) i materializacja – konkretne wiersze lekcji, gdy są
+  potrzebne (np. lista obecności).
+"""
+
+from datetime import datetime
+
+from app import db
+from app.models import ClassGroup, Lesson, LessonSeries
+
+
+def occurrence_id(series_id: int, start: datetime) -> str:
+    """Id zdarzenia kalendarza dla niezmaterializowanego terminu, np. "s12-202610131000"."""
+    return f"s{series_id}-{start:%Y%m%d%H%M}"
+
+
+class RecurringLessons:
+    """Metody do tworzenia cykli zajęć oraz rozwijania i materializacji ich terminów."""
+
+    @staticmethod
+    def occurrences(group_ids, start: datetime, end: datetime, series_ids=None) -> list:
+        """
+        Niezmaterializowane terminy cykli grup `group_ids` (lista albo podzapytanie)
+        z zakresu [start, end) – opcjonalnie tylko cykli `series_ids`.
+
+        Zwraca:
+            listę krotek jak w planie studenta (id zdarzenia, tytuł, sala, początek,
+            koniec, odwołane = False, nazwa grupy), posortowaną po początku.
+        """
+        statement = (
+            db.select(LessonSeries.id, LessonSeries.title, LessonSeries.room,
+                      LessonSeries.start_time, LessonSeries.end_time, LessonSeries.interval_weeks,
+                      LessonSeries.until, LessonSeries.excluded_dates, ClassGroup.name)
+            .join(ClassGroup, LessonSeries.group_id == ClassGroup.id)
+            .where(
+                LessonSeries.group_id.in_(group_ids),
+                LessonSeries.start_time < end,
+                LessonSeries.until >= start.date(),
+            )
+        )
+        if series_ids is not None:
+            statement = statement.where(LessonSeries.id.in_(series_ids))
+        rows = db.session.execute(statement).all()
+        if not rows:
+            return []
+
+        # Terminy zastąpione wierszem `Lesson` (odwołane, przeniesione, zmaterializowane)
+        replaced = set(db.session.execute(
+            db.select(Lesson.series_id, Lesson.occurrence_start)
+            .where(
+                Lesson.series_id.in_([row.id for row in rows]),
+                Lesson.occurrence_start >= start,
+                Lesson.occurrence_start < end,
+            )
+        ).all())
+
+        occurrences = []
+        for row in rows:
+            duration = row.end_time - row.start_time
+            excluded = LessonSeries.parse_dates(row.excluded_dates)
+            for occurrence in LessonSeries.expand(row.start_time, row.interval_weeks, row.until,
+                                                  excluded, start, end):
+                if (row.id, occurrence) not in replaced:
+                    occurrences.append((occurrence_id(row.id, occurrence), row.title, row.room,
+                                        occurrence, occurrence + duration, False, row.name))
+        occurrences.sort(key=lambda occurrence: occurrence[3])
+        return occurrences
+
+    @staticmethod
+    def create(group: ClassGroup, title: str, start_time: datetime, end_time: datetime, until,
+               room: str = None, interval_weeks: int = 1, excluded_dates: str = None):
+        """
+        Zakłada cykl po sprawdzeniu WSZYSTKICH jego terminów jedną paczką
+        (`LessonScheduler.validate_batch`).
+
+        Zwraca:
+            (cykl albo None, {odnośnik kolidującej lekcji: zbiór powodów}) – przy
+            kolizji cykl nie powstaje.
+        """
+        from app.scheduling import LessonScheduler
+
+        excluded = LessonSeries.parse_dates(excluded_dates)
+        duration = end_time - start_time
+        proposals = [
+            {"group_id": group.id, "start_time": occurrence, "end_time": occurrence + duration, "room": room}
+            for occurrence in LessonSeries.expand(start_time, interval_weeks, until, excluded)
+        ]
+        conflicts = {}
+        for found in LessonScheduler.validate_batch(proposals):
+            for conflict in found:
+                if "ref" in conflict:
+                    conflicts.setdefault(conflict["ref"], set()).update(conflict["reasons"])
+        if conflicts:
+            return None, conflicts
+
+        series = LessonSeries(
+            group_id=group.id,
+            title=title,
+            room=room,
+            start_time=start_time,
+            end_time=end_time,
+            interval_weeks=interval_weeks,
+            until=until,
+            excluded_dates=",".join(sorted(d.isoformat() for d in excluded)) or None,
+        )
+        db.session.add(series)
+        db.session.commit()
+        return series, {}
+
+    @staticmethod
+    def materialize(series: LessonSeries, start: datetime = None, end: datetime = None) -> int:
+        """
+        Tworzy wiersze `Lesson` dla terminów cyklu z zakresu [start, end), które
+        jeszcze ich nie mają – jedna transakcja, INSERT-y wysyłane paczką.
+
+        Zwraca:
+            liczbę utworzonych lekcji.
+        """
+        existing = set(db.session.scalars(
+            db.select(Lesson.occurrence_start).where(Lesson.series_id == series.id)
+        ))
+        duration = series.end_time - series.start_time
+        lessons = [
+            Lesson(group_id=series.group_id, title=series.title, room=series.room,
+                   start_time=occurrence, end_time=occurrence + duration,
+                   series_id=series.id, occurrence_start=occurrence)
+            for occurrence in series.occurrence_starts(start, end)
+            if occurrence not in existing
+        ]
+        db.session.add_all(lessons)
+        db.session.commit()
+        return len(lessons)
+
+    @staticmethod
+    def cancel(series: LessonSeries, occurrence_start: datetime):
+        """
+        Odwołuje jeden termin cyklu: oznacza jego lekcję jako odwołaną
+        (tworzy ją, jeśli termin nie był zmaterializowany).
+
+        Zwraca:
+            lekcję albo None, gdy cykl nie ma takiego terminu.
+        """
+        duration = series.end_time - series.start_time
+        if occurrence_start not in series.occurrence_starts(occurrence_start, occurrence_start + duration):
+            return None
+
+        lesson = Lesson.query.filter_by(series_id=series.id, occurrence_start=occurrence_start).first()
+        if lesson is None:
+            lesson = Lesson(group_id=series.group_id, title=series.title, room=series.room,
+                            start_time=occurrence_start, end_time=occurrence_start + duration,
+                            series_id=series.id, occurrence_start=occurrence_start)
+            db.session.add(lesson)
+        lesson.is_canceled = True
+        db.session.commit()
+        return lesson
@@ -10,10 +10,22 @@ Tutaj obsługujemy:
 """
 
 
-from flask import Blueprint, render_template, request, redirect, url_for, session
+from datetime import datetime, timedelta
 
-from app.auth import AuthManager
+from flask import Blueprint, render_template, request, redirect, url_for, session, jsonify, g
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import db
+from app.auth import AccountDisabled, AuthManager, PasswordPoolBusy
+from app.identity import current_user, identity_cache
 from app.models import User
+from config import (
+    ADMIN_USERS_PAGE_SIZE,
+    ADMIN_USERS_MAX_PAGE_SIZE,
+    STUDENT_SEARCH_LIMIT,
+    STUDENT_SEARCH_MAX_LIMIT,
+    UPCOMING_LESSONS_LIMIT,
+)
 
 from functools import wraps
 from flask import abort
@@ -35,8 +47,10 @@ def admin_required(view_func):
     """
     @wraps(view_func)
     def wrapped_view(*args, **kwargs):
-        role = session.get("role")
-        if role != "admin":
+        # Rola z g.identity (app/identity.py), a nie z sesji – zmiana roli
+        # lub wyłączenie konta działa bez ponownego logowania
+        identity = g.get("identity")
+        if identity is None or identity.role != "admin":
             # Jeśli nie admin – zwracamy błąd 403 (brak uprawnień)
             return abort(403)
         return view_func(*args, **kwargs)
@@ -58,13 +72,22 @@ def login():
         username = request.form.get("username", "").strip()
         password = request.form.get("password", "")
 
-        success, user = AuthManager.login(username, password)
+        try:
+            success, user = AuthManager.login(username, password)
+        except PasswordPoolBusy:
+            # Przeciążona pula haszująca – hasło nie zostało sprawdzone
+            error = "Serwer jest zajęty, spróbuj ponownie za chwilę."
+            return render_template("login.html", error=error), 503
+        except AccountDisabled:
+            error = "Konto jest wyłączone – skontaktuj się z administratorem."
+            return render_template("login.html", error=error), 403
 
         if success:
             # Zapisujemy podstawowe dane w sesji (po stronie serwera)
             session["user_id"] = user.id
             session["username"] = user.username
             session["role"] = user.role.value  # enum -> tekst
+            identity_cache.put(user)
 
             # Po zalogowaniu przekierowujemy na dashboard
             return redirect(url_for("main.dashboard"))
@@ -94,16 +117,26 @@ def dashboard():
     """
     Główny dashboard – widoczny tylko dla zalogowanych użytkowników.
 
-    Jeżeli w sesji nie ma `user_id`, przekierowujemy na logowanie.
+    Jeżeli użytkownik nie jest zalogowany, przekierowujemy na logowanie.
     """
-    user_id = session.get("user_id")
-    if not user_id:
+    if g.identity is None:
         return redirect(url_for("auth.login"))
 
-    # Pobieramy zalogowanego użytkownika z bazy
-    user = User.query.get(user_id)
+    from app.grades import GradeBook
+    from app.timetable import StudentTimetable
+
+    # Zalogowany użytkownik (wczytany raz na żądanie, app/identity.py)
+    user = current_user()
+
+    semesters = []
+    upcoming = []
+    if user.is_student():
+        # Średnie studenta z tabeli zmaterializowanej (grade_summaries)
+        semesters = GradeBook.student_report(user.id)
+        # Najbliższe zajęcia z tygodni planu w pamięci podręcznej
+        upcoming = StudentTimetable.upcoming(user.id, UPCOMING_LESSONS_LIMIT)
 
-    return render_template("dashboard.html", user=user)
+    return render_template("dashboard.html", user=user, semesters=semesters, upcoming=upcoming)
 
 @main_bp.route("/admin")
 @admin_required
@@ -114,9 +147,7 @@ def admin_panel():
     Na razie wyświetla tylko prostą stronę z linkiem do zarządzania użytkownikami.
     Później dodamy tu liczniki (ilu studentów, ilu wykładowców itd.).
     """
-    user_id = session.get("user_id")
-    admin_user = User.query.get(user_id)
-    return render_template("admin_panel.html", user=admin_user)
+    return render_template("admin_panel.html", user=current_user())
 
 
 @main_bp.route("/admin/users", methods=["GET", "POST"])
@@ -161,10 +192,97 @@ def admin_users():
             else:
                 error = "Nie udało się utworzyć użytkownika (być może istnieje już taki login lub e‑mail)."
 
-    # Pobierz wszystkich użytkowników z bazy
-    users = User.query.order_by(User.id.asc()).all()
+    # Filtry i kursor strony przychodzą w parametrach GET
+    filters = {
+        "role": request.args.get("role", "").strip(),
+        "active": request.args.get("active", "").strip(),
+        "q": request.args.get("q", "").strip(),
+        "sort": "last_name" if request.args.get("sort") == "last_name" else "id",
+    }
+    try:
+        per_page = int(request.args.get("per_page", ADMIN_USERS_PAGE_SIZE))
+    except ValueError:
+        per_page = ADMIN_USERS_PAGE_SIZE
+    per_page = max(1, min(per_page, ADMIN_USERS_MAX_PAGE_SIZE))
+
+    users, next_cursor = _users_page(
+        filters,
+        after_id=request.args.get("after_id", type=int),
+        after_name=request.args.get("after_name"),
+        per_page=per_page,
+    )
 
-    return render_template("admin_users.html", users=users, message=message, error=error)
+    first_url = url_for("main.admin_users", per_page=per_page, **filters)
+    next_url = None
+    if next_cursor:
+        next_url = url_for("main.admin_users", per_page=per_page, **filters, **next_cursor)
+
+    return render_template(
+        "admin_users.html",
+        users=users,
+        filters=filters,
+        per_page=per_page,
+        first_url=first_url,
+        next_url=next_url,
+        message=message,
+        error=error,
+    )
+
+
+def _users_page(filters: dict, after_id=None, after_name=None, per_page: int = ADMIN_USERS_PAGE_SIZE):
+    """
+    Jedna strona listy użytkowników – paginacja kursorem (keyset / seek).
+
+    Zamiast OFFSET (który i tak musi przeczytać wszystkie wcześniejsze wiersze)
+    zapamiętujemy ostatni wiersz strony i prosimy o wiersze "za nim":
+        - sort=id:        WHERE id > :after_id
+        - sort=last_name: WHERE (last_name, id) > (:after_name, :after_id)
+
+    Zwraca:
+        (users, next_cursor) – next_cursor to słownik parametrów URL
+        następnej strony albo None, jeśli to ostatnia strona.
+    """
+    from app.models import UserRole
+
+    query = User.query
+
+    if filters["role"] in {r.value for r in UserRole}:
+        query = query.filter(User.role == UserRole(filters["role"]))
+    if filters["active"] in ("1", "0"):
+        query = query.filter(User.is_active.is_(filters["active"] == "1"))
+    if filters["q"]:
+        # Prefiks jako zakres [q, q + U+10FFFF) na lower(kolumna) – każda kolumna
+        # trafia w swój indeks wyrażeniowy ix_users_lower_*, a id IN (UNION ALL ...)
+        # nie pozwala planerowi wybrać przeglądu tabeli w kolejności sortowania.
+        # LIKE na lower(...) przeglądałby całą tabelę. Znaki % i _ szukamy dosłownie.
+        low, high = filters["q"], filters["q"] + "\U0010ffff"
+        matching = db.union_all(*(
+            db.select(User.id).where(db.func.lower(column) >= db.func.lower(low),
+                                     db.func.lower(column) < db.func.lower(high))
+            for column in (User.last_name, User.first_name, User.username, User.email)
+        ))
+        query = query.filter(User.id.in_(matching))
+
+    if filters["sort"] == "last_name":
+        if after_id is not None and after_name is not None:
+            query = query.filter(db.tuple_(User.last_name, User.id) > db.tuple_(after_name, after_id))
+        query = query.order_by(User.last_name.asc(), User.id.asc())
+    else:
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        query = query.order_by(User.id.asc())
+
+    # Pobieramy jeden wiersz więcej – tak wiemy, czy istnieje następna strona
+    users = query.limit(per_page + 1).all()
+    if len(users) <= per_page:
+        return users, None
+
+    users = users[:per_page]
+    last = users[-1]
+    next_cursor = {"after_id": last.id}
+    if filters["sort"] == "last_name":
+        next_cursor["after_name"] = last.last_name
+    return users, next_cursor
 
 
 @main_bp.route("/admin/users/<int:user_id>/toggle", methods=["POST"])
@@ -180,11 +298,13 @@ def admin_toggle_user(user_id: int):
     user = User.query.get_or_404(user_id)
 
     # Nie pozwalamy wyłączyć samego siebie
-    if user.id == session.get("user_id"):
+    if user.id == g.identity.id:
         return redirect(url_for("main.admin_users"))
 
     user.is_active = not user.is_active
     db.session.commit()
+    # Wyłączony użytkownik traci dostęp od następnego żądania
+    identity_cache.invalidate(user.id)
     return redirect(url_for("main.admin_users"))
 
 @main_bp.route("/admin/courses", methods=["GET", 'POST'])
@@ -245,8 +365,13 @@ def admin_courses():
 
     from app.models import Course, User, UserRole
 
-    # Lista wszystkich kursów
-    courses = Course.query.order_by(Course.code.asc()).all()
+    # Lista wszystkich kursów (prowadzący od razu w JOIN – bez zapytania na wiersz)
+    courses = (
+        Course.query
+        .options(db.joinedload(Course.lecturer))
+        .order_by(Course.code.asc())
+        .all()
+    )
 
     # Lista wykładowców do wyboru w formularzu
     lecturers = User.query.filter_by(role=UserRole.LECTURER).order_by(User.last_name.asc()).all()
@@ -335,6 +460,7 @@ def admin_groups():
 
     groups = (
         ClassGroup.query
+        .options(db.joinedload(ClassGroup.course), db.joinedload(ClassGroup.lecturer))
         .order_by(ClassGroup.year.desc(), ClassGroup.semester.desc(), ClassGroup.name.asc())
         .all()
     )
@@ -363,10 +489,34 @@ def admin_group_students(group_id: int):
     message = None
     error = None
 
-    if request.method == "POST":
+    bulk_report = None
+
+    if request.method == "POST" and ("bulk_students" in request.form or "bulk_file" in request.files):
+        # --- Masowy zapis: lista w polu tekstowym albo plik CSV ---
+        from app.enrollment import BulkEnrollment, parse_identifiers
+
+        text = request.form.get("bulk_students", "")
+        upload = request.files.get("bulk_file")
+        if upload and upload.filename:
+            text += "\n" + upload.read().decode("utf-8-sig", errors="replace")
+
+        identifiers = parse_identifiers(text)
+        if not identifiers:
+            error = "Podaj co najmniej jednego studenta."
+        else:
+            bulk_report = BulkEnrollment.enroll(group, identifiers)
+            counts = BulkEnrollment.summary(bulk_report)
+            message = (
+                f"Zapisano: {counts.get('enrolled', 0)}, "
+                f"już zapisanych: {counts.get('already_enrolled', 0)}, "
+                f"błędnych: {len(bulk_report) - counts.get('enrolled', 0) - counts.get('already_enrolled', 0)}."
+            )
+
+    elif request.method == "POST":
         student_id = request.form.get("student_id", "").strip()
-        if not student_id:
-            error = "Musisz wybrać studenta."
+        if not student_id.isdigit():
+            # Puste albo podmienione pole ukryte – student nie został wybrany z listy
+            error = "Musisz wybrać studenta z listy podpowiedzi."
         else:
             student = User.query.get(int(student_id))
             if not student or student.role != UserRole.STUDENT:
@@ -385,36 +535,105 @@ def admin_group_students(group_id: int):
                         group_id=group.id,
                     )
                     db.session.add(enr)
-                    db.session.commit()
-                    message = "Student został dodany do grupy."
+                    try:
+                        db.session.commit()
+                        message = "Student został dodany do grupy."
+                    except IntegrityError:
+                        # Równoległy zapis tego samego studenta – pilnuje tego
+                        # unikalny indeks uq_enrollments_active_student_group
+                        db.session.rollback()
+                        error = "Ten student jest już zapisany do tej grupy."
 
     # UWAGA: ten kod musi być poza if-em, wewnątrz funkcji
     enrollments = (
         Enrollment.query
         .filter_by(group_id=group.id, is_active=True)
         .join(User, Enrollment.student_id == User.id)
+        .options(db.contains_eager(Enrollment.student))
         .order_by(User.last_name.asc(), User.first_name.asc())
         .all()
     )
 
-    students = (
-        User.query
-        .filter_by(role=UserRole.STUDENT, is_active=True)
-        .order_by(User.last_name.asc(), User.first_name.asc())
-        .all()
-    )
+    # Listy wszystkich studentów już nie ładujemy – formularz korzysta
+    # z autouzupełniania (main.admin_search_students).
 
     # I TO MUSI BYĆ OSTATNIE – zawsze zwracamy odpowiedź
     return render_template(
         "admin_group_students.html",
         group=group,
         enrollments=enrollments,
-        students=students,
+        bulk_report=bulk_report,
         message=message,
         error=error,
     )
 
 
+@main_bp.route("/admin/api/groups/<int:group_id>/enrollments", methods=["POST"])
+@admin_required
+def admin_api_bulk_enroll(group_id: int):
+    """
+    API masowego zapisu: JSON {"students": ["login", "email@...", 123, ...]}.
+
+    Zwraca raport dla każdego wiersza oraz podsumowanie statusów.
+    """
+    from app.enrollment import BulkEnrollment
+    from app.models import ClassGroup
+
+    group = ClassGroup.query.get_or_404(group_id)
+
+    payload = request.get_json(silent=True) or {}
+    students = payload.get("students")
+    if not isinstance(students, list):
+        return jsonify({"error": "Oczekiwano listy 'students'."}), 400
+
+    try:
+        report = BulkEnrollment.enroll(group, [str(s) for s in students])
+    except IntegrityError:
+        # Równoległy zapis tych samych studentów (uq_enrollments_active_student_group)
+        # – transakcja wycofana, nic nie zapisano; ponowienie dostanie already_enrolled
+        return jsonify({"error": "Część studentów została właśnie zapisana równolegle – nic nie zapisano, ponów żądanie."}), 409
+    except OperationalError:
+        # Baza zablokowana dłużej niż busy_timeout – transakcja wycofana
+        return jsonify({"error": "Baza jest zajęta – nic nie zapisano, ponów żądanie."}), 409
+    return jsonify({"results": report, "summary": BulkEnrollment.summary(report)})
+
+
+@main_bp.route("/admin/api/students/search")
+@admin_required
+def admin_search_students():
+    """
+    API autouzupełniania: studenci pasujący do wpisanego fragmentu.
+
+    Parametry GET:
+        q        – fragment nazwiska, imienia, loginu lub e-maila,
+        group_id – (opcjonalnie) pomija studentów już zapisanych do tej grupy,
+        limit    – liczba podpowiedzi (domyślnie STUDENT_SEARCH_LIMIT).
+    """
+    from app.models import UserRole
+    from app.search import UserSearch
+
+    limit = request.args.get("limit", STUDENT_SEARCH_LIMIT, type=int)
+    limit = max(1, min(limit, STUDENT_SEARCH_MAX_LIMIT))
+
+    students = UserSearch.search(
+        request.args.get("q", ""),
+        role=UserRole.STUDENT,
+        exclude_group_id=request.args.get("group_id", type=int),
+        limit=limit,
+    )
+
+    return jsonify([
+        {
+            "id": s.id,
+            "username": s.username,
+            "email": s.email,
+            "full_name": s.full_name,
+            "label": f"{s.last_name} {s.first_name} ({s.username})",
+        }
+        for s in students
+    ])
+
+
 @main_bp.route("/admin/enrollments/<int:enrollment_id>/remove", methods=["POST"])
 @admin_required
 def admin_remove_enrollment(enrollment_id: int):
@@ -438,8 +657,8 @@ def lecturer_required(view_func):
     """
     @wraps(view_func)
     def wrapped_view(*args, **kwargs):
-        role = session.get("role")
-        if role != "lecturer":
+        identity = g.get("identity")
+        if identity is None or identity.role != "lecturer":
             return abort(403)
         return view_func(*args, **kwargs)
     return wrapped_view
@@ -453,8 +672,7 @@ def lecturer_courses():
     """
     from app.models import Course, ClassGroup
 
-    user_id = session.get("user_id")
-    lecturer = User.query.get_or_404(user_id)
+    lecturer = current_user()
 
     # Kursy prowadzone przez tego wykładowcę
     courses = (
@@ -468,6 +686,7 @@ def lecturer_courses():
     groups = (
         ClassGroup.query
         .filter_by(lecturer_id=lecturer.id)
+        .options(db.joinedload(ClassGroup.course))
         .order_by(ClassGroup.name.asc())
         .all()
     )
@@ -488,14 +707,17 @@ def lecturer_group_details(group_id):
     Szczegóły grupy: Oceny + Planowanie Lekcji
     """
     from app import db
-    from app.models import ClassGroup, Enrollment, User, Grade, Lesson
+    from app.grades import GradeBook
+    from app.ical import IcsFeed
+    from app.models import ClassGroup, Enrollment, User, Lesson, LessonSeries
+    from app.recurrence import RecurringLessons
+    from app.scheduling import LessonScheduler
     from datetime import datetime
 
     group = ClassGroup.query.get_or_404(group_id)
     
     # Zabezpieczenie: czy to grupa tego wykładowcy?
-    current_user_id = session.get("user_id")
-    if group.lecturer_id != current_user_id:
+    if group.lecturer_id != g.identity.id:
         return abort(403)
 
     message = None
@@ -516,15 +738,14 @@ def lecturer_group_details(group_id):
                 error = "Uzupełnij wszystkie pola oceny."
             else:
                 try:
-                    new_grade = Grade(
+                    # Ocena + przyrostowa aktualizacja średniej (grade_summaries)
+                    GradeBook.add_grade(
                         student_id=int(student_id),
                         group_id=group.id,
                         label=label,
                         value=float(grade_value),
                         weight=float(weight)
                     )
-                    db.session.add(new_grade)
-                    db.session.commit()
                     message = "Ocena dodana."
                 except ValueError:
                     error = "Błąd danych liczbowych."
@@ -548,69 +769,374 @@ def lecturer_group_details(group_id):
                     if end_dt <= start_dt:
                         error = "Godzina zakończenia musi być późniejsza niż rozpoczęcia."
                     else:
-                        new_lesson = Lesson(
-                            group_id=group.id,
-                            title=title,
-                            start_time=start_dt,
-                            end_time=end_dt,
-                            room=room
+                        # Sala, prowadzący i wspólni studenci – z indeksu terminów (app/scheduling.py)
+                        conflicts = LessonScheduler.check(group.id, start_dt, end_dt, room)
+                        if conflicts:
+                            error = "Termin koliduje z: " + "; ".join(LessonScheduler.describe(conflicts))
+                        else:
+                            new_lesson = Lesson(
+                                group_id=group.id,
+                                title=title,
+                                start_time=start_dt,
+                                end_time=end_dt,
+                                room=room
+                            )
+                            db.session.add(new_lesson)
+                            db.session.commit()
+                            message = "Lekcja zaplanowana."
+                except ValueError:
+                    error = "Błędny format daty/godziny."
+
+        # --- Cykl zajęć: jeden formularz zamiast lekcji tydzień po tygodniu ---
+        elif "series_title" in request.form:
+            title = request.form.get("series_title")
+            date_str = request.form.get("series_date")
+            start_str = request.form.get("series_start")
+            end_str = request.form.get("series_end")
+            until_str = request.form.get("series_until")
+            room = request.form.get("series_room") or None
+
+            if not title or not date_str or not start_str or not end_str or not until_str:
+                error = "Uzupełnij dane cyklu (Tytuł, Pierwsze zajęcia, Godziny, Do dnia)."
+            else:
+                try:
+                    start_dt = datetime.strptime(f"{date_str} {start_str}", "%Y-%m-%d %H:%M")
+                    end_dt = datetime.strptime(f"{date_str} {end_str}", "%Y-%m-%d %H:%M")
+                    until = datetime.strptime(until_str, "%Y-%m-%d").date()
+                    interval_weeks = int(request.form.get("series_interval", "1"))
+                    excluded = request.form.get("series_excluded")
+                    LessonSeries.parse_dates(excluded)  # błędna data -> ValueError
+
+                    if end_dt <= start_dt:
+                        error = "Godzina zakończenia musi być późniejsza niż rozpoczęcia."
+                    elif until < start_dt.date():
+                        error = "Cykl musi kończyć się po pierwszych zajęciach."
+                    elif interval_weeks not in (1, 2):
+                        error = "Cykl może się powtarzać co tydzień albo co dwa tygodnie."
+                    else:
+                        # Wszystkie terminy cyklu sprawdzane jedną paczką (app/scheduling.py)
+                        series, conflicts = RecurringLessons.create(
+                            group, title, start_dt, end_dt, until, room=room,
+                            interval_weeks=interval_weeks, excluded_dates=excluded,
                         )
-                        db.session.add(new_lesson)
-                        db.session.commit()
-                        message = "Lekcja zaplanowana."
+                        if conflicts:
+                            error = "Terminy cyklu kolidują z: " + "; ".join(LessonScheduler.describe(conflicts))
+                        else:
+                            message = f"Cykl zaplanowany, terminów: {len(series.occurrence_starts())}."
                 except ValueError:
                     error = "Błędny format daty/godziny."
 
+        # --- Odwołanie jednego terminu cyklu ---
+        elif "cancel_series_id" in request.form:
+            series = LessonSeries.query.filter_by(
+                id=request.form.get("cancel_series_id", type=int), group_id=group.id
+            ).first_or_404()
+            try:
+                day = datetime.strptime(request.form.get("cancel_date", ""), "%Y-%m-%d")
+                occurrence = day.replace(hour=series.start_time.hour, minute=series.start_time.minute)
+                if RecurringLessons.cancel(series, occurrence) is None:
+                    error = "Cykl nie ma zajęć w tym dniu."
+                else:
+                    message = "Zajęcia odwołane."
+            except ValueError:
+                error = "Błędny format daty."
+
+        # --- Konkretne wiersze lekcji dla wszystkich terminów cyklu ---
+        elif "materialize_series_id" in request.form:
+            series = LessonSeries.query.filter_by(
+                id=request.form.get("materialize_series_id", type=int), group_id=group.id
+            ).first_or_404()
+            message = f"Utworzono lekcje: {RecurringLessons.materialize(series)}."
+
     # --- Pobieranie danych (GET) ---
-    enrollments = (
-        Enrollment.query
-        .filter_by(group_id=group.id, is_active=True)
-        .join(User, Enrollment.student_id == User.id)
-        .order_by(User.last_name.asc())
-        .all()
-    )
+    # Zapisy, studenci i oceny tylko z tej grupy – stała liczba zapytań,
+    # niezależnie od liczby studentów.
+    enrollments, grades_by_student = group.gradebook()
+    # Średnie ważone z tabeli zmaterializowanej – bez przeliczania ocen
+    averages = GradeBook.group_averages(group.id)
 
     # Pobieramy też listę już zaplanowanych lekcji dla tej grupy
     lessons = Lesson.query.filter_by(group_id=group.id).order_by(Lesson.start_time.asc()).all()
+    # ... i cykle zajęć (ich terminy rozwija kalendarz)
+    series = LessonSeries.query.filter_by(group_id=group.id).order_by(LessonSeries.start_time.asc()).all()
+    # Kalendarz ICS grupy do subskrypcji (token prowadzącego)
+    ics_url = url_for("main.ics_group_feed", token=IcsFeed.token(g.identity.id, g.identity.ics_feed_version),
+                      group_id=group.id, _external=True)
 
     return render_template(
         "lecturer_group_details.html",
         group=group,
         enrollments=enrollments,
+        grades_by_student=grades_by_student,
+        averages=averages,
         lessons=lessons,  # Przekazujemy lekcje do szablonu
+        series=series,
+        ics_url=ics_url,
         message=message,
         error=error
     )
 
+def _parse_calendar_param(value):
+    """
+    Parsuje parametr `start`/`end` wysyłany przez FullCalendar
+    (np. '2024-03-04T00:00:00+01:00' albo '2024-03-04').
+
+    Strefę czasową obcinamy – w bazie trzymamy czas lokalny bez strefy.
+    Zwraca None, jeśli parametru nie ma lub ma zły format.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=None)
+
+
+def _calendar_range():
+    """
+    Zakres widoku z parametrów `start`/`end` – bez nich bieżący tydzień
+    (od poniedziałku).
+    """
+    start = _parse_calendar_param(request.args.get("start"))
+    end = _parse_calendar_param(request.args.get("end"))
+    if start is None or end is None:
+        # Bez zakresu pokazujemy bieżący tydzień (od poniedziałku)
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=7)
+    return start, end
+
+
 @main_bp.route("/api/calendar/events")
 def api_calendar_events():
-    user_id = session.get("user_id")
-    if not user_id:
+    """
+    API dla FullCalendar: lekcje zalogowanego użytkownika w widocznym zakresie.
+
+    - wykładowca widzi lekcje prowadzonych przez siebie grup,
+    - student widzi lekcje grup, do których jest aktywnie zapisany
+      (plan z tygodni w pamięci podręcznej, app/timetable.py).
+
+    FullCalendar wysyła parametry `start` i `end` (zakres widoku),
+    dzięki czemu pobieramy tylko jeden tydzień/miesiąc zamiast całej historii.
+    """
+    if g.identity is None:
         return jsonify([])
+    user_id = g.identity.id
+    role = g.identity.role
 
-    lessons = Lesson.query.join(Group).filter(Group.lecturer_id == user_id).all()
-    
-    events = []
-    for lesson in lessons:
-        events.append({
-            "id": lesson.id,  # Ważne do linków (np. edycja)
-            "title": f"{lesson.topic}",
-            "start": lesson.date.isoformat(),
-            "end": lesson.end_date.isoformat() if lesson.end_date else None,
-            # Dodatkowe pola (trafią do extendedProps w JS):
-            "room": "Sala 101", # Jeśli masz to w bazie: lesson.room
-            "group_name": lesson.group.name,
-            "description": "Brak dodatkowego opisu" # lub lesson.description
-        })
+    start, end = _calendar_range()
+    if role not in ("student", "lecturer"):
+        return jsonify([])
+
+    from app.sync import CalendarSync
 
+    # Ta sama pełna lista co w /api/calendar/changes (student – z tygodni w pamięci)
+    events, _version = CalendarSync.full_events(user_id, role, start, end)
     return jsonify(events)
 
+
+@main_bp.route("/api/calendar/changes")
+def api_calendar_changes():
+    """
+    Przyrostowa synchronizacja kalendarza: klient wysyła `since` (token
+    z poprzedniej odpowiedzi) i dostaje tylko zdarzenia zmienione od tego czasu
+    – zamiast całego zakresu przy każdym odświeżeniu (app/sync.py).
+
+    Parametry jak w /api/calendar/events (`start`, `end`) oraz `since`.
+    """
+    from app.sync import CalendarSync
+
+    if g.identity is None:
+        return abort(403)
+
+    start, end = _calendar_range()
+    return jsonify(CalendarSync.changes(g.identity.id, g.identity.role, start, end,
+                                        request.args.get("since")))
+
+
+@main_bp.route("/api/reports/grade-stats")
+def api_grade_stats():
+    """
+    Raport rozkładu ocen (JSON): średnia, mediana, percentyle, odsetek
+    zaliczeń i histogram – dla grup (`level=group`) albo kursów (`level=course`).
+
+    - admin (dziekanat) widzi wszystkie grupy/kursy,
+    - wykładowca widzi grupy, które prowadzi, albo kursy, których jest kierownikiem.
+
+    Opcjonalne filtry: `course_id`, `group_id`. Obliczenia – app/analytics.py.
+    """
+    from app.analytics import LEVELS, CohortStats
+
+    if g.identity is None or g.identity.role not in ("admin", "lecturer"):
+        return abort(403)
+
+    level = request.args.get("level", "group")
+    if level not in LEVELS:
+        return jsonify({"error": f"level: dozwolone {', '.join(LEVELS)}"}), 400
+
+    scope = {
+        "course_id": request.args.get("course_id", type=int),
+        "group_id": request.args.get("group_id", type=int),
+    }
+    if g.identity.role == "lecturer":
+        scope["group_lecturer_id" if level == "group" else "course_lecturer_id"] = g.identity.id
+
+    return jsonify(CohortStats.report(level, **scope))
+
+
+@main_bp.route("/groups/<int:group_id>/grades.csv")
+def export_group_grades(group_id: int):
+    """
+    Eksport CSV dziennika ocen grupy – dla admina i prowadzącego tę grupę.
+    """
+    from app.exports import CsvExport
+    from app.models import ClassGroup
+
+    if g.identity is None:
+        return abort(403)
+    group = ClassGroup.query.get_or_404(group_id)
+    if g.identity.role != "admin" and group.lecturer_id != g.identity.id:
+        return abort(403)
+
+    return CsvExport.response(CsvExport.group_grades(group.id), f"oceny_grupa_{group.id}.csv")
+
+
+@main_bp.route("/admin/courses/<int:course_id>/enrollments.csv")
+@admin_required
+def admin_export_course_enrollments(course_id: int):
+    """
+    Eksport CSV aktywnych zapisów do wszystkich grup kursu.
+    """
+    from werkzeug.utils import secure_filename
+
+    from app.exports import CsvExport
+    from app.models import Course
+
+    course = Course.query.get_or_404(course_id)
+    filename = f"zapisy_{secure_filename(course.code) or course.id}.csv"
+    return CsvExport.response(CsvExport.course_enrollments(course.id), filename)
+
+
+@main_bp.route("/admin/exports/grades.csv")
+@admin_required
+def admin_export_all_grades():
+    """
+    Eksport CSV wszystkich ocen uczelni (miliony wierszy – wysyłane strumieniowo).
+    """
+    from app.exports import CsvExport
+
+    filename = f"oceny_{datetime.now():%Y-%m-%d}.csv"
+    return CsvExport.response(CsvExport.all_grades(), filename)
+
 @main_bp.route("/calendar")
 def calendar_view():
     """Wyświetla stronę z kalendarzem (frontend)."""
     # Sprawdzamy czy zalogowany (opcjonalne, ale zalecane)
-    if not session.get("user_id"):
+    if g.identity is None:
         return redirect(url_for("auth.login"))
-        
-    return render_template("calendar.html")
+
+    from app.ical import IcsFeed
+
+    # Adres do subskrypcji planu w aplikacji kalendarza (telefon, Outlook)
+    ics_url = None
+    if g.identity.role in ("student", "lecturer"):
+        ics_url = url_for("main.ics_user_feed", token=IcsFeed.token(g.identity.id, g.identity.ics_feed_version),
+                          _external=True)
+
+    # Przyciski „Sprawdź obecność” / „Edytuj” tylko dla prowadzących
+    return render_template("calendar.html", can_manage=g.identity.role == "lecturer", ics_url=ics_url)
+
+
+def _feed_identity(token: str):
+    """
+    Właściciel tokenu kalendarza ICS (aplikacja kalendarza nie ma sesji)
+    albo None – zły podpis, konto usunięte lub wyłączone, link unieważniony
+    (inna wersja linku niż `users.ics_feed_version`).
+    """
+    from app.ical import IcsFeed
+
+    payload = IcsFeed.payload(token)
+    if payload is None:
+        return None
+    user_id, feed_version = payload
+    identity = identity_cache.get(user_id)
+    if identity is None or not identity.is_active or identity.ics_feed_version != feed_version:
+        return None
+    return identity
+
+
+@main_bp.route("/ics/regenerate", methods=["POST"])
+def ics_regenerate():
+    """
+    „Wygeneruj nowy link” – podnosi wersję linku kalendarza ICS zalogowanego
+    użytkownika, więc wszystkie wcześniej wydane adresy (plan, grupy, sale)
+    przestają działać. W innych procesach serve.py – najpóźniej po IDENTITY_CACHE_TTL.
+    """
+    if g.identity is None:
+        return redirect(url_for("auth.login"))
+
+    user = current_user()
+    user.ics_feed_version = (user.ics_feed_version or 0) + 1
+    db.session.commit()
+    identity_cache.invalidate(user.id)
+    return redirect(request.referrer or url_for("main.calendar_view"))
+
+
+@main_bp.route("/ics/<token>/plan.ics")
+def ics_user_feed(token):
+    """
+    Kalendarz ICS właściciela tokenu: plan studenta albo prowadzone grupy wykładowcy.
+    Zwykle 304 – ETag z liczników zmian grup (app/ical.py).
+    """
+    from app.ical import IcsFeed
+
+    identity = _feed_identity(token)
+    if identity is None:
+        return abort(404)
+    return IcsFeed.user_feed(identity.id, identity.role)
+
+
+@main_bp.route("/ics/<token>/groups/<int:group_id>.ics")
+def ics_group_feed(token, group_id: int):
+    """
+    Kalendarz ICS jednej grupy – dla admina, prowadzącego i studentów
+    aktywnie zapisanych do grupy.
+    """
+    from app.ical import IcsFeed
+    from app.models import ClassGroup, Enrollment
+
+    identity = _feed_identity(token)
+    if identity is None:
+        return abort(404)
+    group = db.session.get(ClassGroup, group_id)
+    if group is None:
+        return abort(404)
+
+    if identity.role == "lecturer":
+        allowed = group.lecturer_id == identity.id
+    elif identity.role == "student":
+        allowed = db.session.scalar(
+            db.select(Enrollment.id).where(
+                Enrollment.student_id == identity.id,
+                Enrollment.group_id == group.id,
+                Enrollment.is_active.is_(True),
+            ).limit(1)
+        ) is not None
+    else:
+        allowed = identity.role == "admin"
+    if not allowed:
+        return abort(403)
+
+    return IcsFeed.group_feed(group)
+
+
+@main_bp.route("/ics/<token>/rooms/<room>.ics")
+def ics_room_feed(token, room: str):
+    """Kalendarz ICS sali (np. tablica przy drzwiach) – dla każdego aktywnego konta."""
+    from app.ical import IcsFeed
+
+    if _feed_identity(token) is None:
+        return abort(404)
+    return IcsFeed.room_feed(room)
 
@@ -0,0 +1,606 @@
+"""
+app/scheduling.py
+----------------
+Wykrywanie kolizji terminów lekcji.
+
+Nowa lekcja koliduje z inną nieodwołaną lekcją, która nakłada się na nią
+w czasie i:
+- odbywa się w tej samej sali,
+- ma tego samego prowadzącego (prowadzący grupy),
+- dotyczy tych samych studentów (ta sama grupa albo grupa, do której
+  aktywnie zapisany jest choć jeden student tej grupy).
+
+Lekcje i terminy cykli zajęć (app/recurrence.py) trzymamy w pamięci procesu
+w indeksach przedziałów (posortowane listy + bisect) osobno dla każdej sali,
+prowadzącego i grupy – pytanie „czy ten termin koliduje?” to wyszukiwanie
+binarne, a nie przegląd tabeli. Indeks budujemy przy pierwszym użyciu
+i aktualizujemy po każdym zatwierdzonym zapisie lekcji/cyklu/grupy przez ORM.
+Zmiany z innych procesów serve.py wykrywamy przed każdym sprawdzeniem: indeks
+pamięta numer ostatniej zmiany planu (app/changes.py), z którym jest zgodny –
+inny numer w bazie oznacza cudzy zapis i przebudowę indeksu. Dodatkowo indeks
+budujemy od nowa co SCHEDULE_INDEX_TTL sekund (zmiany z pominięciem ORM).
+
+Pozycje indeksu to odnośniki: ("lesson", id lekcji) albo
+("series", id cyklu, początek terminu) – dla niezmaterializowanych terminów cyklu.
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy.orm import Session
+
+from app import db
+from app.changes import LessonChanges
+from app.models import ClassGroup, Enrollment, Lesson, LessonSeries
+
+# SQLite ma limit liczby parametrów w zapytaniu – IN (...) dzielimy na paczki.
+CHUNK_SIZE = 500
+
+# Powody kolizji
+REASON_ROOM = "room"
+REASON_LECTURER = "lecturer"
+REASON_STUDENTS = "students"
+
+# Rodzaje odnośników w indeksie
+LESSON = "lesson"
+SERIES = "series"
+
+REASON_LABELS = {
+    REASON_ROOM: "ta sama sala",
+    REASON_LECTURER: "ten sam prowadzący",
+    REASON_STUDENTS: "wspólni studenci",
+}
+
+
+def ref_label(ref) -> str:
+    """Odnośnik czytelny dla człowieka: "lekcja 12" albo "cykl 3 (13.10.2026 10:00)"."""
+    if ref[0] == SERIES:
+        return f"cykl {ref[1]} ({ref[2]:%d.%m.%Y %H:%M})"
+    return f"lekcja {ref[1]}"
+
+
+def _room_key(room):
+    """Sala bez różnic w wielkości liter i spacjach ('Aula  A' == 'aula a'); None = bez sali."""
+    if not room:
+        return None
+    return " ".join(room.split()).casefold() or None
+
+
+class IntervalIndex:
+    """
+    Przedziały [początek, koniec) posortowane po początku.
+
+    Przedział nakładający się na [start, end) zaczyna się przed `end` i nie
+    wcześniej niż `start - najdłuższy przedział` – wystarczą dwa wyszukiwania
+    binarne i przejrzenie tylko lekcji z tego okna.
+    """
+
+    __slots__ = ("_items", "_longest")
+
+    def __init__(self):
+        self._items = []  # (początek, koniec, odnośnik)
+        self._longest = timedelta(0)
+
+    def add(self, start, end, ref):
+        bisect.insort(self._items, (start, end, ref))
+        if end - start > self._longest:
+            self._longest = end - start
+
+    def extend(self, items):
+        """Wiele przedziałów (początek, koniec, odnośnik) naraz – jedno sortowanie zamiast insort."""
+        self._items.extend(items)
+        self._items.sort()
+        for start, end, _ in items:
+            if end - start > self._longest:
+                self._longest = end - start
+
+    def remove(self, start, end, ref):
+        item = (start, end, ref)
+        i = bisect.bisect_left(self._items, item)
+        if i < len(self._items) and self._items[i] == item:
+            del self._items[i]
+
+    def overlapping(self, start, end) -> list:
+        """Odnośniki przedziałów nakładających się na [start, end)."""
+        lo = bisect.bisect_left(self._items, (start - self._longest,))
+        hi = bisect.bisect_left(self._items, (end,))
+        return [ref for _, item_end, ref in self._items[lo:hi] if item_end > start]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _lookup(indexes: dict, key, start, end) -> list:
+    index = indexes.get(key)
+    return index.overlapping(start, end) if index is not None else []
+
+
+class ScheduleIndex:
+    """
+    Nieodwołane lekcje i terminy cykli w indeksach przedziałów: sala -> terminy,
+    prowadzący -> terminy, grupa -> terminy – podłączany w `create_app()`
+    tak jak `timetable_cache`.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}         # odnośnik -> (grupa, sala, początek, koniec)
+        self._group_lecturer = {}  # id grupy -> id prowadzącego
+        self._series = {}          # id cyklu -> (grupa, sala, początek, koniec, co ile tygodni, do, wyjątki)
+        self._series_refs = {}     # id cyklu -> odnośniki jego terminów w indeksie
+        self._replaced = {}        # id cyklu -> {początek terminu: id lekcji, która go zastępuje}
+        self._by_room = {}
+        self._by_lecturer = {}
+        self._by_group = {}
+        self._built_at = None
+        self._version = None       # numer ostatniej zmiany planu uwzględnionej w indeksie
+        self.ttl = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("SCHEDULE_INDEX_TTL") or 0
+        # Nowa aplikacja = być może inna baza – indeks zbudujemy od nowa
+        self.clear()
+
+        if not db.event.contains(Session, "after_flush", _collect_changes):
+            db.event.listen(Session, "after_flush", _collect_changes)
+            db.event.listen(Session, "after_commit", _apply_changes)
+            db.event.listen(Session, "after_rollback", _discard_changes)
+
+    def clear(self):
+        with self._lock:
+            for collection in (self._entries, self._group_lecturer, self._series, self._series_refs,
+                               self._replaced, self._by_room, self._by_lecturer, self._by_group):
+                collection.clear()
+            self._built_at = None
+            self._version = None
+
+    def rebuild(self):
+        """
+        Buduje indeks od zera: zapytanie o grupy, o lekcje (nieodwołane i te
+        zastępujące terminy cykli) i o cykle – terminy cykli rozwijamy w pamięci.
+        """
+        # Numer zmiany przed danymi – zapis w trakcie budowy da inny numer i kolejną przebudowę
+        version = LessonChanges.latest()
+        groups = db.session.execute(db.select(ClassGroup.id, ClassGroup.lecturer_id)).all()
+        lessons = db.session.execute(
+            db.select(Lesson.id, Lesson.group_id, Lesson.room, Lesson.start_time, Lesson.end_time,
+                      Lesson.is_canceled, Lesson.series_id, Lesson.occurrence_start)
+            .where(db.or_(Lesson.is_canceled.is_(False), Lesson.is_canceled.is_(None),
+                          Lesson.series_id.is_not(None)))
+        ).all()
+        series = db.session.execute(
+            db.select(LessonSeries.id, LessonSeries.group_id, LessonSeries.room, LessonSeries.start_time,
+                      LessonSeries.end_time, LessonSeries.interval_weeks, LessonSeries.until,
+                      LessonSeries.excluded_dates)
+        ).all()
+
+        with self._lock:
+            self.clear()
+            self._group_lecturer.update(groups)
+            entries = []
+            for lesson_id, group_id, room, start, end, canceled, series_id, occurrence in lessons:
+                if series_id is not None:
+                    self._replaced.setdefault(series_id, {})[occurrence] = lesson_id
+                if not canceled:
+                    entries.append(((LESSON, lesson_id), group_id, room, start, end))
+            for series_id, group_id, room, start, end, interval, until, excluded in series:
+                self._series[series_id] = (group_id, room, start, end, interval, until,
+                                           LessonSeries.parse_dates(excluded))
+                entries += self._series_entries(series_id)
+
+            by_room, by_lecturer, by_group = {}, {}, {}
+            for ref, group_id, room, start, end in entries:
+                room = _room_key(room)
+                item = (start, end, ref)
+                self._entries[ref] = (group_id, room, start, end)
+                if ref[0] == SERIES:
+                    self._series_refs.setdefault(ref[1], []).append(ref)
+                by_group.setdefault(group_id, []).append(item)
+                if room is not None:
+                    by_room.setdefault(room, []).append(item)
+                lecturer_id = self._group_lecturer.get(group_id)
+                if lecturer_id is not None:
+                    by_lecturer.setdefault(lecturer_id, []).append(item)
+            for indexes, items in ((self._by_room, by_room), (self._by_lecturer, by_lecturer),
+                                   (self._by_group, by_group)):
+                for key, group_items in items.items():
+                    indexes.setdefault(key, IntervalIndex()).extend(group_items)
+            self._built_at = time.monotonic()
+            self._version = version
+
+    def ensure(self):
+        """
+        Buduje indeks przy pierwszym użyciu, gdy inny proces zmienił plan
+        (numer ostatniej zmiany – jedno zapytanie po indeksie) i po upływie
+        SCHEDULE_INDEX_TTL (0 = zawsze).
+        """
+        built_at = self._built_at
+        if (built_at is None or not self.ttl or time.monotonic() - built_at > self.ttl
+                or LessonChanges.latest() != self._version):
+            self.rebuild()
+
+    def _series_entries(self, series_id) -> list:
+        """Terminy cyklu bez zastąpionych wierszem `Lesson`: (odnośnik, grupa, sala, początek, koniec)."""
+        group_id, room, first_start, first_end, interval, until, excluded = self._series[series_id]
+        replaced = self._replaced.get(series_id, {})
+        duration = first_end - first_start
+        return [((SERIES, series_id, start), group_id, room, start, start + duration)
+                for start in LessonSeries.expand(first_start, interval, until, excluded)
+                if start not in replaced]
+
+    def _reindex_series(self, series_id):
+        """Terminy cyklu od nowa – po zmianie reguły albo lekcji zastępującej termin."""
+        for ref in self._series_refs.pop(series_id, ()):
+            self._discard(ref)
+        if series_id in self._series:
+            for ref, group_id, room, start, end in self._series_entries(series_id):
+                self._add(ref, group_id, room, start, end)
+                self._series_refs.setdefault(series_id, []).append(ref)
+
+    def _add(self, ref, group_id, room, start, end):
+        room = _room_key(room)
+        self._entries[ref] = (group_id, room, start, end)
+        self._by_group.setdefault(group_id, IntervalIndex()).add(start, end, ref)
+        if room is not None:
+            self._by_room.setdefault(room, IntervalIndex()).add(start, end, ref)
+        lecturer_id = self._group_lecturer.get(group_id)
+        if lecturer_id is not None:
+            self._by_lecturer.setdefault(lecturer_id, IntervalIndex()).add(start, end, ref)
+
+    def _discard(self, ref):
+        entry = self._entries.pop(ref, None)
+        if entry is None:
+            return
+        group_id, room, start, end = entry
+        for indexes, key in ((self._by_group, group_id), (self._by_room, room),
+                             (self._by_lecturer, self._group_lecturer.get(group_id))):
+            index = indexes.get(key)
+            if index is not None:
+                index.remove(start, end, ref)
+
+    def _set_lecturer(self, group_id, lecturer_id):
+        """Zmiana prowadzącego grupy – jej terminy przechodzą do indeksu nowego prowadzącego."""
+        old = self._group_lecturer.get(group_id)
+        if old == lecturer_id:
+            return
+        for start, end, ref in list(self._by_group.get(group_id, ())):
+            if old is not None:
+                self._by_lecturer[old].remove(start, end, ref)
+            if lecturer_id is not None:
+                self._by_lecturer.setdefault(lecturer_id, IntervalIndex()).add(start, end, ref)
+        self._group_lecturer[group_id] = lecturer_id
+
+    def _replace(self, series_id, occurrence, lesson_id):
+        """Lekcja `lesson_id` zastępuje termin cyklu (None – już nie zastępuje)."""
+        replaced = self._replaced.setdefault(series_id, {})
+        if lesson_id is None:
+            replaced.pop(occurrence, None)
+        else:
+            replaced[occurrence] = lesson_id
+        self._reindex_series(series_id)
+
+    def apply(self, changes: list, seqs=()):
+        """
+        Zmiany zebrane w `after_flush` (po commit); niezbudowany indeks nie potrzebuje ich.
+        `seqs` to numery zmian nadane w tej transakcji – jeśli zaraz po numerze indeksu,
+        indeks dalej jest zgodny z bazą, inaczej kolejne `ensure()` go przebuduje.
+        """
+        with self._lock:
+            if self._built_at is None:
+                return
+            if self._version is not None and list(seqs) == list(range(self._version + 1,
+                                                                       self._version + 1 + len(seqs))):
+                self._version += len(seqs)
+            for change in changes:
+                kind, key = change[0], change[1]
+                if kind == "lesson":
+                    group_id, room, start, end, canceled, series_id, occurrence = change[2:]
+                    self._discard((LESSON, key))
+                    if not canceled:
+                        self._add((LESSON, key), group_id, room, start, end)
+                    if series_id is not None:
+                        self._replace(series_id, occurrence, key)
+                elif kind == "lesson_deleted":
+                    self._discard((LESSON, key))
+                    series_id, occurrence = change[2:]
+                    if series_id is not None:
+                        self._replace(series_id, occurrence, None)
+                elif kind == "series":
+                    group_id, room, start, end, interval, until, excluded = change[2:]
+                    self._series[key] = (group_id, room, start, end, interval, until,
+                                         LessonSeries.parse_dates(excluded))
+                    self._reindex_series(key)
+                elif kind == "series_deleted":
+                    self._series.pop(key, None)
+                    self._replaced.pop(key, None)
+                    self._reindex_series(key)
+                elif kind == "group":
+                    self._set_lecturer(key, change[2])
+
+    def conflicts(self, group_id, start, end, room=None, lecturer_id=None,
+                  student_groups=(), exclude=None) -> dict:
+        """
+        Terminy kolidujące z [start, end).
+
+        Parametry:
+            group_id       – grupa nowej lekcji,
+            lecturer_id    – prowadzący (domyślnie prowadzący grupy z indeksu),
+            student_groups – grupy ze wspólnymi studentami (oprócz `group_id`),
+            exclude        – odnośnik pomijany (np. właśnie edytowana lekcja).
+
+        Zwraca:
+            {odnośnik: zbiór powodów}
+        """
+        if lecturer_id is None:
+            lecturer_id = self._group_lecturer.get(group_id)
+
+        found = {}
+        with self._lock:
+            checks = [(self._by_room, _room_key(room), REASON_ROOM),
+                      (self._by_lecturer, lecturer_id, REASON_LECTURER),
+                      (self._by_group, group_id, REASON_STUDENTS)]
+            checks += [(self._by_group, other, REASON_STUDENTS) for other in student_groups]
+            for indexes, key, reason in checks:
+                if key is None:
+                    continue
+                for ref in _lookup(indexes, key, start, end):
+                    if ref != exclude:
+                        found.setdefault(ref, set()).add(reason)
+        return found
+
+    def lecturer_of(self, group_id):
+        return self._group_lecturer.get(group_id)
+
+    def snapshot(self) -> list:
+        """Kopia indeksu: lista (początek, koniec, odnośnik, grupa, sala, prowadzący)."""
+        with self._lock:
+            return [(start, end, ref, group_id, room, self._group_lecturer.get(group_id))
+                    for ref, (group_id, room, start, end) in self._entries.items()]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _collect_changes(session, flush_context):
+    """`after_flush`: zapamiętuje stan zapisanych lekcji, cykli i prowadzących grup."""
+    changes = session.info.setdefault("schedule_changes", [])
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Lesson):
+            changes.append(("lesson", obj.id, obj.group_id, obj.room, obj.start_time, obj.end_time,
+                            bool(obj.is_canceled), obj.series_id, obj.occurrence_start))
+        elif isinstance(obj, LessonSeries):
+            changes.append(("series", obj.id, obj.group_id, obj.room, obj.start_time, obj.end_time,
+                            obj.interval_weeks, obj.until, obj.excluded_dates))
+        elif isinstance(obj, ClassGroup):
+            changes.append(("group", obj.id, obj.lecturer_id))
+    for obj in session.deleted:
+        if isinstance(obj, Lesson):
+            changes.append(("lesson_deleted", obj.id, obj.series_id, obj.occurrence_start))
+        elif isinstance(obj, LessonSeries):
+            changes.append(("series_deleted", obj.id))
+
+
+def _apply_changes(session):
+    """`after_commit`: zmiany trafiają do indeksu dopiero, gdy są w bazie."""
+    changes = session.info.pop("schedule_changes", None)
+    seqs = session.info.pop("change_seqs", ())
+    if changes or seqs:
+        schedule_index.apply(changes or [], seqs)
+
+
+def _discard_changes(session):
+    session.info.pop("schedule_changes", None)
+    session.info.pop("change_seqs", None)
+
+
+class LessonScheduler:
+    """Metody do sprawdzania kolizji lekcji (pojedynczej, paczki, istniejących)."""
+
+    @staticmethod
+    def shared_groups(group_ids) -> dict:
+        """
+        Grupy, z którymi podane grupy mają wspólnych aktywnych studentów
+        (jedno zapytanie na paczkę CHUNK_SIZE grup).
+
+        Zwraca:
+            {id grupy: zbiór id innych grup}
+        """
+        other = db.aliased(Enrollment)
+        statement = (
+            db.select(Enrollment.group_id, other.group_id).distinct()
+            .join(other, db.and_(other.student_id == Enrollment.student_id,
+                                 other.group_id != Enrollment.group_id,
+                                 other.is_active.is_(True)))
+            .where(Enrollment.is_active.is_(True))
+        )
+
+        shared = {}
+        if group_ids is None:
+            batches = [statement]
+        else:
+            group_ids = sorted(set(group_ids))
+            batches = [statement.where(Enrollment.group_id.in_(group_ids[i:i + CHUNK_SIZE]))
+                       for i in range(0, len(group_ids), CHUNK_SIZE)]
+        for batch in batches:
+            for group_id, other_id in db.session.execute(batch):
+                shared.setdefault(group_id, set()).add(other_id)
+        return shared
+
+    @staticmethod
+    def check(group_id: int, start, end, room=None, exclude=None) -> dict:
+        """
+        Czy termin [start, end) w grupie `group_id` (i sali `room`) koliduje
+        z istniejącymi lekcjami albo terminami cykli?
+
+        Zwraca:
+            {odnośnik: zbiór powodów} – pusty słownik, gdy termin jest wolny.
+        """
+        schedule_index.ensure()
+        student_groups = LessonScheduler.shared_groups([group_id]).get(group_id, ())
+        return schedule_index.conflicts(group_id, start, end, room,
+                                        student_groups=student_groups, exclude=exclude)
+
+    @staticmethod
+    def validate_batch(proposals: list) -> list:
+        """
+        Sprawdza paczkę lekcji (np. cały semestr) w jednym przebiegu: każdą
+        z istniejącymi terminami i z wcześniejszymi lekcjami tej samej paczki.
+
+        Parametry:
+            proposals – lista słowników {"group_id", "start_time", "end_time",
+                        "room" (opcjonalnie), "exclude" (opcjonalnie – odnośnik
+                        edytowanej lekcji)}.
+
+        Zwraca:
+            listę (w kolejności paczki) list kolizji
+            {"ref" (odnośnik) albo "proposal" (indeks w paczce), "reasons"}.
+        """
+        schedule_index.ensure()
+        shared = LessonScheduler.shared_groups({p["group_id"] for p in proposals})
+
+        # Wcześniejsze lekcje paczki – w takich samych indeksach jak istniejące
+        by_room, by_lecturer, by_group = {}, {}, {}
+        results = []
+        for i, p in enumerate(proposals):
+            group_id, start, end = p["group_id"], p["start_time"], p["end_time"]
+            room = _room_key(p.get("room"))
+            lecturer_id = schedule_index.lecturer_of(group_id)
+            student_groups = shared.get(group_id, set())
+
+            conflicts = [
+                {"ref": ref, "reasons": reasons}
+                for ref, reasons in schedule_index.conflicts(
+                    group_id, start, end, room, lecturer_id, student_groups,
+                    exclude=p.get("exclude")).items()
+            ]
+
+            found = {}
+            checks = [(by_room, room, REASON_ROOM), (by_lecturer, lecturer_id, REASON_LECTURER),
+                      (by_group, group_id, REASON_STUDENTS)]
+            checks += [(by_group, other, REASON_STUDENTS) for other in student_groups]
+            for indexes, key, reason in checks:
+                if key is not None:
+                    for j in _lookup(indexes, key, start, end):
+                        found.setdefault(j, set()).add(reason)
+            conflicts += [{"proposal": j, "reasons": reasons} for j, reasons in sorted(found.items())]
+            results.append(conflicts)
+
+            for indexes, key in ((by_room, room), (by_lecturer, lecturer_id), (by_group, group_id)):
+                if key is not None:
+                    indexes.setdefault(key, IntervalIndex()).add(start, end, i)
+        return results
+
+    @staticmethod
+    def existing_conflicts(group_ids=None) -> list:
+        """
+        Kolizje między zapisanymi już lekcjami i terminami cykli (opcjonalnie
+        tylko pary, w których jest termin podanych grup) – każda para raz.
+
+        Jeden przebieg „miotłą” po terminach posortowanych po początku: trzymamy
+        tylko terminy trwające w danej chwili (sala / prowadzący / grupa -> odnośniki),
+        a wspólnych studentów szukamy przecięciem zbioru grup powiązanych
+        z trwającymi grupami – zamiast wyszukiwania w indeksie każdej z nich.
+
+        Zwraca:
+            listę krotek (odnośnik wcześniejszego terminu, późniejszego, zbiór powodów).
+        """
+        schedule_index.ensure()
+        if group_ids is not None:
+            group_ids = set(group_ids)
+        shared = LessonScheduler.shared_groups(group_ids)
+        if group_ids is not None:
+            # Relacja jest symetryczna – para (grupa spoza listy, grupa z listy) też się liczy
+            for group_id, others in list(shared.items()):
+                for other in others:
+                    shared.setdefault(other, set()).add(group_id)
+
+        entries = schedule_index.snapshot()
+        entries.sort()
+        group_of = {entry[2]: entry[3] for entry in entries}
+
+        ending = []  # kopiec (koniec, odnośnik, sala, prowadzący, grupa)
+        active_room, active_lecturer, active_group = {}, {}, {}
+        pairs = []
+        for start, end, ref, group_id, room, lecturer_id in entries:
+            while ending and ending[0][0] <= start:
+                _, old_ref, *keys = heapq.heappop(ending)
+                for active, key in zip((active_room, active_lecturer, active_group), keys):
+                    refs = active.get(key)
+                    if refs is not None:
+                        refs.discard(old_ref)
+                        if not refs:
+                            del active[key]
+
+            found = {}
+            for active, key, reason in ((active_room, room, REASON_ROOM),
+                                        (active_lecturer, lecturer_id, REASON_LECTURER),
+                                        (active_group, group_id, REASON_STUDENTS)):
+                for other in active.get(key, ()):
+                    found.setdefault(other, set()).add(reason)
+            others = shared.get(group_id)
+            if others:
+                for other_group in others & active_group.keys():
+                    for other in active_group[other_group]:
+                        found.setdefault(other, set()).add(REASON_STUDENTS)
+
+            for other, reasons in found.items():
+                if group_ids is None or group_id in group_ids or group_of[other] in group_ids:
+                    pairs.append((other, ref, reasons))
+
+            heapq.heappush(ending, (end, ref, room, lecturer_id, group_id))
+            for active, key in ((active_room, room), (active_lecturer, lecturer_id),
+                                (active_group, group_id)):
+                if key is not None:
+                    active.setdefault(key, set()).add(ref)
+        return pairs
+
+    @staticmethod
+    def describe(conflicts: dict, limit: int = 5) -> list:
+        """
+        Opisy (najwyżej `limit` najwcześniejszych) kolizji dla użytkownika –
+        zapytanie o kolidujące lekcje i o cykle, np.
+        "Wykład 3 (Grupa A), 12.03.2026 08:00–09:30 – ta sama sala".
+        """
+        lesson_ids = [ref[1] for ref in conflicts if ref[0] == LESSON][:CHUNK_SIZE]
+        series_ids = list({ref[1] for ref in conflicts if ref[0] == SERIES})[:CHUNK_SIZE]
+
+        found = []  # (początek, koniec, tytuł, grupa, odnośnik)
+        if lesson_ids:
+            rows = db.session.execute(
+                db.select(Lesson.id, Lesson.title, Lesson.start_time, Lesson.end_time, ClassGroup.name)
+                .join(ClassGroup, Lesson.group_id == ClassGroup.id)
+                .where(Lesson.id.in_(lesson_ids))
+            ).all()
+            found += [(row.start_time, row.end_time, row.title, row.name, (LESSON, row.id)) for row in rows]
+        if series_ids:
+            rows = db.session.execute(
+                db.select(LessonSeries.id, LessonSeries.title, LessonSeries.start_time,
+                          LessonSeries.end_time, ClassGroup.name)
+                .join(ClassGroup, LessonSeries.group_id == ClassGroup.id)
+                .where(LessonSeries.id.in_(series_ids))
+            ).all()
+            series = {row.id: row for row in rows}
+            for ref in conflicts:
+                if ref[0] == SERIES and ref[1] in series:
+                    row = series[ref[1]]
+                    found.append((ref[2], ref[2] + (row.end_time - row.start_time), row.title, row.name, ref))
+
+        found.sort()
+        descriptions = [
+            f"{title} ({group_name}), {start:%d.%m.%Y %H:%M}–{end:%H:%M} – "
+            + ", ".join(REASON_LABELS[r] for r in sorted(conflicts[ref]))
+            for start, end, title, group_name, ref in found[:limit]
+        ]
+        if len(conflicts) > limit:
+            descriptions.append(f"i {len(conflicts) - limit} innych")
+        return descriptions
+
+
+# Globalny obiekt – tak jak `timetable_cache`
+schedule_index = ScheduleIndex()
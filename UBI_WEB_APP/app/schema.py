@@ -0,0 +1,143 @@
+"""
+app/schema.py
+----------------
+Wersja schematu bazy i szybka ścieżka startu aplikacji.
+
+Tworzenie i zmiany schematu (migracje z app/migrations/, patrz app/migrate.py),
+indeks pełnotekstowy i użytkownicy testowi to operacja jednorazowa – wykonuje
+ją komenda:
+    flask --app app init-db
+
+Przy każdym starcie `create_app()` wystarczy jedno tanie zapytanie
+o MAX(version) z tabeli `schema_version`. Tryby startu (SCHEMA_STARTUP_MODE):
+- "auto"   – schemat aktualny: nic nie robimy; nieaktualny: inicjalizujemy bazę
+             (wygodne w developmencie i dla baz tymczasowych); w komendach
+             `flask` istniejącą bazę tylko inicjalizujemy od zera – zaległe
+             migracje wykonuje `migrate up` / `init-db` (z raportem i dry-run),
+- "verify" – tylko sprawdzamy wersję; nieaktualny schemat zatrzymuje start
+             (produkcja: wiele workerów nie wyściguje się przy tworzeniu tabel
+             i dodawaniu użytkowników testowych).
+"""
+
+import click
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.migrate import MigrationRunner, load_migrations
+from config import TEST_USERS
+
+STARTUP_MODES = ("auto", "verify")
+
+# Wersja schematu, której oczekuje bieżący kod (ostatni skrypt w app/migrations/).
+SCHEMA_VERSION = load_migrations()[-1].version
+
+
+class SchemaManager:
+    """Metody do sprawdzania i inicjalizacji schematu bazy."""
+
+    @staticmethod
+    def inspect():
+        """
+        Jedno zapytanie: wersja schematu i obecność indeksu FTS5.
+
+        Zwraca:
+            (wersja albo None, gdy tabeli `schema_version` nie ma lub jest pusta,
+             czy istnieje tabela `users_fts`)
+        """
+        if db.engine.dialect.name == "sqlite":
+            sql = (
+                "SELECT (SELECT MAX(version) FROM schema_version), "
+                "EXISTS(SELECT 1 FROM sqlite_master WHERE type='table' AND name='users_fts')"
+            )
+        else:
+            sql = "SELECT MAX(version), 0 FROM schema_version"
+
+        try:
+            with db.engine.connect() as conn:
+                version, fts = conn.exec_driver_sql(sql).one()
+        except OperationalError:
+            return None, False
+        return version, bool(fts)
+
+    @staticmethod
+    def seed_test_users() -> int:
+        """Dodaje użytkowników testowych (TEST_USERS), jeśli baza nie ma żadnych użytkowników."""
+        from app.auth import AuthManager
+        from app.models import User
+
+        if User.query.first() is not None:
+            return 0
+
+        for u in TEST_USERS:
+            AuthManager.create_user(
+                username=u["username"],
+                email=u["email"],
+                password=u["password"],
+                first_name=u["first_name"],
+                last_name=u["last_name"],
+                role=u["role"],
+            )
+        return len(TEST_USERS)
+
+    @staticmethod
+    def init_db(seed: bool = True, progress=None) -> dict:
+        """
+        Doprowadza bazę do bieżącej wersji schematu: wykonuje brakujące
+        migracje (app/migrations/), tworzy indeks FTS5 i (opcjonalnie) dodaje
+        użytkowników testowych.
+
+        Operacja jest idempotentna – można ją uruchamiać wielokrotnie.
+
+        Zwraca:
+            {"previous": stara wersja, "version": nowa wersja, "seeded": liczba dodanych użytkowników,
+             "migrations": raporty wykonanych migracji}
+        """
+        from app.search import UserSearch
+
+        previous, _fts = SchemaManager.inspect()
+
+        migrations = MigrationRunner.upgrade(progress=progress)
+
+        UserSearch.install()
+
+        seeded = SchemaManager.seed_test_users() if seed else 0
+
+        return {"previous": previous, "version": SCHEMA_VERSION, "seeded": seeded, "migrations": migrations}
+
+    @staticmethod
+    def startup(app):
+        """
+        Sprawdzenie schematu przy starcie aplikacji (wywoływane w `create_app()`
+        w kontekście aplikacji).
+
+        Dla aktualnej bazy kosztuje jedno zapytanie. W trybie "verify" nieaktualny
+        schemat przerywa start – chyba że działamy wewnątrz komendy `flask`
+        (np. właśnie `init-db`), wtedy tylko ostrzegamy. Tak samo w trybie "auto"
+        dla istniejącej bazy: `migrate up --dry-run` ma pokazać zaległe migracje,
+        a nie zastać je już wykonane przy wczytywaniu aplikacji.
+        """
+        from app.search import UserSearch
+
+        mode = app.config["SCHEMA_STARTUP_MODE"]
+        if mode not in STARTUP_MODES:
+            raise ValueError(f"Nieznany SCHEMA_STARTUP_MODE: {mode!r} (dozwolone: {', '.join(STARTUP_MODES)})")
+
+        version, fts = SchemaManager.inspect()
+        if version == SCHEMA_VERSION:
+            UserSearch.fts_enabled = fts
+            return
+
+        in_cli = click.get_current_context(silent=True) is not None
+        if mode == "auto" and (version is None or not in_cli):
+            SchemaManager.init_db()
+            return
+
+        command = "init-db" if version is None else "migrate up"
+        message = (
+            f"Schemat bazy w wersji {version}, a kod wymaga {SCHEMA_VERSION}. "
+            f"Uruchom: flask --app app {command}"
+        )
+        if in_cli:
+            app.logger.warning(message)
+            return
+        raise RuntimeError(message)
@@ -0,0 +1,143 @@
+"""
+app/search.py
+----------------
+Szybkie wyszukiwanie użytkowników (autouzupełnianie w panelu admina).
+
+Na SQLite korzystamy z tabeli pełnotekstowej FTS5 (`users_fts`),
+która jest synchronizowana z tabelą `users` przez triggery.
+Dzięki temu zapytanie "kow" znajduje "Kowalski" w kilka milisekund,
+nawet przy dziesiątkach tysięcy studentów.
+
+Jeśli FTS5 nie jest dostępne (inna baza / stara wersja SQLite),
+wyszukiwanie działa na zwykłym LIKE 'prefiks%'.
+"""
+
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import Enrollment, User, UserRole
+
+# Tabela FTS5 przechowuje tylko indeks – treść czyta z `users` (content=...).
+# remove_diacritics=2: "zolkiewski" znajdzie też "Żółkiewski" (wielkość liter bez znaczenia).
+_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        last_name, first_name, username, email,
+        content='users', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts(rowid, last_name, first_name, username, email)
+        VALUES (new.id, new.last_name, new.first_name, new.username, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, last_name, first_name, username, email)
+        VALUES ('delete', old.id, old.last_name, old.first_name, old.username, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF last_name, first_name, username, email ON users BEGIN
+        INSERT INTO users_fts(users_fts, rowid, last_name, first_name, username, email)
+        VALUES ('delete', old.id, old.last_name, old.first_name, old.username, old.email);
+        INSERT INTO users_fts(rowid, last_name, first_name, username, email)
+        VALUES (new.id, new.last_name, new.first_name, new.username, new.email);
+    END
+    """,
+]
+
+_fts_table = db.table("users_fts", db.column("rowid"), db.column("rank"))
+
+
+class UserSearch:
+    """Metody do budowy indeksu i wyszukiwania użytkowników po prefiksie."""
+
+    # Czy w bieżącej bazie działa FTS5 (ustawiane przez install()).
+    fts_enabled = False
+
+    @staticmethod
+    def install() -> bool:
+        """
+        Tworzy tabelę FTS5 i triggery, jeśli jeszcze nie istnieją.
+        Przy pierwszym utworzeniu wypełnia indeks istniejącymi użytkownikami.
+
+        Zwraca:
+            True, jeśli FTS5 jest dostępne.
+        """
+        if db.engine.dialect.name != "sqlite":
+            UserSearch.fts_enabled = False
+            return False
+
+        try:
+            with db.engine.begin() as conn:
+                existed = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='users_fts'"
+                ).first() is not None
+                for ddl in _FTS_DDL:
+                    conn.exec_driver_sql(ddl)
+                if not existed:
+                    conn.exec_driver_sql("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+        except OperationalError as e:
+            current_app.logger.warning("FTS5 niedostępne, wyszukiwanie użyje LIKE: %s", e)
+            UserSearch.fts_enabled = False
+            return False
+
+        UserSearch.fts_enabled = True
+        return True
+
+    @staticmethod
+    def _match_expression(text: str) -> str:
+        """
+        Zamienia tekst wpisany przez użytkownika na zapytanie FTS5:
+        każde słowo jako prefiks, np. 'anna kow' -> '"anna"* "kow"*'.
+        """
+        tokens = [t.replace('"', '""') for t in text.split()]
+        return " ".join(f'"{t}"*' for t in tokens)
+
+    @staticmethod
+    def search(text: str, role: UserRole = None, active_only: bool = True,
+               exclude_group_id: int = None, limit: int = 10):
+        """
+        Zwraca co najwyżej `limit` użytkowników pasujących do tekstu
+        (nazwisko, imię, login lub e-mail zaczyna się od wpisanego fragmentu).
+
+        exclude_group_id – pomija studentów już aktywnie zapisanych do tej grupy.
+        """
+        text = (text or "").strip()
+        if not text:
+            return []
+
+        query = User.query
+        if role is not None:
+            query = query.filter(User.role == role)
+        if active_only:
+            query = query.filter(User.is_active.is_(True))
+        if exclude_group_id is not None:
+            enrolled = db.select(Enrollment.student_id).where(
+                Enrollment.group_id == exclude_group_id,
+                Enrollment.is_active.is_(True),
+            )
+            query = query.filter(User.id.not_in(enrolled))
+
+        if UserSearch.fts_enabled:
+            query = (
+                query
+                .join(_fts_table, _fts_table.c.rowid == User.id)
+                .filter(db.text("users_fts MATCH :match"))
+                .params(match=UserSearch._match_expression(text))
+                .order_by(_fts_table.c.rank, User.last_name.asc())
+            )
+        else:
+            prefix = text.replace("%", "").replace("_", "") + "%"
+            query = query.filter(db.or_(
+                User.last_name.ilike(prefix),
+                User.first_name.ilike(prefix),
+                User.username.ilike(prefix),
+                User.email.ilike(prefix),
+            )).order_by(User.last_name.asc(), User.first_name.asc())
+
+        return query.limit(limit).all()
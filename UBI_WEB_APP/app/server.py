@@ -0,0 +1,292 @@
+"""
+app/server.py
+----------------
+Produkcyjny serwer HTTP dla aplikacji (zamiast `app.run(debug=True)`).
+
+Działa wyłącznie na bibliotece standardowej i Werkzeugu:
+- proces główny (master) otwiera gniazdo i uruchamia N procesów roboczych (prefork),
+- każdy proces roboczy tworzy własną aplikację (`create_app()`) i obsługuje
+  połączenia pulą wątków o stałym rozmiarze,
+- ograniczona kolejka: gdy wszystkie wątki są zajęte i kolejka jest pełna,
+  nowe połączenie dostaje od razu 503 (zamiast czekać bez końca),
+- keep-alive (HTTP/1.1) z limitem bezczynności połączenia,
+- SIGTERM / SIGINT: łagodne zatrzymanie (dokończenie trwających żądań),
+- SIGHUP: przeładowanie – start nowych procesów roboczych, potem łagodne
+  zatrzymanie starych (bez przerwy w obsłudze, nowy kod widoków i szablonów).
+
+Proces główny celowo NIE tworzy aplikacji ani połączeń z bazą – każdy proces
+roboczy robi to po `fork()`, więc połączenia SQLite nie są współdzielone.
+
+Uruchomienie:
+    python serve.py --workers 4 --threads 8
+"""
+
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+# Kod wyjścia procesu roboczego, któremu nie udało się utworzyć aplikacji –
+# master nie uruchamia go ponownie w pętli, tylko kończy pracę.
+BOOT_ERROR = 3
+
+_REJECT_BODY = "Serwer jest przeciążony, spróbuj ponownie.\n".encode("utf-8")
+_REJECT_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Retry-After: 1\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    + f"Content-Length: {len(_REJECT_BODY)}\r\n".encode("ascii")
+    + b"Connection: close\r\n\r\n"
+    + _REJECT_BODY
+)
+
+
+def _handler_class(keepalive_timeout: float, access_log: bool):
+    """Klasa obsługi żądań z keep-alive i (opcjonalnie) bez logu dostępu."""
+
+    class RequestHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Limit bezczynności połączenia keep-alive (i wolnego klienta)
+        timeout = keepalive_timeout
+
+        def log_request(self, code="-", size="-"):
+            if access_log:
+                super().log_request(code, size)
+
+    return RequestHandler
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    Serwer WSGI obsługujący połączenia w puli `threads` wątków.
+
+    Na wolny wątek może czekać najwyżej `max_pending` połączeń – kolejne
+    dostają 503 z nagłówkiem Retry-After.
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads=8, max_pending=64, keepalive_timeout=5.0,
+                 access_log=False, multiprocess=False, backlog=128, fd=None):
+        self.multiprocess = multiprocess
+        self.request_queue_size = backlog
+        super().__init__(host, port, app, handler=_handler_class(keepalive_timeout, access_log), fd=fd)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http")
+        self.slots = threading.BoundedSemaphore(threads + max_pending)
+        self.rejected = 0
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            try:
+                request.sendall(_REJECT_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self.pool.submit(self._process_in_thread, request, client_address)
+
+    def _process_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def drain(self):
+        """Czeka na zakończenie trwających żądań (po `shutdown()`)."""
+        self.pool.shutdown(wait=True)
+
+
+def _stop_in_background(server):
+    # shutdown() czeka na koniec pętli serve_forever – nie można go wołać z tego samego wątku
+    threading.Thread(target=server.shutdown, daemon=True).start()
+
+
+def _create_app(app_config):
+    from app import create_app
+
+    return create_app(app_config)
+
+
+def _worker_main(sock, host, port, threads, max_pending, keepalive_timeout, access_log, app_config):
+    """Proces roboczy: własna aplikacja i pula wątków na wspólnym gnieździe."""
+    # Procedury obsługi sygnałów mastera nie dotyczą procesu roboczego
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    try:
+        app = _create_app(app_config)
+    except Exception:
+        traceback.print_exc()
+        os._exit(BOOT_ERROR)
+
+    server = PooledWSGIServer(
+        host, port, app,
+        threads=threads, max_pending=max_pending, keepalive_timeout=keepalive_timeout,
+        access_log=access_log, multiprocess=True, fd=sock.fileno(),
+    )
+
+    def stop(signum, frame):
+        _stop_in_background(server)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    server.serve_forever()
+    server.drain()
+
+
+class Master:
+    """Proces główny: gniazdo, procesy robocze, sygnały."""
+
+    def __init__(self, host, port, workers, threads, max_pending, keepalive_timeout,
+                 graceful_timeout, access_log, backlog, app_config):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.worker_args = (threads, max_pending, keepalive_timeout, access_log, app_config)
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.children = {}  # pid -> generacja
+        self.generation = 0
+        self.stopping = False
+        self.reload_requested = False
+        self.boot_failed = False
+
+    def log(self, message):
+        print(f"[master {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _worker_main(self.sock, self.host, self.port, *self.worker_args)
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+            # Zwykłe zakończenie interpretera (nie os._exit), żeby wykonały się
+            # funkcje atexit – np. zapis zbuforowanych czasów logowania
+            sys.exit(0)
+        self.children[pid] = self.generation
+        return pid
+
+    def reap(self):
+        """Zbiera zakończone procesy robocze (bez blokowania)."""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            generation = self.children.pop(pid, None)
+            code = os.waitstatus_to_exitcode(status)
+            if code == BOOT_ERROR:
+                self.boot_failed = True
+                self.log(f"proces {pid} nie utworzył aplikacji – kończę pracę")
+            elif code != 0 and generation == self.generation and not self.stopping:
+                self.log(f"proces {pid} zakończył się kodem {code} – uruchamiam nowy")
+
+    def stop_children(self, pids, sig=signal.SIGTERM):
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def wait_for(self, pids):
+        """Czeka aż podane procesy się zakończą; po graceful_timeout – SIGKILL."""
+        deadline = time.monotonic() + self.graceful_timeout
+        while any(pid in self.children for pid in pids):
+            if time.monotonic() > deadline:
+                self.log("przekroczono czas łagodnego zatrzymania – SIGKILL")
+                self.stop_children([pid for pid in pids if pid in self.children], signal.SIGKILL)
+                deadline = float("inf")
+            time.sleep(0.1)
+            self.reap()
+
+    def reload(self):
+        old = [pid for pid, gen in self.children.items() if gen == self.generation]
+        self.generation += 1
+        for _ in range(self.workers):
+            self.spawn()
+        self.log(f"przeładowanie: nowe procesy uruchomione, zatrzymuję {len(old)} starych")
+        self.stop_children(old)
+
+    def run(self):
+        self.sock = socket.create_server((self.host, self.port), backlog=self.backlog)
+        self.port = self.sock.getsockname()[1]
+
+        def on_stop(signum, frame):
+            self.stopping = True
+
+        def on_reload(signum, frame):
+            self.reload_requested = True
+
+        signal.signal(signal.SIGTERM, on_stop)
+        signal.signal(signal.SIGINT, on_stop)
+        signal.signal(signal.SIGHUP, on_reload)
+
+        self.log(f"http://{self.host}:{self.port} – {self.workers} proc. × {self.worker_args[0]} wątków")
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self.stopping and not self.boot_failed:
+            time.sleep(0.2)
+            self.reap()
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            current = sum(1 for gen in self.children.values() if gen == self.generation)
+            for _ in range(self.workers - current):
+                if not self.stopping and not self.boot_failed:
+                    self.spawn()
+
+        self.log("zatrzymywanie – czekam na zakończenie trwających żądań")
+        pids = list(self.children)
+        self.stop_children(pids)
+        self.wait_for(pids)
+        self.sock.close()
+        return 1 if self.boot_failed else 0
+
+
+def serve(host="127.0.0.1", port=8000, workers=1, threads=8, max_pending=64,
+          keepalive_timeout=5.0, graceful_timeout=30.0, access_log=False, backlog=128,
+          app_config=None) -> int:
+    """
+    Uruchamia serwer. `workers=0` (albo system bez `fork()`, np. Windows)
+    oznacza jeden proces z pulą wątków – bez przeładowania przez SIGHUP.
+
+    Zwraca:
+        kod wyjścia procesu.
+    """
+    if workers > 0 and hasattr(os, "fork"):
+        master = Master(host, port, workers, threads, max_pending, keepalive_timeout,
+                        graceful_timeout, access_log, backlog, app_config)
+        return master.run()
+
+    server = PooledWSGIServer(
+        host, port, _create_app(app_config),
+        threads=threads, max_pending=max_pending, keepalive_timeout=keepalive_timeout,
+        access_log=access_log, backlog=backlog,
+    )
+
+    def stop(signum, frame):
+        _stop_in_background(server)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"http://{host}:{server.port} – 1 proces × {threads} wątków", file=sys.stderr, flush=True)
+    server.serve_forever()
+    server.drain()
+    return 0
@@ -0,0 +1,59 @@
+"""
+app/sqlite_pragmas.py
+----------------
+Ustawienia SQLite (PRAGMA) nakładane na każde nowe połączenie z bazą.
+
+Domyślny tryb SQLite (rollback journal) blokuje wszystkich czytelników na czas
+zatwierdzania każdej transakcji zapisu. Profil "production" włącza:
+- journal_mode=WAL     – czytelnicy nie czekają na piszącego (i odwrotnie),
+- busy_timeout         – zamiast natychmiastowego "database is locked" czekamy na blokadę,
+- synchronous=NORMAL   – w trybie WAL bezpieczne, a znacznie mniej fsync-ów,
+- foreign_keys=ON      – SQLite domyślnie NIE sprawdza kluczy obcych,
+- cache_size, mmap_size, temp_store – więcej danych czytanych z pamięci.
+
+Profile są zdefiniowane w config.py (SQLITE_PRAGMA_PROFILES), a wybierany jest
+zmienną środowiskową UCZELNI_SQLITE_PROFILE.
+"""
+
+from app import db
+
+# Kolejność ma znaczenie: busy_timeout przed zmianą journal_mode,
+# żeby zmiana trybu poczekała na blokadę zamiast zgłosić błąd.
+_PRAGMA_ORDER = ["busy_timeout", "journal_mode", "synchronous", "foreign_keys",
+                 "cache_size", "mmap_size", "temp_store"]
+
+
+class SQLitePragmas:
+    """Metody do nakładania ustawień PRAGMA."""
+
+    @staticmethod
+    def apply(dbapi_connection, pragmas: dict):
+        """Wykonuje PRAGMA na surowym połączeniu sqlite3."""
+        ordered = sorted(pragmas, key=lambda name: _PRAGMA_ORDER.index(name)
+                         if name in _PRAGMA_ORDER else len(_PRAGMA_ORDER))
+        cursor = dbapi_connection.cursor()
+        try:
+            for name in ordered:
+                cursor.execute(f"PRAGMA {name}={pragmas[name]}")
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def install(app) -> bool:
+        """
+        Podłącza `apply` do zdarzenia "connect" silnika bazy aplikacji
+        (wywoływane w `create_app()` przed pierwszym połączeniem).
+
+        Zwraca:
+            True, jeśli baza to SQLite i ustawienia zostały podłączone.
+        """
+        pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+        if db.engine.dialect.name != "sqlite" or not pragmas:
+            return False
+
+        def on_connect(dbapi_connection, connection_record):
+            SQLitePragmas.apply(dbapi_connection, pragmas)
+
+        db.event.listen(db.engine, "connect", on_connect)
+        return True
+
@@ -0,0 +1,174 @@
+"""
+app/sync.py
+----------------
+Przyrostowa synchronizacja kalendarza (/api/calendar/changes).
+
+Kalendarz w przeglądarce (i aplikacje mobilne) pobiera pełną listę zdarzeń
+zakresu tylko raz – potem wysyła token z poprzedniej odpowiedzi i dostaje
+wyłącznie to, co się od tego czasu zmieniło:
+
+- token = numer ostatniej zmiany planu (sekwencja z app/changes.py) + odcisk
+  (grupy użytkownika i zakres dat); inny odcisk – np. nowy zapis do grupy
+  albo inny zakres – oznacza pełną listę (`full`),
+- zmienione lekcje grup użytkownika to `lessons.change_seq > token`
+  (indeks (group_id, change_seq)) – lekcja przeniesiona poza zakres trafia
+  do `removed`, lekcje usunięte i przeniesione do innej grupy – ze śladów
+  `lesson_tombstones`,
+- cykl zmieniony od tokenu trafia do `removed_series` (klient usuwa jego
+  terminy), a jego aktualne terminy z zakresu – do `events`,
+- bez zmian (token = ostatni numer) odpowiedź to dwa małe zapytania,
+- pełna lista studenta (także /api/calendar/events) pochodzi z tygodni planu
+  w pamięci podręcznej (app/timetable.py); token dostaje wtedy numer zmiany,
+  z którym zgodne są użyte tygodnie – zmiany z innych procesów przyjdą
+  w następnej odpowiedzi.
+
+Klient stosuje odpowiedź w kolejności: `removed_series`, `removed`, `events`
+(zdarzenie o tym samym id zastępuje poprzednie).
+"""
+
+import hashlib
+from datetime import datetime
+
+from app import db
+from app.changes import LessonChanges
+from app.models import ClassGroup, Enrollment, Lesson, LessonSeries, LessonTombstone
+from app.recurrence import RecurringLessons
+from app.timetable import StudentTimetable
+
+
+class CalendarSync:
+    """Metody synchronizacji kalendarza: pełna lista zdarzeń i zmiany od tokenu."""
+
+    @staticmethod
+    def group_ids(user_id: int, role: str) -> list:
+        """Grupy w kalendarzu użytkownika: aktywne zapisy studenta albo grupy wykładowcy."""
+        if role == "student":
+            statement = db.select(Enrollment.group_id).where(
+                Enrollment.student_id == user_id, Enrollment.is_active.is_(True)
+            )
+        elif role == "lecturer":
+            statement = db.select(ClassGroup.id).where(ClassGroup.lecturer_id == user_id)
+        else:
+            return []
+        return sorted(db.session.scalars(statement))
+
+    @staticmethod
+    def fingerprint(group_ids, start: datetime, end: datetime) -> str:
+        """Odcisk tego, czego dotyczy token: grupy użytkownika i zakres dat."""
+        text = f"{','.join(map(str, sorted(group_ids)))}|{start.isoformat()}|{end.isoformat()}"
+        return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def parse_token(token, fingerprint: str):
+        """Numer zmiany z tokenu albo None (brak tokenu, inny odcisk, zły format)."""
+        if not token:
+            return None
+        seq, _, token_fingerprint = token.partition("-")
+        if token_fingerprint != fingerprint or not seq.isdigit():
+            return None
+        return int(seq)
+
+    @staticmethod
+    def events(group_ids, start: datetime, end: datetime) -> list:
+        """
+        Zdarzenia FullCalendar grup `group_ids` (lista albo podzapytanie) z zakresu
+        [start, end): lekcje i terminy cykli, posortowane po początku.
+        """
+        # Filtr (group_id IN ..., start_time w zakresie) trafia w indeks
+        # ix_lessons_group_id_start_time.
+        rows = db.session.execute(
+            db.select(Lesson.id, Lesson.title, Lesson.room, Lesson.start_time,
+                      Lesson.end_time, Lesson.is_canceled, ClassGroup.name)
+            .join(ClassGroup, Lesson.group_id == ClassGroup.id)
+            .where(Lesson.group_id.in_(group_ids), Lesson.start_time >= start, Lesson.start_time < end)
+        ).all()
+        lessons = [tuple(row) for row in rows]
+        # Terminy cykli zajęć rozwijane w locie tylko dla widocznego zakresu
+        lessons += RecurringLessons.occurrences(group_ids, start, end)
+        lessons.sort(key=lambda lesson: (lesson[3], str(lesson[0])))
+        return [Lesson.event(*lesson) for lesson in lessons]
+
+    @staticmethod
+    def full_events(user_id: int, role: str, start: datetime, end: datetime, group_ids=None) -> tuple:
+        """
+        Pełna lista zdarzeń kalendarza użytkownika z zakresu [start, end):
+        student – tygodnie planu z pamięci podręcznej, wykładowca – `events`
+        dla `group_ids` (domyślnie `group_ids(user_id, role)`).
+
+        Zwraca:
+            (lista zdarzeń, numer zmiany planu, z którym lista jest zgodna)
+        """
+        if role == "student":
+            lessons, version = StudentTimetable.snapshot(user_id, start, end)
+            return [Lesson.event(*lesson) for lesson in lessons], version
+        # Numer przed lekcjami (ta sama transakcja odczytu)
+        version = LessonChanges.latest()
+        if group_ids is None:
+            group_ids = CalendarSync.group_ids(user_id, role)
+        return CalendarSync.events(group_ids, start, end), version
+
+    @staticmethod
+    def changes(user_id: int, role: str, start: datetime, end: datetime, since: str = None) -> dict:
+        """
+        Zmiany kalendarza użytkownika w zakresie [start, end) od tokenu `since`.
+
+        Zwraca:
+            {"token", "full", "events", "removed", "removed_series"} – przy `full`
+            `events` to pełna lista zakresu.
+        """
+        group_ids = CalendarSync.group_ids(user_id, role)
+        latest = LessonChanges.latest()
+        fingerprint = CalendarSync.fingerprint(group_ids, start, end)
+        result = {
+            "token": f"{latest}-{fingerprint}",
+            "full": False,
+            "events": [],
+            "removed": [],
+            "removed_series": [],
+        }
+
+        seq = CalendarSync.parse_token(since, fingerprint)
+        if seq is None or seq > latest:
+            # Nowy klient, inne grupy/zakres albo token z innej bazy
+            events, version = CalendarSync.full_events(user_id, role, start, end, group_ids)
+            result.update(token=f"{version}-{fingerprint}", full=True, events=events)
+            return result
+        if seq == latest or not group_ids:
+            return result
+
+        changed = db.session.execute(
+            db.select(Lesson.id, Lesson.title, Lesson.room, Lesson.start_time,
+                      Lesson.end_time, Lesson.is_canceled, ClassGroup.name)
+            .join(ClassGroup, Lesson.group_id == ClassGroup.id)
+            .where(Lesson.group_id.in_(group_ids), Lesson.change_seq > seq)
+        ).all()
+        events = []
+        for row in changed:
+            if start <= row.start_time < end:
+                events.append(tuple(row))
+            else:
+                # Przeniesiona poza zakres (klient mógł ją mieć)
+                result["removed"].append(row.id)
+
+        for lesson_id, series_id in db.session.execute(
+            db.select(LessonTombstone.lesson_id, LessonTombstone.series_id)
+            .where(LessonTombstone.group_id.in_(group_ids), LessonTombstone.change_seq > seq)
+        ):
+            if lesson_id is not None:
+                result["removed"].append(lesson_id)
+            else:
+                result["removed_series"].append(series_id)
+
+        series_ids = list(db.session.scalars(
+            db.select(LessonSeries.id)
+            .where(LessonSeries.group_id.in_(group_ids), LessonSeries.change_seq > seq)
+        ))
+        if series_ids:
+            result["removed_series"] += series_ids
+            events += RecurringLessons.occurrences(group_ids, start, end, series_ids=series_ids)
+
+        events.sort(key=lambda lesson: (lesson[3], str(lesson[0])))
+        result["events"] = [Lesson.event(*event) for event in events]
+        result["removed"] = sorted(set(result["removed"]))
+        result["removed_series"] = sorted(set(result["removed_series"]))
+        return result
@@ -0,0 +1,323 @@
+"""
+app/timetable.py
+----------------
+Plan zajęć studenta: lekcje grup, do których jest aktywnie zapisany.
+
+- plan dzielimy na tygodnie ISO; tydzień studenta (student, rok ISO, tydzień)
+  to jeden wpis pamięci podręcznej procesu (TIMETABLE_CACHE_TTL sekund,
+  najwyżej TIMETABLE_CACHE_SIZE wpisów – najdawniej używane wypadają),
+- brakujące tygodnie z okna dat pobieramy JEDNYM zapytaniem
+  (aktywne zapisy studenta LEFT JOIN lekcje ich grup w zakresie dat)
+  plus terminy cykli zajęć tych grup (app/recurrence.py),
+- zmiana lekcji, cyklu, grupy albo zapisu przez ORM unieważnia – po zatwierdzeniu
+  transakcji – tygodnie studentów tej grupy / tego studenta; zapisy wstawiane
+  hurtowo (app/enrollment.py) zgłaszają zmianę przez `timetable_cache.touch(...)`,
+- z tych samych tygodni korzysta kalendarz (/api/calendar/events, pełna
+  lista /api/calendar/changes) i widżet „Najbliższe zajęcia” na pulpicie,
+- wpis pamięta numer ostatniej zmiany planu z chwili odczytu (app/changes.py)
+  – token synchronizacji kalendarza nie może być nowszy niż dane z pamięci.
+
+Pamięć podręczna jest osobna w każdym procesie roboczym serve.py – zmiana
+z innego procesu jest widoczna najpóźniej po TIMETABLE_CACHE_TTL sekundach.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app import db
+from app.changes import LessonChanges
+from app.models import ClassGroup, Enrollment, Lesson, LessonSeries
+from app.recurrence import RecurringLessons
+
+WEEK = timedelta(days=7)
+
+
+def week_start(moment: datetime) -> datetime:
+    """Poniedziałek 00:00 tygodnia, w którym leży `moment`."""
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday())
+
+
+def week_key(monday: datetime) -> tuple:
+    """(rok ISO, numer tygodnia ISO)."""
+    iso = monday.isocalendar()
+    return iso[0], iso[1]
+
+
+class TimetableCache:
+    """
+    Pamięć podręczna tygodni planu
+    {(student_id, rok ISO, tydzień): (ważne_do, lekcje, grupy, numer zmiany planu)}
+    z indeksem odwrotnym grupa -> klucze – podłączana w `create_app()`
+    tak jak `identity_cache`.
+
+    Lekcje tygodnia trzymamy jako krotki (id, tytuł, sala, początek, koniec,
+    odwołane, nazwa grupy), a nie słowniki – tysiące tygodni zajmują mniej pamięci.
+
+    Każde `invalidate()` to kolejna generacja zapamiętywana przy unieważnionych
+    studentach i grupach. Czytelnik bierze `generation()` przed zapytaniem,
+    a `put()` odrzuca tydzień, jeśli w międzyczasie unieważniono jego studenta
+    albo którąś z jego grup – inaczej odczyt sprzed commit-u wróciłby do pamięci.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_group = {}
+        self._by_student = {}
+        self._generation = 0
+        self._cleared_at = 0
+        self._student_generation = {}
+        self._group_generation = {}
+        self.ttl = 0
+        self.max_entries = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get("TIMETABLE_CACHE_TTL") or 0
+        self.max_entries = app.config.get("TIMETABLE_CACHE_SIZE") or 0
+        # Nowa aplikacja = być może inna baza – nie ufamy starym wpisom
+        self.clear()
+
+        if not db.event.contains(Session, "after_flush", _collect_changes):
+            db.event.listen(Session, "after_flush", _collect_changes)
+            db.event.listen(Session, "after_commit", _apply_changes)
+            db.event.listen(Session, "after_rollback", _discard_changes)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.ttl and self.max_entries)
+
+    def get(self, key):
+        """(lekcje tygodnia, numer zmiany planu) albo None (brak wpisu albo przeterminowany)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[3]
+
+    def generation(self) -> int:
+        """Bieżąca generacja – pobierana przed odczytem z bazy, przekazywana do `put`."""
+        return self._generation
+
+    def put(self, key, lessons: tuple, group_ids, version: int = 0, generation: int = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and (
+                generation < self._cleared_at
+                or self._student_generation.get(key[0], 0) > generation
+                or any(self._group_generation.get(group_id, 0) > generation for group_id in group_ids)
+            ):
+                # Unieważnione w trakcie odczytu – dane mogą być sprzed zmiany
+                return
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, lessons, tuple(group_ids), version)
+            self._by_student.setdefault(key[0], set()).add(key)
+            for group_id in group_ids:
+                self._by_group.setdefault(group_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        """Usuwa wpis razem z indeksami (wywoływane pod blokadą)."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for index, ids in ((self._by_student, (key[0],)), (self._by_group, entry[2])):
+            for i in ids:
+                keys = index.get(i)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[i]
+
+    def invalidate(self, group_ids=(), student_ids=()):
+        """Usuwa tygodnie studentów podanych grup oraz podanych studentów."""
+        with self._lock:
+            self._generation += 1
+            keys = set()
+            for group_id in group_ids:
+                self._group_generation[group_id] = self._generation
+                keys |= self._by_group.get(group_id, set())
+            for student_id in student_ids:
+                self._student_generation[student_id] = self._generation
+                keys |= self._by_student.get(student_id, set())
+            for key in keys:
+                self._remove(key)
+
+    def touch(self, group_ids=(), student_ids=()):
+        """
+        Zgłasza zmianę zrobioną z pominięciem ORM (np. INSERT wielu zapisów) –
+        unieważnienie nastąpi po zatwierdzeniu bieżącej transakcji sesji.
+        """
+        pending = db.session.info.setdefault("timetable_changes", (set(), set()))
+        pending[0].update(group_ids)
+        pending[1].update(student_ids)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_group.clear()
+            self._by_student.clear()
+            # Odczyty rozpoczęte przed wyczyszczeniem nie trafią już do pamięci
+            self._generation += 1
+            self._cleared_at = self._generation
+            self._student_generation.clear()
+            self._group_generation.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _collect_changes(session, flush_context):
+    """`after_flush`: zapamiętuje grupy i studentów, których plan się zmienił."""
+    groups, students = session.info.setdefault("timetable_changes", (set(), set()))
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Lesson):
+            groups.add(obj.group_id)
+            # Lekcja przeniesiona do innej grupy – stara grupa też się zmienia
+            groups.update(db.inspect(obj).attrs.group_id.history.deleted or ())
+        elif isinstance(obj, LessonSeries):
+            groups.add(obj.group_id)
+            groups.update(db.inspect(obj).attrs.group_id.history.deleted or ())
+        elif isinstance(obj, ClassGroup):
+            groups.add(obj.id)
+        elif isinstance(obj, Enrollment):
+            students.add(obj.student_id)
+            students.update(db.inspect(obj).attrs.student_id.history.deleted or ())
+
+
+def _apply_changes(session):
+    """`after_commit`: unieważnia tygodnie – dopiero gdy zmiany są widoczne dla innych."""
+    changes = session.info.pop("timetable_changes", None)
+    if changes and (changes[0] or changes[1]):
+        timetable_cache.invalidate(*changes)
+
+
+def _discard_changes(session):
+    session.info.pop("timetable_changes", None)
+
+
+class StudentTimetable:
+    """Metody do odczytu planu zajęć studenta (z pamięci podręcznej tygodni)."""
+
+    @staticmethod
+    def _load(student_id: int, weeks: list) -> dict:
+        """
+        Jedno zapytanie dla ciągłego zakresu tygodni `weeks` (poniedziałki).
+
+        Zwraca:
+            ({poniedziałek: (lekcje tygodnia, id grup studenta)}, numer zmiany planu)
+        """
+        start, end = weeks[0], weeks[-1] + WEEK
+        # Numer przed lekcjami (ta sama transakcja odczytu) – dane są co najmniej tak świeże
+        version = LessonChanges.latest()
+        rows = db.session.execute(
+            db.select(Enrollment.group_id, ClassGroup.name,
+                      Lesson.id, Lesson.title, Lesson.room, Lesson.start_time,
+                      Lesson.end_time, Lesson.is_canceled)
+            .select_from(Enrollment)
+            .join(ClassGroup, ClassGroup.id == Enrollment.group_id)
+            .outerjoin(Lesson, db.and_(
+                Lesson.group_id == Enrollment.group_id,
+                Lesson.start_time >= start,
+                Lesson.start_time < end,
+            ))
+            .where(Enrollment.student_id == student_id, Enrollment.is_active.is_(True))
+            .order_by(Lesson.start_time, Lesson.id)
+        ).all()
+
+        group_ids = {row.group_id for row in rows}
+        lessons = [
+            (row.id, row.title, row.room, row.start_time, row.end_time, bool(row.is_canceled), row.name)
+            for row in rows
+            if row.id is not None  # grupa bez lekcji w tym zakresie
+        ]
+        if group_ids:
+            # Terminy cykli zajęć rozwijane w locie (app/recurrence.py)
+            lessons += RecurringLessons.occurrences(list(group_ids), start, end)
+            lessons.sort(key=lambda lesson: lesson[3])
+
+        buckets = {monday: [] for monday in weeks}
+        for lesson in lessons:
+            buckets[week_start(lesson[3])].append(lesson)
+        return {monday: (tuple(week), group_ids) for monday, week in buckets.items()}, version
+
+    @staticmethod
+    def snapshot(student_id: int, start: datetime, end: datetime) -> tuple:
+        """
+        Lekcje studenta z zakresu [start, end) posortowane po początku – tygodnie
+        z pamięci podręcznej, brakujące jednym zapytaniem.
+
+        Zwraca:
+            (lista krotek (id, tytuł, sala, początek, koniec, odwołane, nazwa grupy),
+             najmniejszy numer zmiany planu, z jakim zgodne są użyte tygodnie)
+        """
+        weeks = []
+        monday = week_start(start)
+        while monday < end:
+            weeks.append(monday)
+            monday += WEEK
+
+        found = {}
+        versions = []
+        missing = []
+        for monday in weeks:
+            cached = timetable_cache.get((student_id, *week_key(monday)))
+            if cached is None:
+                missing.append(monday)
+            else:
+                found[monday] = cached[0]
+                versions.append(cached[1])
+
+        if missing:
+            # Jedno zapytanie od pierwszego do ostatniego brakującego tygodnia
+            span = [m for m in weeks if missing[0] <= m <= missing[-1]]
+            generation = timetable_cache.generation()
+            loaded, version = StudentTimetable._load(student_id, span)
+            versions.append(version)
+            for monday, (lessons, group_ids) in loaded.items():
+                timetable_cache.put((student_id, *week_key(monday)), lessons, group_ids, version, generation)
+                found.setdefault(monday, lessons)
+
+        lessons = [
+            lesson
+            for monday in weeks
+            for lesson in found[monday]
+            if start <= lesson[3] < end
+        ]
+        return lessons, min(versions, default=0)
+
+    @staticmethod
+    def lessons(student_id: int, start: datetime, end: datetime) -> list:
+        """Lekcje studenta z zakresu [start, end) – jak `snapshot`, bez numeru zmiany."""
+        return StudentTimetable.snapshot(student_id, start, end)[0]
+
+    @staticmethod
+    def events(student_id: int, start: datetime, end: datetime) -> list:
+        """Zdarzenia FullCalendar (ten sam format co `Lesson.to_event()`)."""
+        return [Lesson.event(*lesson) for lesson in StudentTimetable.lessons(student_id, start, end)]
+
+    @staticmethod
+    def upcoming(student_id: int, limit: int, now: datetime = None) -> list:
+        """
+        Najbliższe nieodwołane zajęcia (bieżący i następny tydzień) – widżet pulpitu.
+
+        Zwraca:
+            listę słowników zdarzeń (jak `events`), najwyżej `limit`.
+        """
+        now = now or datetime.now()
+        lessons = StudentTimetable.lessons(student_id, now, week_start(now) + 2 * WEEK)
+        return [Lesson.event(*lesson) for lesson in lessons if not lesson[5]][:limit]
+
+
+# Globalny obiekt – tak jak `identity_cache`
+timetable_cache = TimetableCache()
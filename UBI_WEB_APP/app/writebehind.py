@@ -0,0 +1,135 @@
+"""
+app/writebehind.py
+----------------
+Odroczony zapis czasu ostatniego logowania (`users.last_login`).
+
+Zamiast osobnej transakcji zapisu przy każdym logowaniu zbieramy czasy
+w pamięci (użytkownik -> najnowszy czas) i co LAST_LOGIN_FLUSH_INTERVAL
+sekund zapisujemy je jednym wsadowym UPDATE w jednej transakcji.
+Dzięki temu samo logowanie tylko czyta z bazy i nie walczy o blokadę
+zapisu SQLite z wystawianiem ocen.
+
+Bufor jest opróżniany także przy zamknięciu procesu (atexit – również
+w procesach roboczych serve.py po łagodnym zatrzymaniu).
+Po awaryjnym zabiciu procesu można stracić najwyżej ostatnie kilka sekund
+czasów logowania.
+"""
+
+import atexit
+import os
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import User
+
+
+class LastLoginBuffer:
+    """
+    Bufor czasów logowania – podłączany w `create_app()`
+    tak jak `db.init_app(app)`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # user_id -> datetime
+        self._engine = None
+        self._logger = None
+        self.interval = None
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        # Czasy zebrane dla poprzedniej aplikacji (innej bazy) zapisujemy od razu
+        self.flush()
+
+        with app.app_context():
+            self._engine = db.engine
+        self._logger = app.logger
+        self.interval = app.config.get("LAST_LOGIN_FLUSH_INTERVAL")
+
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+
+    def record(self, user_id: int, when):
+        """Zapamiętuje czas logowania; przy wyłączonym buforowaniu zapisuje od razu."""
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is None or when > previous:
+                self._pending[user_id] = when
+
+        if not self.interval:
+            self.flush()
+            return
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        # Po fork() wątek rodzica nie istnieje w procesie potomnym – startujemy własny
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="last-login-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            # Odczyt raz na obieg – `init_app` z inną konfiguracją może wyłączyć buforowanie
+            interval = self.interval
+            if not interval:
+                # 0 / None: `record()` zapisuje od razu – wątek kończy się po ostatnim zapisie
+                self.flush()
+                return
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                # Błąd inny niż zablokowana baza (te obsługuje `flush`) nie może zatrzymać wątku
+                if self._logger is not None:
+                    self._logger.exception("Błąd zapisu czasów logowania")
+
+    def flush(self) -> int:
+        """
+        Zapisuje zebrane czasy jednym UPDATE (executemany, jedna transakcja).
+
+        Zwraca:
+            liczbę zaktualizowanych użytkowników.
+        """
+        with self._lock:
+            if not self._pending or self._engine is None:
+                return 0
+            pending, self._pending = self._pending, {}
+
+        users = User.__table__
+        statement = (
+            users.update()
+            .where(users.c.id == db.bindparam("user_id"))
+            .values(last_login=db.bindparam("when"))
+        )
+        rows = [{"user_id": user_id, "when": when} for user_id, when in pending.items()]
+
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(statement, rows)
+        except OperationalError as e:
+            # Baza zablokowana / niedostępna – oddajemy czasy do bufora (nowsze wygrywają)
+            with self._lock:
+                for user_id, when in pending.items():
+                    current = self._pending.get(user_id)
+                    if current is None or when > current:
+                        self._pending[user_id] = when
+            if self._logger is not None:
+                self._logger.warning("Nie udało się zapisać czasów logowania (%d): %s", len(rows), e)
+            return 0
+
+        return len(rows)
+
+
+# Globalny obiekt – tak jak `db`
+last_login_buffer = LastLoginBuffer()
@@ -9,6 +9,7 @@ Tutaj trzymamy:
 - stałe używane w różnych miejscach (np. role użytkowników).
 """
 
+import os
 from pathlib import Path
 
 # Ścieżka bazowa projektu (folder projekt_uczelni_web)
@@ -27,12 +28,137 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 # W produkcji należy go trzymać w zmiennej środowiskowej / pliku .env.
 SECRET_KEY = "super_tajny_klucz_dev_zmien_na_produkcji"
 
+# SQLite: PRAGMA nakładane na każde nowe połączenie (app/sqlite_pragmas.py).
+# Profil wybieramy zmienną środowiskową UCZELNI_SQLITE_PROFILE:
+# - "production": WAL (czytelnicy nie czekają na zapisy), 5 s oczekiwania na blokadę,
+#   synchronous=NORMAL, klucze obce, 64 MiB cache, 256 MiB mmap,
+# - "development": WAL i klucze obce, bez powiększania pamięci podręcznej,
+# - "legacy": dawne zachowanie (rollback journal) – do porównań wydajności.
+SQLITE_PRAGMA_PROFILES = {
+    "production": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "cache_size": -65536,        # w KiB (wartość ujemna)
+        "mmap_size": 268435456,      # 256 MiB
+        "temp_store": "MEMORY",
+    },
+    "development": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+    },
+    "legacy": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "foreign_keys": "OFF",
+    },
+}
+SQLITE_PROFILE = os.environ.get("UCZELNI_SQLITE_PROFILE", "production")
+
+# Haszowanie haseł:
+# - algorytm używany dla nowych haseł ("scrypt" albo "pbkdf2_sha256"),
+# - liczba wątków weryfikujących hasła (ogranicza koszt CPU logowania),
+# - ile logowań może czekać w kolejce, zanim kolejne zostaną odrzucone,
+# - maksymalny czas oczekiwania na weryfikację (sekundy).
+PASSWORD_HASHER = "scrypt"
+PASSWORD_VERIFY_WORKERS = 4
+PASSWORD_VERIFY_QUEUE = 32
+PASSWORD_VERIFY_TIMEOUT = 10
+
+# Co ile sekund zapisywać zbuforowane czasy ostatniego logowania (app/writebehind.py).
+# 0 = zapis od razu przy każdym logowaniu (dawne zachowanie).
+LAST_LOGIN_FLUSH_INTERVAL = 5
+
+# Ile sekund proces pamięta rolę i status konta zalogowanego użytkownika
+# (app/identity.py) – 0 = sprawdzanie w bazie przy każdym żądaniu.
+IDENTITY_CACHE_TTL = 30
+
+# Plan zajęć studenta (app/timetable.py): ile sekund proces pamięta tydzień planu,
+# ile tygodni (student × tydzień) trzyma najwyżej – 0 = zawsze z bazy –
+# i ile zajęć pokazuje widżet „Najbliższe zajęcia” na pulpicie.
+TIMETABLE_CACHE_TTL = 300
+TIMETABLE_CACHE_SIZE = 20000
+UPCOMING_LESSONS_LIMIT = 5
+
+# Kolizje terminów lekcji (app/scheduling.py): zmiany z innych procesów indeks
+# wykrywa po numerze ostatniej zmiany planu; dodatkowo co ile sekund proces buduje
+# od nowa indeks lekcji w pamięci (zapisy z pominięciem ORM) – 0 = przy każdym sprawdzeniu.
+SCHEDULE_INDEX_TTL = 300
+
+# Lista użytkowników w panelu admina: domyślny i maksymalny rozmiar strony
+ADMIN_USERS_PAGE_SIZE = 50
+ADMIN_USERS_MAX_PAGE_SIZE = 200
+
+# Autouzupełnianie studentów: domyślna i maksymalna liczba podpowiedzi
+STUDENT_SEARCH_LIMIT = 10
+STUDENT_SEARCH_MAX_LIMIT = 50
+
+# Pomiary wydajności (app/instrumentation.py):
+# - włączenie liczenia zapytań/czasów i nagłówka Server-Timing,
+# - udostępnienie zbiorczych statystyk pod /metrics (domyślnie wyłączone; po włączeniu
+#   tylko admin i połączenia z localhost – za reverse proxy zablokuj /metrics w proxy),
+# - próg (ms), powyżej którego zapytanie SQL jest logowane (None = wyłączone).
+INSTRUMENTATION_ENABLED = True
+METRICS_ENDPOINT_ENABLED = False
+SLOW_QUERY_THRESHOLD_MS = 100
+
+# Start aplikacji (app/schema.py):
+# - "verify" (domyślnie): tylko sprawdza wersję schematu jednym zapytaniem;
+#   bazę przygotowuje komenda `flask --app app init-db` / `migrate up`,
+# - "auto": przy nieaktualnym schemacie tworzy tabele i użytkowników testowych
+#   – tylko lokalnie: włącza go serwer developerski (run.py) i bazy tymczasowe.
+SCHEMA_STARTUP_MODE = "verify"
+
+# Migracje schematu (flask --app app migrate up, app/migrations/):
+# - ile kolejnych id obejmuje jedna transakcja przy wypełnianiu danych (backfill),
+# - przerwa między paczkami (sekundy) – czas na zapisy aplikacji, które czekają na blokadę.
+MIGRATION_BATCH_SIZE = 5000
+MIGRATION_BATCH_PAUSE = 0.05
+
+# Statystyki ocen grup i kursów (app/analytics.py):
+# - skala ocen (przedziały histogramu),
+# - najniższa średnia ważona studenta, która oznacza zaliczenie.
+GRADE_SCALE = [2.0, 3.0, 3.5, 4.0, 4.5, 5.0]
+GRADE_PASS_THRESHOLD = 3.0
+
+# Eksport CSV (app/exports.py): ile wierszy czytamy z bazy i wysyłamy jednym kawałkiem.
+EXPORT_BATCH_SIZE = 2000
+
+# Kalendarze ICS do subskrypcji (app/ical.py):
+# - ile tygodni wstecz i naprzód obejmuje plik (okno przesuwa się co poniedziałek),
+# - ile sekund aplikacja kalendarza może nie pytać o zmiany (Cache-Control: max-age),
+# - strefa czasowa godzin zajęć (X-WR-TIMEZONE) i domena w identyfikatorach zdarzeń (UID).
+ICS_FEED_PAST_WEEKS = 4
+ICS_FEED_FUTURE_WEEKS = 26
+ICS_FEED_MAX_AGE = 900
+ICS_TIMEZONE = "Europe/Warsaw"
+ICS_UID_DOMAIN = "uczelni.edu"
+
+# Serwer produkcyjny (serve.py, app/server.py):
+# - adres i port,
+# - liczba procesów roboczych (None = liczba rdzeni CPU; 0 = jeden proces, tylko wątki),
+# - liczba wątków w każdym procesie i ile połączeń może czekać na wolny wątek (potem 503),
+# - czas bezczynności połączenia keep-alive i czas na łagodne zatrzymanie (sekundy),
+# - czy logować każde żądanie.
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8000
+SERVER_WORKERS = None
+SERVER_THREADS = 8
+SERVER_MAX_PENDING = 64
+SERVER_KEEPALIVE_TIMEOUT = 5
+SERVER_GRACEFUL_TIMEOUT = 30
+SERVER_ACCESS_LOG = True
+
 # Role użytkowników w systemie
 ROLE_STUDENT = "student"
 ROLE_LECTURER = "lecturer"
 ROLE_ADMIN = "admin"
 
-# Dane testowe – stworzymy tych użytkowników przy pierwszym starcie aplikacji.
+# Dane testowe – tworzone przez `flask --app app init-db` (albo przy pierwszym starcie w trybie "auto").
 TEST_USERS = [
     {
         "username": "admin",
@@ -9,12 +9,15 @@ Uruchomienie:
 Po uruchomieniu:
     - aplikacja startuje na http://localhost:5000
     - możesz wejść przez przeglądarkę.
+
+To serwer developerski (jeden wątek, tryb debug). Na produkcji: python serve.py
 """
 
 from app import create_app
 
-# Tworzymy instancję aplikacji Flask
-app = create_app()
+# Tworzymy instancję aplikacji Flask. Lokalnie nieaktualna baza jest od razu
+# przygotowywana (tryb "auto"); domyślny tryb "verify" tylko sprawdza schemat.
+app = create_app({"SCHEMA_STARTUP_MODE": "auto"})
 
 if __name__ == "__main__":
     # Uruchamiamy wbudowany serwer developerski Flaska
@@ -0,0 +1,74 @@
+"""
+serve.py
+----------------
+Produkcyjny punkt wejścia aplikacji (zamiast `python run.py`).
+
+Uruchomienie:
+    flask --app app init-db          # raz: tabele i wersja schematu
+    python serve.py                  # ustawienia z config.py (SERVER_*)
+    python serve.py --workers 4 --threads 8 --port 8000
+
+Sterowanie działającym serwerem (sygnały do procesu głównego):
+    kill -TERM <pid>   # łagodne zatrzymanie (trwające żądania są dokańczane)
+    kill -HUP <pid>    # przeładowanie procesów roboczych bez przerwy w obsłudze
+
+Procesy robocze tylko sprawdzają wersję schematu (SCHEMA_STARTUP_MODE="verify"),
+więc nie wyścigują się przy tworzeniu tabel i użytkowników testowych.
+"""
+
+import argparse
+import os
+import sys
+
+from config import (
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_WORKERS,
+    SERVER_THREADS,
+    SERVER_MAX_PENDING,
+    SERVER_KEEPALIVE_TIMEOUT,
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_ACCESS_LOG,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serwer produkcyjny aplikacji UczeLni.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS,
+                        help="Liczba procesów roboczych (domyślnie liczba rdzeni; 0 = tylko wątki).")
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS, help="Wątki w każdym procesie.")
+    parser.add_argument("--max-pending", type=int, default=SERVER_MAX_PENDING,
+                        help="Ile połączeń może czekać na wolny wątek, zanim serwer odpowie 503.")
+    parser.add_argument("--keepalive-timeout", type=float, default=SERVER_KEEPALIVE_TIMEOUT)
+    parser.add_argument("--graceful-timeout", type=float, default=SERVER_GRACEFUL_TIMEOUT)
+    parser.add_argument("--access-log", action=argparse.BooleanOptionalAction, default=SERVER_ACCESS_LOG)
+    parser.add_argument("--database", default=None,
+                        help="Plik SQLite zamiast bazy z config.py (np. wygenerowanej przez generate-data).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    from app.server import serve
+
+    args = parse_args(argv)
+    app_config = {"SCHEMA_STARTUP_MODE": "verify"}
+    if args.database:
+        app_config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.abspath(args.database)}"
+
+    return serve(
+        host=args.host,
+        port=args.port,
+        workers=os.cpu_count() if args.workers is None else args.workers,
+        threads=args.threads,
+        max_pending=args.max_pending,
+        keepalive_timeout=args.keepalive_timeout,
+        graceful_timeout=args.graceful_timeout,
+        access_log=args.access_log,
+        app_config=app_config,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())